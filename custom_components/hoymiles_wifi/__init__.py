@@ -18,22 +18,34 @@ from .const import (
     CONF_HYBRID_INVERTERS,
     CONF_INVERTERS,
     CONF_METERS,
-    CONF_PORTS,
     CONF_THREE_PHASE_INVERTERS,
     CONF_TIMEOUT,
     CONF_UPDATE_INTERVAL,
+    CONF_ADAPTIVE_POLLING,
+    CONF_MIN_UPDATE_INTERVAL,
+    CONF_MAX_UPDATE_INTERVAL,
+    CONF_FAST_STARTUP,
+    CONF_PERSISTENT_CONNECTION,
     CONFIG_VERSION,
     CONF_IS_ENCRYPTED,
     CONF_ENC_RAND,
+    CAPTURE_MAX_DURATION_SECONDS,
     DEFAULT_APP_INFO_UPDATE_INTERVAL_SECONDS,
     DEFAULT_CONFIG_UPDATE_INTERVAL_SECONDS,
+    DEFAULT_MAX_UPDATE_INTERVAL_SECONDS,
+    DEFAULT_MIN_UPDATE_INTERVAL_SECONDS,
     DEFAULT_TIMEOUT_SECONDS,
     DOMAIN,
     HASS_APP_INFO_COORDINATOR,
     HASS_CONFIG_COORDINATOR,
+    HASS_COORDINATORS,
     HASS_DATA_COORDINATOR,
     HASS_DTU,
     HASS_ENERGY_STORAGE_DATA_COORDINATOR,
+    HASS_MIDNIGHT_SCHEDULER,
+    HASS_RECONCILER,
+    HASS_SCHEDULER,
+    HASS_SNAPSHOT_STORE,
 )
 from .coordinator import (
     HoymilesAppInfoUpdateCoordinator,
@@ -41,14 +53,28 @@ from .coordinator import (
     HoymilesRealDataUpdateCoordinator,
     HoymilesEnergyStorageUpdateCoordinator,
 )
+from .midnight import HoymilesMidnightScheduler
+from .polling import AdaptivePollingPolicy
+from .reconcile import HoymilesTopologyReconciler
 from .error import CannotConnect
-from .services import async_handle_set_bms_mode
-from .util import async_get_config_entry_data_for_host
+from .scheduler import HoymilesRequestScheduler
+from .services import async_handle_set_bms_mode, async_handle_start_capture
+from .store import HoymilesSnapshotStore
+from .topology import (
+    Topology,
+    async_get_topology,
+    async_get_topology_cache,
+    async_schedule_reprobe,
+    async_topology_needs_reprobe,
+)
+from .transport import PersistentConnectionDTU
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.SENSOR, Platform.NUMBER, Platform.BINARY_SENSOR, Platform.BUTTON]
 
+SERVICES = ("set_bms_mode", "start_capture")
+
 SET_BMS_SCHEMA = vol.Schema(
     {
         vol.Required("bms_mode"): vol.In(
@@ -73,6 +99,20 @@ SET_BMS_SCHEMA = vol.Schema(
     }
 )
 
+START_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required("duration"): vol.All(
+            vol.Coerce(int), vol.Range(min=10, max=CAPTURE_MAX_DURATION_SECONDS)
+        ),
+        vol.Optional("device_id"): cv.ensure_list,
+    }
+)
+
+
+def _present(devices: list) -> list:
+    """Return the devices that were not removed."""
+    return [device for device in devices if device is not None]
+
 
 async def async_setup(hass: HomeAssistant, config: ConfigType):
     """Set up this integration using YAML is not supported."""
@@ -88,29 +128,67 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
 
     host = config_entry.data.get(CONF_HOST)
     update_interval = timedelta(seconds=config_entry.data.get(CONF_UPDATE_INTERVAL))
-    single_phase_inverters = config_entry.data[CONF_INVERTERS]
-    three_phase_inverters = config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
-    hybrid_inverters = config_entry.data.get(CONF_HYBRID_INVERTERS, [])
-    meters = config_entry.data.get(CONF_METERS, [])
+    # Removed devices are kept as None, so entity keys keep their index.
+    single_phase_inverters = _present(config_entry.data[CONF_INVERTERS])
+    three_phase_inverters = _present(
+        config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
+    )
+    hybrid_inverters = _present(config_entry.data.get(CONF_HYBRID_INVERTERS, []))
+    meters = _present(config_entry.data.get(CONF_METERS, []))
     is_encrypted = config_entry.data.get(CONF_IS_ENCRYPTED, False)
     enc_rand = config_entry.data.get(CONF_ENC_RAND, None)
     timeout = config_entry.data.get(CONF_TIMEOUT, DEFAULT_TIMEOUT_SECONDS)
 
+    dtu_class = (
+        PersistentConnectionDTU
+        if config_entry.data.get(CONF_PERSISTENT_CONNECTION, False)
+        else DTU
+    )
     if is_encrypted:
-        dtu = DTU(
+        dtu = dtu_class(
             host,
             is_encrypted=is_encrypted,
             enc_rand=bytes.fromhex(enc_rand),
             timeout=timeout,
         )
     else:
-        dtu = DTU(host, timeout=timeout)
+        dtu = dtu_class(host, timeout=timeout)
+    if isinstance(dtu, PersistentConnectionDTU):
+        config_entry.async_on_unload(dtu.async_close)
+
+    scheduler = HoymilesRequestScheduler(dtu)
 
     hass_data[HASS_DTU] = dtu
+    hass_data[HASS_SCHEDULER] = scheduler
+
+    midnight_scheduler = HoymilesMidnightScheduler(hass)
+    config_entry.async_on_unload(midnight_scheduler.async_stop)
+    hass_data[HASS_MIDNIGHT_SCHEDULER] = midnight_scheduler
 
     if single_phase_inverters or three_phase_inverters or meters:
+        polling_policy = None
+        if config_entry.data.get(CONF_ADAPTIVE_POLLING, False):
+            polling_policy = AdaptivePollingPolicy(
+                min_interval=timedelta(
+                    seconds=config_entry.data.get(
+                        CONF_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL_SECONDS
+                    )
+                ),
+                max_interval=timedelta(
+                    seconds=config_entry.data.get(
+                        CONF_MAX_UPDATE_INTERVAL, DEFAULT_MAX_UPDATE_INTERVAL_SECONDS
+                    )
+                ),
+                base_interval=update_interval,
+            )
+
         data_coordinator = HoymilesRealDataUpdateCoordinator(
-            hass, dtu=dtu, config_entry=config_entry, update_interval=update_interval
+            hass,
+            dtu=dtu,
+            scheduler=scheduler,
+            config_entry=config_entry,
+            update_interval=update_interval,
+            polling_policy=polling_policy,
         )
         hass_data[HASS_DATA_COORDINATOR] = data_coordinator
 
@@ -120,6 +198,7 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
         config_coordinator = HoymilesConfigUpdateCoordinator(
             hass=hass,
             dtu=dtu,
+            scheduler=scheduler,
             config_entry=config_entry,
             update_interval=config_update_interval,
         )
@@ -131,6 +210,7 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
         app_info_update_coordinator = HoymilesAppInfoUpdateCoordinator(
             hass=hass,
             dtu=dtu,
+            scheduler=scheduler,
             config_entry=config_entry,
             update_interval=app_info_update_interval,
         )
@@ -140,6 +220,7 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
         energy_storage_data_coordinator = HoymilesEnergyStorageUpdateCoordinator(
             hass=hass,
             dtu=dtu,
+            scheduler=scheduler,
             config_entry=config_entry,
             update_interval=update_interval,
             dtu_serial_number=config_entry.data[CONF_DTU_SERIAL_NUMBER],
@@ -150,18 +231,70 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
             energy_storage_data_coordinator
         )
 
-    _LOGGER.debug(f"  hass_data: {hass_data}")  # --- IGNORE ---
-    _LOGGER.debug(f"  config_entry_id: {config_entry.entry_id}")
+    reconciler = HoymilesTopologyReconciler(
+        hass,
+        config_entry,
+        hass_data.get(HASS_DATA_COORDINATOR),
+        hass_data.get(HASS_ENERGY_STORAGE_DATA_COORDINATOR),
+    )
+    hass_data[HASS_RECONCILER] = reconciler
+
+    # Entries created before the topology cache existed seed it, so later
+    # migrations do not depend on the DTU being reachable.
+    topology_cache = async_get_topology_cache(hass)
+    if await topology_cache.async_get(host) is None and (
+        topology := Topology.from_entry_data(config_entry.data)
+    ):
+        await topology_cache.async_set(host, topology)
+    if await async_topology_needs_reprobe(hass, config_entry):
+        async_schedule_reprobe(hass, config_entry, scheduler)
+
+    _LOGGER.debug("Setting up config entry %s", config_entry.entry_id)
+
+    # Show the last saved data until the DTU answers the first requests.
+    snapshot_store = HoymilesSnapshotStore(hass, config_entry.entry_id)
+    await snapshot_store.async_load()
+    hass_data[HASS_SNAPSHOT_STORE] = snapshot_store
+    for coordinator_key in HASS_COORDINATORS:
+        if coordinator_key in hass_data:
+            snapshot_store.async_restore(hass_data[coordinator_key])
+
+    if hybrid_inverters:
+        # Only PV panels and phases in the first response get entities.
+        await energy_storage_data_coordinator.async_config_entry_first_refresh()
+        reconciler.async_update_hybrid_inverters()
 
     hass.data[DOMAIN][config_entry.entry_id] = hass_data
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
     if single_phase_inverters or three_phase_inverters or meters:
         await data_coordinator.async_config_entry_first_refresh()
-        await config_coordinator.async_config_entry_first_refresh()
-        await app_info_update_coordinator.async_config_entry_first_refresh()
+        if config_entry.data.get(CONF_FAST_STARTUP, False):
+            # Config and app info are not needed to show live data, do not
+            # hold up the setup for them.
+            config_entry.async_create_background_task(
+                hass,
+                config_coordinator.async_refresh(),
+                f"{DOMAIN} config first refresh",
+            )
+            config_entry.async_create_background_task(
+                hass,
+                app_info_update_coordinator.async_refresh(),
+                f"{DOMAIN} app info first refresh",
+            )
+        else:
+            await config_coordinator.async_config_entry_first_refresh()
+            await app_info_update_coordinator.async_config_entry_first_refresh()
+    reconciler.async_start()
+    if single_phase_inverters or three_phase_inverters or meters:
+        hass.services.async_register(
+            domain=DOMAIN,
+            service="start_capture",
+            service_func=async_handle_start_capture,
+            schema=START_CAPTURE_SCHEMA,
+            supports_response=SupportsResponse.NONE,
+        )
     if hybrid_inverters:
-        await energy_storage_data_coordinator.async_config_entry_first_refresh()
         hass.services.async_register(
             domain=DOMAIN,
             service="set_bms_mode",
@@ -174,6 +307,11 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Remove the saved data of a removed config entry."""
+    await HoymilesSnapshotStore(hass, config_entry.entry_id).async_remove()
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
 ) -> bool:
@@ -196,16 +334,7 @@ async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
 
         host = config_entry.data.get(CONF_HOST)
         try:
-            (
-                dtu_sn,
-                single_phase_inverters,
-                three_phase_inverters,
-                ports,
-                meters,
-                hybrid_inverters,
-                is_encrypted,
-                enc_rand,
-            ) = await async_get_config_entry_data_for_host(host)
+            topology = await async_get_topology(hass, config_entry)
         except CannotConnect:
             _LOGGER.error(
                 "Could not retrieve real data information data from inverter: %s. Please ensure inverter is available!",
@@ -213,14 +342,7 @@ async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
             )
             return False
 
-        new[CONF_DTU_SERIAL_NUMBER] = dtu_sn
-        new[CONF_INVERTERS] = single_phase_inverters
-        new[CONF_THREE_PHASE_INVERTERS] = three_phase_inverters
-        new[CONF_PORTS] = ports
-        new[CONF_METERS] = meters
-        new[CONF_HYBRID_INVERTERS] = hybrid_inverters
-        new[CONF_IS_ENCRYPTED] = is_encrypted
-        new[CONF_ENC_RAND] = enc_rand
+        new.update(topology.as_entry_data())
 
         hass.config_entries.async_update_entry(
             config_entry, data=new, version=CONFIG_VERSION
@@ -235,7 +357,26 @@ async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    """Unload a config entry.
+
+    Listeners registered with async_on_unload, like the reconciler, the
+    midnight scheduler and a persistent DTU connection, are removed by Home
+    Assistant afterwards.
+    """
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
+    hass_data = hass.data[DOMAIN].pop(entry.entry_id)
+    for coordinator_key in HASS_COORDINATORS:
+        if coordinator_key in hass_data:
+            await hass_data[coordinator_key].async_shutdown()
+    await hass_data[HASS_SNAPSHOT_STORE].async_unload()
+
+    if not hass.data[DOMAIN]:
+        del hass.data[DOMAIN]
+        for service in SERVICES:
+            if hass.services.has_service(DOMAIN, service):
+                hass.services.async_remove(DOMAIN, service)
+                _LOGGER.debug("Service %s removed", service)
 
-    return unload_ok
+    return True
@@ -0,0 +1,89 @@
+"""Compiled attribute accessors for Hoymiles protobuf data."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import cache
+import re
+from typing import Any
+
+Accessor = Callable[[Any], Any]
+
+_SEGMENT_PATTERN = re.compile(r"^(\w*)((?:\[\d+\])*)$")
+_INDEX_PATTERN = re.compile(r"\[(\d+)\]")
+
+
+def parse_path(path: str) -> tuple[tuple[bool, str | int], ...]:
+    """Split an attribute path into (is_index, name or index) steps.
+
+    ``sgs_data[3].active_power`` becomes
+    ``((False, "sgs_data"), (True, 3), (False, "active_power"))``.
+    Segments that are not valid attribute or index expressions are kept as a
+    single attribute lookup, which resolves to None.
+    """
+    steps: list[tuple[bool, str | int]] = []
+
+    for segment in path.split("."):
+        match = _SEGMENT_PATTERN.match(segment)
+        if match is None:
+            steps.append((False, segment))
+            continue
+
+        name, indices = match.groups()
+        if name:
+            steps.append((False, name))
+        steps.extend((True, int(index)) for index in _INDEX_PATTERN.findall(indices))
+
+    return tuple(steps)
+
+
+@cache
+def compile_accessor(path: str) -> Accessor:
+    """Compile an attribute path into a function reading it from an object.
+
+    The returned accessor returns None whenever an attribute is missing or a
+    list index is out of range. Accessors are cached, so all entities reading
+    the same path share one accessor.
+    """
+    steps = parse_path(path)
+
+    shape = tuple(is_index for is_index, _ in steps)
+
+    if shape == (False,):
+        ((_, name),) = steps
+
+        def _accessor(obj: Any) -> Any:
+            return getattr(obj, name, None)
+
+    elif shape == (False, False):
+        (_, name), (_, attribute) = steps
+
+        def _accessor(obj: Any) -> Any:
+            return getattr(getattr(obj, name, None), attribute, None)
+
+    elif shape == (False, True, False):
+        (_, name), (_, index), (_, attribute) = steps
+
+        def _accessor(obj: Any) -> Any:
+            try:
+                item = getattr(obj, name, None)[index]
+            except (IndexError, TypeError):
+                return None
+            return getattr(item, attribute, None)
+
+    else:
+
+        def _accessor(obj: Any) -> Any:
+            for is_index, key in steps:
+                if obj is None:
+                    return None
+                if is_index:
+                    try:
+                        obj = obj[key]
+                    except (IndexError, KeyError, TypeError):
+                        return None
+                else:
+                    obj = getattr(obj, key, None)
+            return obj
+
+    return _accessor
@@ -15,12 +15,14 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from hoymiles_wifi.dtu import NetworkState
 
+from .breaker import CircuitState
 from .const import (
     CONF_DTU_SERIAL_NUMBER,
     DOMAIN,
     HASS_DATA_COORDINATOR,
     HASS_ENERGY_STORAGE_DATA_COORDINATOR,
 )
+from .coordinator import CONNECTIVITY_FIELD
 from .entity import HoymilesCoordinatorEntity, HoymilesEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
@@ -83,8 +85,10 @@ class HoymilesInverterSensorEntity(HoymilesCoordinatorEntity, BinarySensorEntity
     ):
         """Initialize the HoymilesInverterSensorEntity."""
         super().__init__(config_entry, description, coordinator)
-        self._dtu = coordinator.get_dtu()
+        # Only wake this entity when the connection state changed.
+        self.coordinator_context = CONNECTIVITY_FIELD
         self._native_value = None
+        self._circuit_state: CircuitState | None = None
 
         self.update_state_value()
 
@@ -99,10 +103,17 @@ class HoymilesInverterSensorEntity(HoymilesCoordinatorEntity, BinarySensorEntity
         """Return the state of the binary sensor."""
         return self._native_value
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state of the DTU's circuit breaker."""
+        return {"circuit_breaker": self._circuit_state.value}
+
     def update_state_value(self):
-        """Update the state value of the binary sensor based on the DTU's network state."""
-        dtu_state = self._dtu.get_state()
-        if dtu_state == NetworkState.Online:
+        """Update the state value of the binary sensor based on the DTU's circuit breaker and network state."""
+        dtu_state, self._circuit_state = self.coordinator.get_connectivity()
+        if self._circuit_state is not CircuitState.CLOSED:
+            self._native_value = False
+        elif dtu_state == NetworkState.Online:
             self._native_value = True
         elif dtu_state == NetworkState.Offline:
             self._native_value = False
@@ -0,0 +1,111 @@
+"""Circuit breaker for unreachable Hoymiles DTUs."""
+
+from __future__ import annotations
+
+from enum import Enum
+import logging
+import random
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Consecutive failed requests after which the breaker opens.
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BASE_BACKOFF_SECONDS = 30.0
+DEFAULT_MAX_BACKOFF_SECONDS = 60.0 * 15
+# Relative jitter applied to the backoff, so several DTUs do not retry in step.
+BACKOFF_JITTER = 0.2
+
+
+class CircuitState(Enum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop sending requests to a DTU that does not respond.
+
+    After a number of consecutive failures the breaker opens and rejects
+    requests. Once the backoff has passed, a single probe request is let
+    through (half-open). The breaker closes when the probe succeeds and opens
+    again with a doubled backoff when it fails.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        base_backoff: float = DEFAULT_BASE_BACKOFF_SECONDS,
+        max_backoff: float = DEFAULT_MAX_BACKOFF_SECONDS,
+    ) -> None:
+        """Initialize the circuit breaker."""
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self._retry_at = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until the next probe is let through."""
+        if self.state is not CircuitState.OPEN:
+            return 0.0
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent to the DTU."""
+        if self.state is CircuitState.CLOSED:
+            return True
+
+        if self.state is CircuitState.OPEN and time.monotonic() >= self._retry_at:
+            _LOGGER.debug("Circuit half-open, sending probe request")
+            self.state = CircuitState.HALF_OPEN
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """Record a request the DTU responded to."""
+        if self.state is not CircuitState.CLOSED:
+            _LOGGER.debug("DTU responded again, circuit closed")
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+
+    def record_failure(self) -> None:
+        """Record a request the DTU did not respond to."""
+        self.consecutive_failures += 1
+
+        if self.state is CircuitState.OPEN:
+            # A request that was already running when the circuit opened.
+            return
+
+        if (
+            self.state is CircuitState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def release_probe(self) -> None:
+        """Let the next request probe the DTU, if the probe was cancelled."""
+        if self.state is CircuitState.HALF_OPEN:
+            self.state = CircuitState.OPEN
+
+    def _open(self) -> None:
+        """Open the circuit and schedule the next probe."""
+        backoff = min(self.base_backoff * 2**self.opened_count, self.max_backoff)
+        backoff *= 1 + random.uniform(-BACKOFF_JITTER, BACKOFF_JITTER)
+
+        self.state = CircuitState.OPEN
+        self.opened_count += 1
+        self._retry_at = time.monotonic() + backoff
+
+        _LOGGER.debug(
+            "DTU did not respond %d times, circuit open for %.0fs",
+            self.consecutive_failures,
+            backoff,
+        )
@@ -12,16 +12,17 @@ from homeassistant.components.button import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from hoymiles_wifi.dtu import DTU
 
 from .const import (
     CONF_DTU_SERIAL_NUMBER,
     CONF_INVERTERS,
     CONF_THREE_PHASE_INVERTERS,
     DOMAIN,
-    HASS_DTU,
+    HASS_RECONCILER,
+    HASS_SCHEDULER,
 )
 from .entity import HoymilesEntity, HoymilesEntityDescription
+from .scheduler import HoymilesRequestScheduler, RequestPriority
 
 
 @dataclass(frozen=True)
@@ -75,34 +76,60 @@ async def async_setup_entry(
 ) -> None:
     """Set up the Hoymiles number entities."""
     hass_data = hass.data[DOMAIN][config_entry.entry_id]
-    dtu = hass_data[HASS_DTU]
+    scheduler = hass_data[HASS_SCHEDULER]
+    single_phase_inverters = config_entry.data.get(CONF_INVERTERS, [])
+    three_phase_inverters = config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
+    inverters = single_phase_inverters + three_phase_inverters
+
+    if any(inverters):
+        async_add_entities(get_buttons(config_entry, scheduler))
+
+        hass_data[HASS_RECONCILER].async_add_platform(
+            lambda serial_numbers: async_add_entities(
+                get_buttons(config_entry, scheduler, serial_numbers)
+            )
+        )
+
+
+def get_buttons(
+    config_entry: ConfigEntry,
+    scheduler: HoymilesRequestScheduler,
+    serial_numbers: set[str] | None = None,
+) -> list[ButtonEntity]:
+    """Get the buttons of the DTU and its inverters.
+
+    If serial_numbers is given, only buttons of these inverters are returned.
+    """
     dtu_serial_number = config_entry.data[CONF_DTU_SERIAL_NUMBER]
     single_phase_inverters = config_entry.data.get(CONF_INVERTERS, [])
     three_phase_inverters = config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
     inverters = single_phase_inverters + three_phase_inverters
 
-    if inverters:
-        buttons = []
-        for description in BUTTONS:
-            if description.is_dtu_sensor is True:
+    buttons = []
+    for description in BUTTONS:
+        if description.is_dtu_sensor is True:
+            if serial_numbers is not None:
+                continue
+            updated_description = dataclasses.replace(
+                description, serial_number=dtu_serial_number
+            )
+            buttons.append(
+                HoymilesButtonEntity(config_entry, updated_description, scheduler)
+            )
+        else:
+            for inverter_serial in inverters:
+                if inverter_serial is None or (
+                    serial_numbers is not None and inverter_serial not in serial_numbers
+                ):
+                    continue
+                new_key = description.key.replace("<inverter_serial>", inverter_serial)
                 updated_description = dataclasses.replace(
-                    description, serial_number=dtu_serial_number
+                    description, key=new_key, serial_number=inverter_serial
                 )
                 buttons.append(
-                    HoymilesButtonEntity(config_entry, updated_description, dtu)
+                    HoymilesButtonEntity(config_entry, updated_description, scheduler)
                 )
-            else:
-                for inverter_serial in inverters:
-                    new_key = description.key.replace(
-                        "<inverter_serial>", inverter_serial
-                    )
-                    updated_description = dataclasses.replace(
-                        description, key=new_key, serial_number=inverter_serial
-                    )
-                    buttons.append(
-                        HoymilesButtonEntity(config_entry, updated_description, dtu)
-                    )
-        async_add_entities(buttons)
+    return buttons
 
 
 class HoymilesButtonEntity(HoymilesEntity, ButtonEntity):
@@ -112,11 +139,12 @@ class HoymilesButtonEntity(HoymilesEntity, ButtonEntity):
         self,
         config_entry: ConfigEntry,
         description: HoymilesButtonEntityDescription,
-        dtu: DTU,
+        scheduler: HoymilesRequestScheduler,
     ) -> None:
         """Initialize the HoymilesButtonEntity."""
         super().__init__(config_entry, description)
-        self._dtu = dtu
+        self._scheduler = scheduler
+        self._dtu = scheduler.get_dtu()
 
     async def async_press(self) -> None:
         """Press the button."""
@@ -128,9 +156,13 @@ class HoymilesButtonEntity(HoymilesEntity, ButtonEntity):
             method_signature = signature(method)
             params = method_signature.parameters
             if "inverter_serial" in params:
-                await method(self.entity_description.serial_number)
+                await self._scheduler.async_request(
+                    RequestPriority.CONTROL,
+                    method,
+                    self.entity_description.serial_number,
+                )
             else:
-                await method()
+                await self._scheduler.async_request(RequestPriority.CONTROL, method)
         else:
             raise NotImplementedError(
                 f"Method '{self.entity_description.action}' not implemented in DTU class."
@@ -0,0 +1,47 @@
+"""Time-boxed high-rate capture of real data."""
+
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timedelta
+import time
+
+from homeassistant.util import dt as dt_util
+from hoymiles_wifi.protobuf import RealDataNew_pb2
+
+from .const import CAPTURE_BUFFER_SIZE
+
+
+class CaptureSession:
+    """Samples of real data polled as fast as the DTU allows.
+
+    All samples are kept in a ring buffer. Only one sample per publish
+    interval is passed on to the entities and the recorder.
+    """
+
+    def __init__(self, duration: timedelta, publish_interval: timedelta) -> None:
+        """Initialize the capture."""
+        self.started_at = dt_util.utcnow()
+        self.ends_at = self.started_at + duration
+        self.publish_interval = publish_interval
+        self.active = True
+        self.samples: deque[tuple[datetime, RealDataNew_pb2.RealDataNewReqDTO]] = deque(
+            maxlen=CAPTURE_BUFFER_SIZE
+        )
+        self.published = 0
+        self._last_published: float | None = None
+
+    def add_sample(self, response: RealDataNew_pb2.RealDataNewReqDTO) -> bool:
+        """Add a sample to the buffer, return whether it should be published."""
+        self.samples.append((dt_util.utcnow(), response))
+
+        now = time.monotonic()
+        if (
+            self._last_published is not None
+            and now - self._last_published < self.publish_interval.total_seconds()
+        ):
+            return False
+
+        self._last_published = now
+        self.published += 1
+        return True
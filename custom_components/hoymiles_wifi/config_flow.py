@@ -11,25 +11,24 @@ from homeassistant.const import CONF_HOST
 from homeassistant.data_entry_flow import FlowResult
 
 from .const import (
-    CONF_DTU_SERIAL_NUMBER,
-    CONF_HYBRID_INVERTERS,
-    CONF_INVERTERS,
-    CONF_METERS,
-    CONF_PORTS,
-    CONF_THREE_PHASE_INVERTERS,
     CONF_TIMEOUT,
     CONF_UPDATE_INTERVAL,
-    CONF_IS_ENCRYPTED,
-    CONF_ENC_RAND,
+    CONF_ADAPTIVE_POLLING,
+    CONF_MIN_UPDATE_INTERVAL,
+    CONF_MAX_UPDATE_INTERVAL,
+    CONF_FAST_STARTUP,
+    CONF_PERSISTENT_CONNECTION,
     CONFIG_VERSION,
     DEFAULT_TIMEOUT_SECONDS,
     DEFAULT_UPDATE_INTERVAL_SECONDS,
+    DEFAULT_MIN_UPDATE_INTERVAL_SECONDS,
+    DEFAULT_MAX_UPDATE_INTERVAL_SECONDS,
     DOMAIN,
     MIN_UPDATE_INTERVAL_SECONDS,
     MIN_TIMEOUT_SECONDS,
 )
 from .error import CannotConnect
-from .util import async_get_config_entry_data_for_host
+from .topology import async_probe_topology
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -50,6 +49,23 @@ DATA_SCHEMA = vol.Schema(
             vol.Coerce(int),
             vol.Range(min=timedelta(seconds=MIN_TIMEOUT_SECONDS).seconds),
         ),
+        vol.Optional(CONF_ADAPTIVE_POLLING, default=False): bool,
+        vol.Optional(
+            CONF_MIN_UPDATE_INTERVAL,
+            default=timedelta(seconds=DEFAULT_MIN_UPDATE_INTERVAL_SECONDS).seconds,
+        ): vol.All(
+            vol.Coerce(int),
+            vol.Range(min=timedelta(seconds=MIN_UPDATE_INTERVAL_SECONDS).seconds),
+        ),
+        vol.Optional(
+            CONF_MAX_UPDATE_INTERVAL,
+            default=timedelta(seconds=DEFAULT_MAX_UPDATE_INTERVAL_SECONDS).seconds,
+        ): vol.All(
+            vol.Coerce(int),
+            vol.Range(min=timedelta(seconds=MIN_UPDATE_INTERVAL_SECONDS).seconds),
+        ),
+        vol.Optional(CONF_FAST_STARTUP, default=False): bool,
+        vol.Optional(CONF_PERSISTENT_CONNECTION, default=False): bool,
     }
 )
 
@@ -71,22 +87,25 @@ class HoymilesInverterConfigFlowHandler(ConfigFlow, domain=DOMAIN):
                 CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL_SECONDS
             )
             timeout = user_input.get(CONF_TIMEOUT, DEFAULT_TIMEOUT_SECONDS)
+            adaptive_polling = user_input.get(CONF_ADAPTIVE_POLLING, False)
+            min_update_interval = user_input.get(
+                CONF_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL_SECONDS
+            )
+            max_update_interval = user_input.get(
+                CONF_MAX_UPDATE_INTERVAL, DEFAULT_MAX_UPDATE_INTERVAL_SECONDS
+            )
+            fast_startup = user_input.get(CONF_FAST_STARTUP, False)
+            persistent_connection = user_input.get(CONF_PERSISTENT_CONNECTION, False)
 
-            try:
-                (
-                    dtu_sn,
-                    single_phase_inverters,
-                    three_phase_inverters,
-                    ports,
-                    meters,
-                    hybrid_inverters,
-                    is_encrypted,
-                    enc_rand,
-                ) = await async_get_config_entry_data_for_host(host)
-            except CannotConnect:
-                errors["base"] = "cannot_connect"
+            if min_update_interval > max_update_interval:
+                errors[CONF_MAX_UPDATE_INTERVAL] = "invalid_update_interval_range"
             else:
-                await self.async_set_unique_id(dtu_sn)
+                try:
+                    topology = await async_probe_topology(self.hass, host)
+                except CannotConnect:
+                    errors["base"] = "cannot_connect"
+            if not errors:
+                await self.async_set_unique_id(topology.dtu_serial_number)
                 self._abort_if_unique_id_configured()
 
                 return self.async_create_entry(
@@ -94,15 +113,13 @@ class HoymilesInverterConfigFlowHandler(ConfigFlow, domain=DOMAIN):
                     data={
                         CONF_HOST: host,
                         CONF_UPDATE_INTERVAL: update_interval,
-                        CONF_DTU_SERIAL_NUMBER: dtu_sn,
-                        CONF_INVERTERS: single_phase_inverters,
-                        CONF_THREE_PHASE_INVERTERS: three_phase_inverters,
-                        CONF_PORTS: ports,
-                        CONF_METERS: meters,
-                        CONF_HYBRID_INVERTERS: hybrid_inverters,
-                        CONF_IS_ENCRYPTED: is_encrypted,
-                        CONF_ENC_RAND: enc_rand,
+                        **topology.as_entry_data(),
                         CONF_TIMEOUT: timeout,
+                        CONF_ADAPTIVE_POLLING: adaptive_polling,
+                        CONF_MIN_UPDATE_INTERVAL: min_update_interval,
+                        CONF_MAX_UPDATE_INTERVAL: max_update_interval,
+                        CONF_FAST_STARTUP: fast_startup,
+                        CONF_PERSISTENT_CONNECTION: persistent_connection,
                     },
                 )
 
@@ -127,37 +144,38 @@ class HoymilesInverterConfigFlowHandler(ConfigFlow, domain=DOMAIN):
             )
 
             timeout = user_input.get(CONF_TIMEOUT, DEFAULT_TIMEOUT_SECONDS)
+            adaptive_polling = user_input.get(CONF_ADAPTIVE_POLLING, False)
+            min_update_interval = user_input.get(
+                CONF_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL_SECONDS
+            )
+            max_update_interval = user_input.get(
+                CONF_MAX_UPDATE_INTERVAL, DEFAULT_MAX_UPDATE_INTERVAL_SECONDS
+            )
+            fast_startup = user_input.get(CONF_FAST_STARTUP, False)
+            persistent_connection = user_input.get(CONF_PERSISTENT_CONNECTION, False)
 
-            try:
-                (
-                    dtu_sn,
-                    single_phase_inverters,
-                    three_phase_inverters,
-                    ports,
-                    meters,
-                    hybrid_inverters,
-                    is_encrypted,
-                    enc_rand,
-                ) = await async_get_config_entry_data_for_host(host)
-            except CannotConnect:
-                errors["base"] = "cannot_connect"
-
+            if min_update_interval > max_update_interval:
+                errors[CONF_MAX_UPDATE_INTERVAL] = "invalid_update_interval_range"
             else:
-                if dtu_sn != entry.unique_id:
+                try:
+                    topology = await async_probe_topology(self.hass, host)
+                except CannotConnect:
+                    errors["base"] = "cannot_connect"
+
+            if not errors:
+                if topology.dtu_serial_number != entry.unique_id:
                     return self.async_abort(reason="another_device")
 
                 data = {
                     CONF_HOST: host,
                     CONF_UPDATE_INTERVAL: update_interval,
-                    CONF_DTU_SERIAL_NUMBER: dtu_sn,
-                    CONF_INVERTERS: single_phase_inverters,
-                    CONF_THREE_PHASE_INVERTERS: three_phase_inverters,
-                    CONF_PORTS: ports,
-                    CONF_METERS: meters,
-                    CONF_HYBRID_INVERTERS: hybrid_inverters,
-                    CONF_IS_ENCRYPTED: is_encrypted,
-                    CONF_ENC_RAND: enc_rand,
+                    **topology.as_entry_data(),
                     CONF_TIMEOUT: timeout,
+                    CONF_ADAPTIVE_POLLING: adaptive_polling,
+                    CONF_MIN_UPDATE_INTERVAL: min_update_interval,
+                    CONF_MAX_UPDATE_INTERVAL: max_update_interval,
+                    CONF_FAST_STARTUP: fast_startup,
+                    CONF_PERSISTENT_CONNECTION: persistent_connection,
                 }
 
                 self.hass.config_entries.async_update_entry(
@@ -190,6 +208,42 @@ class HoymilesInverterConfigFlowHandler(ConfigFlow, domain=DOMAIN):
                         vol.Coerce(int),
                         vol.Range(min=timedelta(seconds=MIN_TIMEOUT_SECONDS).seconds),
                     ),
+                    vol.Optional(
+                        CONF_ADAPTIVE_POLLING,
+                        default=entry.data.get(CONF_ADAPTIVE_POLLING, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_MIN_UPDATE_INTERVAL,
+                        default=entry.data.get(
+                            CONF_MIN_UPDATE_INTERVAL,
+                            DEFAULT_MIN_UPDATE_INTERVAL_SECONDS,
+                        ),
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(
+                            min=timedelta(seconds=MIN_UPDATE_INTERVAL_SECONDS).seconds
+                        ),
+                    ),
+                    vol.Optional(
+                        CONF_MAX_UPDATE_INTERVAL,
+                        default=entry.data.get(
+                            CONF_MAX_UPDATE_INTERVAL,
+                            DEFAULT_MAX_UPDATE_INTERVAL_SECONDS,
+                        ),
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(
+                            min=timedelta(seconds=MIN_UPDATE_INTERVAL_SECONDS).seconds
+                        ),
+                    ),
+                    vol.Optional(
+                        CONF_FAST_STARTUP,
+                        default=entry.data.get(CONF_FAST_STARTUP, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_PERSISTENT_CONNECTION,
+                        default=entry.data.get(CONF_PERSISTENT_CONNECTION, False),
+                    ): bool,
                 }
             ),
             errors=errors,
@@ -18,11 +18,53 @@ CONF_METERS = "meters"
 CONF_IS_ENCRYPTED = "is_encrypted"
 CONF_ENC_RAND = "enc_rand"
 CONF_TIMEOUT = "timeout"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_MIN_UPDATE_INTERVAL = "min_update_interval"
+CONF_MAX_UPDATE_INTERVAL = "max_update_interval"
+CONF_FAST_STARTUP = "fast_startup"
+CONF_PERSISTENT_CONNECTION = "persistent_connection"
 
 DEFAULT_UPDATE_INTERVAL_SECONDS = 35
 MIN_UPDATE_INTERVAL_SECONDS = 1
 DEFAULT_TIMEOUT_SECONDS = 10
 MIN_TIMEOUT_SECONDS = 1
+DEFAULT_MIN_UPDATE_INTERVAL_SECONDS = 10
+DEFAULT_MAX_UPDATE_INTERVAL_SECONDS = 60 * 5
+
+ENERGY_STORAGE_MAX_STALE_SECONDS = 60 * 10
+
+# The last data of every coordinator is saved at most once per minute and
+# restored after a restart if it is from the same day and not too old.
+SNAPSHOT_SAVE_DELAY_SECONDS = 60
+SNAPSHOT_MAX_AGE_SECONDS = 60 * 60
+
+# Entities created for a hybrid inverter until its PV panels and phases are
+# known from energy storage data or the registry.
+DEFAULT_HYBRID_PV_PANEL_COUNT = 2
+DEFAULT_HYBRID_PHASE_COUNT = 3
+
+# Devices reported by the DTU are compared with the config entry this often.
+# Missing devices are only removed after they were not reported for a day.
+RECONCILE_INTERVAL_SECONDS = 60 * 15
+RECONCILE_REMOVE_AFTER_SECONDS = 60 * 60 * 24
+
+# References to the last responses of every coordinator are kept for the
+# diagnostics download, they are only decoded when it is requested.
+DIAGNOSTICS_SNAPSHOT_COUNT = 5
+
+# Real data is polled at the minimum time the client waits between two
+# requests during a capture. Samples of the last hour are kept.
+CAPTURE_UPDATE_INTERVAL_SECONDS = 2
+CAPTURE_MAX_DURATION_SECONDS = 60 * 60
+CAPTURE_BUFFER_SIZE = CAPTURE_MAX_DURATION_SECONDS // CAPTURE_UPDATE_INTERVAL_SECONDS
+
+# A persistent connection is closed after this time without requests. It is
+# longer than the default update interval, so real data polls reuse it.
+CONNECTION_IDLE_TIMEOUT_SECONDS = 60
+CONNECTION_KEEPALIVE_SECONDS = 20
+
+# The power limit is only sent once the slider was not moved for this long.
+POWER_LIMIT_WRITE_DELAY_SECONDS = 1
 
 DEFAULT_CONFIG_UPDATE_INTERVAL_SECONDS = 60 * 5
 DEFAULT_APP_INFO_UPDATE_INTERVAL_SECONDS = 60 * 60 * 2
@@ -33,8 +75,21 @@ HASS_CONFIG_COORDINATOR = "config_coordinator"
 HASS_APP_INFO_COORDINATOR = "app_info_coordinator"
 HASS_ENERGY_STORAGE_DATA_COORDINATOR = "energy_stroage_data_coordinator"
 HASS_DTU = "dtu"
+HASS_SCHEDULER = "scheduler"
+HASS_RECONCILER = "reconciler"
+HASS_MIDNIGHT_SCHEDULER = "midnight_scheduler"
+HASS_SNAPSHOT_STORE = "snapshot_store"
+HASS_COORDINATORS = (
+    HASS_DATA_COORDINATOR,
+    HASS_CONFIG_COORDINATOR,
+    HASS_APP_INFO_COORDINATOR,
+    HASS_ENERGY_STORAGE_DATA_COORDINATOR,
+)
 HASS_DATA_UNSUB_OPTIONS_UPDATE_LISTENER = "unsub_options_update_listener"
 
+# Key of the topology cache in hass.data, shared by all config entries.
+DATA_TOPOLOGY_CACHE = f"{DOMAIN}_topology_cache"
+
 
 FCTN_GENERATE_DTU_VERSION_STRING = "generate_dtu_version_string"
 FCTN_GENERATE_INVERTER_HW_VERSION_STRING = "generate_version_string"
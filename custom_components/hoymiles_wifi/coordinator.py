@@ -1,37 +1,116 @@
 """Coordinator for Hoymiles integration."""
 
-from datetime import timedelta
+from array import array
+import asyncio
+import base64
+from collections import deque
+from collections.abc import Callable, Hashable
+import dataclasses
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 import logging
+import math
+import time
+from typing import Any
 
+from google.protobuf.json_format import MessageToDict
 import homeassistant
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, Platform
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers import sun
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from hoymiles_wifi.dtu import DTU
+from homeassistant.util import dt as dt_util
+from hoymiles_wifi.dtu import DTU, NetworkState
+from hoymiles_wifi.protobuf import (
+    APPInfomationData_pb2,
+    ESData_pb2,
+    GetConfig_pb2,
+    RealDataNew_pb2,
+)
 from .util import is_encrypted_dtu, async_check_and_update_enc_rand
 
 
-from .const import DOMAIN
+from .const import (
+    CAPTURE_UPDATE_INTERVAL_SECONDS,
+    DIAGNOSTICS_SNAPSHOT_COUNT,
+    DOMAIN,
+    ENERGY_STORAGE_MAX_STALE_SECONDS,
+)
+from .accessor import compile_accessor
+from .breaker import CircuitState
+from .capture import CaptureSession
+from .error import DTUUnreachable
+from .polling import AdaptivePollingPolicy, PollingStatistics
+from .scheduler import HoymilesRequestScheduler, RequestPriority, RequestStatistics
+from .snapshot import RealDataIndex, SnapshotLayout
+from .store import HoymilesSnapshotStore, is_snapshot_recent
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.SENSOR, Platform.NUMBER, Platform.BINARY_SENSOR, Platform.BUTTON]
 
+# Field of entities reading the connection state of the DTU instead of data.
+CONNECTIVITY_FIELD = "connectivity"
+
+
+@dataclass(frozen=True)
+class EnergyStorageRecord:
+    """Last good energy storage data of a hybrid inverter."""
+
+    data: ESData_pb2.ESDataReqDTO
+    last_updated: datetime
+    stale: bool = False
+
+
+def get_total_power(real_data: RealDataNew_pb2.RealDataNewReqDTO) -> float:
+    """Return the total AC power (W) of a real data response."""
+    if real_data.dtu_power:
+        return real_data.dtu_power / 10
+    return (
+        sum(
+            inverter.active_power
+            for inverter in (*real_data.sgs_data, *real_data.tgs_data)
+        )
+        / 10
+    )
+
 
 class HoymilesDataUpdateCoordinator(DataUpdateCoordinator):
     """Base data update coordinator for Hoymiles integration."""
 
+    # Key and protobuf message type of the data saved in the snapshot store.
+    SNAPSHOT_KEY: str | None = None
+    DATA_TYPE = None
+
     def __init__(
         self,
         hass: homeassistant,
         dtu: DTU,
+        scheduler: HoymilesRequestScheduler,
         config_entry: ConfigEntry,
         update_interval: timedelta,
     ) -> None:
         """Initialize the HoymilesCoordinatorEntity."""
         self._dtu = dtu
+        self._scheduler = scheduler
         self._hass = hass
         self._config_entry = config_entry
+        self._field_listeners: dict[Hashable, list[CALLBACK_TYPE]] = {}
+        self._field_values: dict[Hashable, Any] = {}
+        self._remove_field_dispatcher: CALLBACK_TYPE | None = None
+        self._last_dispatch_success: bool | None = None
+        self._last_dispatch_restored = False
+        self.field_updates_dispatched = 0
+        self.field_updates_suppressed = 0
+        self.snapshot_store: HoymilesSnapshotStore | None = None
+        self.request_statistics = RequestStatistics()
+        self.recent_data: deque[tuple[datetime, Any]] = deque(
+            maxlen=DIAGNOSTICS_SNAPSHOT_COUNT
+        )
+        self.data_restored = False
+        self.data_updated_at: datetime | None = None
 
         _LOGGER.debug(
             "Setup entry with update interval %s. IP: %s",
@@ -45,31 +124,359 @@ class HoymilesDataUpdateCoordinator(DataUpdateCoordinator):
         """Get the DTU object."""
         return self._dtu
 
+    def get_scheduler(self) -> HoymilesRequestScheduler:
+        """Get the request scheduler of the DTU."""
+        return self._scheduler
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE, context: Any = None
+    ) -> Callable[[], None]:
+        """Listen for data updates.
+
+        A listener that passes a field as context is only called when the value
+        of that field changed, or when the coordinator became (un)available.
+        """
+        if context is None:
+            return super().async_add_listener(update_callback, context)
+
+        if not self._field_listeners:
+            self._remove_field_dispatcher = super().async_add_listener(
+                self._async_dispatch_field_updates
+            )
+        self._field_listeners.setdefault(context, []).append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove field listener."""
+            listeners = self._field_listeners[context]
+            listeners.remove(update_callback)
+            if not listeners:
+                del self._field_listeners[context]
+                self._field_values.pop(context, None)
+            if not self._field_listeners and self._remove_field_dispatcher:
+                self._remove_field_dispatcher()
+                self._remove_field_dispatcher = None
+
+        return remove_listener
+
+    async def _async_update_data(self):
+        """Update data, or return cached data while the DTU is not responding."""
+        try:
+            data = await self._async_fetch_data()
+        except DTUUnreachable as err:
+            _LOGGER.debug(
+                "%s, retrying in %.0fs. Returning cached data",
+                err,
+                self._scheduler.circuit_breaker.retry_in,
+            )
+            return self.data
+
+        if not data and self.data_restored:
+            # A DTU is often slow to answer after a reboot, keep showing the
+            # restored data until it does or the data is too old.
+            if is_snapshot_recent(self.data_updated_at):
+                _LOGGER.debug(
+                    "No data received, keeping data restored from %s",
+                    self.data_updated_at,
+                )
+                return self.data
+            _LOGGER.debug("Data restored from %s expired", self.data_updated_at)
+
+        self.data_restored = False
+        if data and data is not self.data:
+            self.data_updated_at = dt_util.utcnow()
+            self.recent_data.append((self.data_updated_at, data))
+            if self.snapshot_store is not None:
+                self.snapshot_store.async_schedule_save()
+        return data
+
+    async def _async_fetch_data(self):
+        """Fetch data from the DTU."""
+        raise NotImplementedError
+
+    async def _async_request(
+        self,
+        priority: RequestPriority,
+        method: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """Send a request through the scheduler and record its statistics.
+
+        The latency does not include the time the request waited for the DTU.
+        """
+
+        async def _async_timed_request():
+            start = time.monotonic()
+            response = await method(*args, **kwargs)
+            self.request_statistics.record(
+                time.monotonic() - start,
+                response,
+                self._dtu.get_state() == NetworkState.Offline,
+            )
+            return response
+
+        return await self._scheduler.async_request(priority, _async_timed_request)
+
+    @callback
+    def async_set_restored_data(self, data: Any, updated_at: datetime) -> None:
+        """Set data restored from the snapshot store before the first refresh."""
+        self.data = data
+        self.data_restored = True
+        self.data_updated_at = updated_at
+
+    def dump_snapshot(self) -> Any:
+        """Serialize the data for the snapshot store."""
+        return base64.b64encode(self.data.SerializeToString()).decode()
+
+    def load_snapshot(self, stored: Any, updated_at: datetime) -> Any:
+        """Deserialize data saved by dump_snapshot."""
+        return self.DATA_TYPE.FromString(base64.b64decode(stored))
+
+    def dump_diagnostics(self, data: Any) -> dict[str, Any]:
+        """Decode data of recent_data for the diagnostics download."""
+        return MessageToDict(data, preserving_proto_field_name=True)
+
+    def dump_statistics(self) -> dict[str, Any]:
+        """Return statistics specific to the coordinator for the diagnostics."""
+        return {}
+
+    def get_field(
+        self,
+        path: str,
+        serial_number: str | None = None,
+        port_number: int | None = None,
+    ) -> Hashable:
+        """Get the field an entity reads for an attribute path.
+
+        The device of the entity is only used by coordinators indexing data by
+        device.
+        """
+        return compile_accessor(path)
+
+    def get_field_value(self, field: Hashable, data: Any) -> Any:
+        """Get the value of a field from the coordinator data."""
+        return field(data)
+
+    def get_connectivity(self) -> tuple[NetworkState, CircuitState]:
+        """Get the network state of the DTU and the state of its circuit breaker."""
+        return self._dtu.get_state(), self._scheduler.circuit_breaker.state
+
+    @callback
+    def _async_dispatch_field_updates(self) -> None:
+        """Call the listeners of all fields that changed since the last update."""
+        data = self.data
+        # Entities show restored data as assumed state, so they are all updated
+        # when live data replaces it.
+        availability_changed = (
+            self.last_update_success != self._last_dispatch_success
+            or self.data_restored != self._last_dispatch_restored
+        )
+        self._last_dispatch_success = self.last_update_success
+        self._last_dispatch_restored = self.data_restored
+
+        previous_values = self._field_values
+        values = {}
+
+        for field, listeners in list(self._field_listeners.items()):
+            if field == CONNECTIVITY_FIELD:
+                value = self.get_connectivity()
+            elif data is None:
+                value = None
+            else:
+                value = self.get_field_value(field, data)
+            values[field] = value
+
+            if (
+                availability_changed
+                or field not in previous_values
+                or previous_values[field] != value
+            ):
+                self.field_updates_dispatched += len(listeners)
+                for update_callback in list(listeners):
+                    update_callback()
+            else:
+                self.field_updates_suppressed += len(listeners)
+
+        self._field_values = values
+
 
 class HoymilesRealDataUpdateCoordinator(HoymilesDataUpdateCoordinator):
-    """Data coordinator for Hoymiles integration."""
+    """Data coordinator for Hoymiles integration.
 
-    async def _async_update_data(self):
+    Every response is indexed by device and flattened once into a snapshot.
+    Entities read their value from the snapshot by slot instead of from the
+    nested protobuf message.
+    """
+
+    SNAPSHOT_KEY = "real_data"
+    DATA_TYPE = RealDataNew_pb2.RealDataNewReqDTO
+
+    def __init__(
+        self,
+        hass: homeassistant,
+        dtu: DTU,
+        scheduler: HoymilesRequestScheduler,
+        config_entry: ConfigEntry,
+        update_interval: timedelta,
+        polling_policy: AdaptivePollingPolicy | None = None,
+    ) -> None:
+        """Initialize the HoymilesRealDataUpdateCoordinator."""
+        super().__init__(hass, dtu, scheduler, config_entry, update_interval)
+        self.snapshot_layout = SnapshotLayout()
+        self.snapshot = array("d")
+        self.index: RealDataIndex | None = None
+        self.polling_policy = polling_policy
+        self.polling_statistics = PollingStatistics()
+        # The last capture is kept for the diagnostics after it ended.
+        self.capture: CaptureSession | None = None
+        self._interval_before_capture: timedelta | None = None
+        self._cancel_capture: CALLBACK_TYPE | None = None
+        self._skip_listener_update = False
+        config_entry.async_on_unload(self.async_stop_capture)
+
+    @property
+    def capturing(self) -> bool:
+        """Return whether a capture is running."""
+        return self._cancel_capture is not None
+
+    async def async_start_capture(self, duration: timedelta) -> None:
+        """Poll real data as fast as the DTU allows for the given duration.
+
+        A running capture is replaced. The update interval is restored when
+        the capture ends.
+        """
+        if self.capturing:
+            self._cancel_capture()
+        else:
+            self._interval_before_capture = self.update_interval
+
+        _LOGGER.info(
+            "Capturing real data of %s for %s",
+            self._config_entry.data.get(CONF_HOST),
+            duration,
+        )
+        self.capture = CaptureSession(duration, self._interval_before_capture)
+        self._cancel_capture = async_call_later(
+            self._hass, duration, self._async_end_capture
+        )
+        self.update_interval = timedelta(seconds=CAPTURE_UPDATE_INTERVAL_SECONDS)
+        await self.async_refresh()
+
+    @callback
+    def async_stop_capture(self) -> None:
+        """Stop a running capture and restore the update interval."""
+        if not self.capturing:
+            return
+
+        self._cancel_capture()
+        self._cancel_capture = None
+        self.capture.active = False
+        self.update_interval = self._interval_before_capture
+        _LOGGER.info(
+            "Capture of %s ended with %d samples, %d published",
+            self._config_entry.data.get(CONF_HOST),
+            len(self.capture.samples),
+            self.capture.published,
+        )
+
+    @callback
+    def _async_end_capture(self, _now: datetime) -> None:
+        """End the capture once its duration passed."""
+        self.async_stop_capture()
+
+    async def async_shutdown(self) -> None:
+        """Stop a running capture and cancel any scheduled call."""
+        self.async_stop_capture()
+        await super().async_shutdown()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, unless the last capture sample was not published."""
+        skip = self._skip_listener_update and self.last_update_success
+        self._skip_listener_update = False
+        if not skip:
+            super().async_update_listeners()
+
+    def get_field(
+        self,
+        path: str,
+        serial_number: str | None = None,
+        port_number: int | None = None,
+    ) -> int:
+        """Get the snapshot slot of an attribute path.
+
+        Paths into the inverter, port and meter lists are bound to the record
+        of the given device, not to the list position.
+        """
+        return self.snapshot_layout.get_slot(path, serial_number, port_number)
+
+    def get_field_value(self, field: int, data: Any) -> int | None:
+        """Get the value of a snapshot slot.
+
+        All values in real data are integers, so they are returned as int.
+        """
+        if field >= len(self.snapshot):
+            # Slots were added after the last poll.
+            self.index = RealDataIndex(data)
+            self.snapshot = self.snapshot_layout.flatten(self.index)
+        value = self.snapshot[field]
+        if math.isnan(value):
+            return None
+        return int(value)
+
+    async def _async_fetch_data(self):
         """Update data via library."""
         _LOGGER.debug("Hoymiles data coordinator update")
 
-        response = await self._dtu.async_get_real_data_new()
+        response = await self._async_request(
+            RequestPriority.REAL_DATA, self._dtu.async_get_real_data_new
+        )
+
+        self.polling_statistics.record_poll(bool(response))
+
+        if self.capturing and dt_util.utcnow() >= self.capture.ends_at:
+            # The poll raced the end of the capture.
+            self.async_stop_capture()
+
+        if self.capturing:
+            if not response or not self.capture.add_sample(response):
+                # Only a downsampled stream is passed on to the entities, the
+                # listeners are not called for the other samples.
+                self._skip_listener_update = True
+                return self.data
+        elif self.polling_policy is not None:
+            self.update_interval = self.polling_policy.next_interval(
+                get_total_power(response) if response else None,
+                sun.is_up(self._hass),
+            )
+            _LOGGER.debug("Next real data poll in %s", self.update_interval)
 
         if not response:
             _LOGGER.debug(
                 "Unable to retrieve real data new. Inverter might be offline."
             )
+        else:
+            self.index = RealDataIndex(response)
+            self.snapshot = self.snapshot_layout.flatten(self.index)
+
         return response
 
 
 class HoymilesConfigUpdateCoordinator(HoymilesDataUpdateCoordinator):
     """Config coordinator for Hoymiles integration."""
 
-    async def _async_update_data(self):
+    SNAPSHOT_KEY = "config"
+    DATA_TYPE = GetConfig_pb2.GetConfigReqDTO
+
+    async def _async_fetch_data(self):
         """Update data via library."""
         _LOGGER.debug("Hoymiles data coordinator update")
 
-        response = await self._dtu.async_get_config()
+        response = await self._async_request(
+            RequestPriority.CONFIG, self._dtu.async_get_config
+        )
 
         if not response:
             _LOGGER.debug("Unable to retrieve config data. Inverter might be offline.")
@@ -80,11 +487,16 @@ class HoymilesConfigUpdateCoordinator(HoymilesDataUpdateCoordinator):
 class HoymilesAppInfoUpdateCoordinator(HoymilesDataUpdateCoordinator):
     """App Info coordinator for Hoymiles integration."""
 
-    async def _async_update_data(self):
+    SNAPSHOT_KEY = "app_info"
+    DATA_TYPE = APPInfomationData_pb2.APPInfoDataReqDTO
+
+    async def _async_fetch_data(self):
         """Update data via library."""
         _LOGGER.debug("Hoymiles data coordinator update")
 
-        response = await self._dtu.async_app_information_data()
+        response = await self._async_request(
+            RequestPriority.APP_INFO, self._dtu.async_app_information_data
+        )
 
         if response and response.dtu_info.dfs:
             if is_encrypted_dtu(response.dtu_info.dfs):
@@ -105,11 +517,13 @@ class HoymilesAppInfoUpdateCoordinator(HoymilesDataUpdateCoordinator):
 class HoymilesGatewayInfoUpdateCoordinator(HoymilesDataUpdateCoordinator):
     """Gateway Info coordinator for Hoymiles integration."""
 
-    async def _async_update_data(self):
+    async def _async_fetch_data(self):
         """Update data via library."""
         _LOGGER.debug("Hoymiles gateway info coordinator update")
 
-        response = await self._dtu.async_get_gateway_info()
+        response = await self._async_request(
+            RequestPriority.APP_INFO, self._dtu.async_get_gateway_info
+        )
 
         if not response:
             _LOGGER.debug("Unable to retrieve gateway info. Inverter might be offline.")
@@ -119,12 +533,14 @@ class HoymilesGatewayInfoUpdateCoordinator(HoymilesDataUpdateCoordinator):
 class HoymilesGatewayNetworkInfoUpdateCoordinator(HoymilesDataUpdateCoordinator):
     """Gateway Network Info coordinator for Hoymiles integration."""
 
-    async def _async_update_data(self):
+    async def _async_fetch_data(self):
         """Update data via library."""
         _LOGGER.debug("Hoymiles network info coordinator update")
 
-        response = await self._dtu.async_get_gateway_network_info(
-            dtu_serial_number=int(self._dtu_serial_number)
+        response = await self._async_request(
+            RequestPriority.APP_INFO,
+            self._dtu.async_get_gateway_network_info,
+            dtu_serial_number=int(self._dtu_serial_number),
         )
 
         if not response:
@@ -137,10 +553,14 @@ class HoymilesGatewayNetworkInfoUpdateCoordinator(HoymilesDataUpdateCoordinator)
 class HoymilesEnergyStorageUpdateCoordinator(HoymilesDataUpdateCoordinator):
     """Energy Storage Update coordinator for Hoymiles integration."""
 
+    SNAPSHOT_KEY = "energy_storage"
+    DATA_TYPE = ESData_pb2.ESDataReqDTO
+
     def __init__(
         self,
         hass: homeassistant,
         dtu: DTU,
+        scheduler: HoymilesRequestScheduler,
         config_entry: ConfigEntry,
         update_interval: timedelta,
         dtu_serial_number: int,
@@ -148,24 +568,153 @@ class HoymilesEnergyStorageUpdateCoordinator(HoymilesDataUpdateCoordinator):
     ) -> None:
         self._dtu_serial_number = dtu_serial_number
         self._inverters = inverters
-        super().__init__(hass, dtu, config_entry, update_interval)
-
-    async def _async_update_data(self):
-        """Update data via library."""
+        self.inverter_latencies: dict[int, float] = {}
+        self.cycle_time: float | None = None
+        self._records: dict[int, EnergyStorageRecord] = {}
+        super().__init__(hass, dtu, scheduler, config_entry, update_interval)
+
+    async def _async_fetch_data(self) -> dict[int, EnergyStorageRecord]:
+        """Update data via library.
+
+        Returns the last good data of every hybrid inverter keyed by its serial
+        number. Data of an inverter that did not respond is reused and marked
+        as stale until it is older than ENERGY_STORAGE_MAX_STALE_SECONDS.
+        """
         _LOGGER.debug("Hoymiles energy storage coordinator update")
 
-        responses = []
+        cycle_start = time.monotonic()
 
-        for inverter in self._inverters:
+        # Requests are queued at the scheduler together, so they are sent to the
+        # DTU back to back and control commands can still go first. The DTU
+        # answers one request at a time, so the cycle takes the sum of the
+        # inverter latencies.
+        storage_data = await asyncio.gather(
+            *(self._async_get_inverter_data(inverter) for inverter in self._inverters)
+        )
+        self.cycle_time = time.monotonic() - cycle_start
+        _LOGGER.debug(
+            "Energy storage update of %d inverters took %.2fs",
+            len(self._inverters),
+            self.cycle_time,
+        )
+
+        now = dt_util.utcnow()
+        max_age = timedelta(seconds=ENERGY_STORAGE_MAX_STALE_SECONDS)
+
+        for inverter, data in zip(self._inverters, storage_data):
+            inverter_serial_number = inverter["inverter_serial_number"]
+            record = self._records.get(inverter_serial_number)
+
+            if data is not None:
+                self._records[inverter_serial_number] = EnergyStorageRecord(
+                    data=data, last_updated=now
+                )
+            elif record is None:
+                continue
+            elif now - record.last_updated > max_age:
+                _LOGGER.debug(
+                    "Dropping stale energy storage data of inverter %s",
+                    inverter_serial_number,
+                )
+                del self._records[inverter_serial_number]
+            elif not record.stale:
+                _LOGGER.debug(
+                    "Unable to retrieve energy storage data of inverter %s. Reusing data from %s",
+                    inverter_serial_number,
+                    record.last_updated,
+                )
+                self._records[inverter_serial_number] = dataclasses.replace(
+                    record, stale=True
+                )
+
+        if not any(data is not None for data in storage_data):
+            _LOGGER.debug(
+                "Unable to retrieve energy storage data. Inverter might be offline."
+            )
+        return dict(self._records)
+
+    @callback
+    def async_set_restored_data(
+        self, data: dict[int, EnergyStorageRecord], updated_at: datetime
+    ) -> None:
+        """Set restored records, they are reused like records of a failed poll."""
+        super().async_set_restored_data(data, updated_at)
+        self._records = dict(data)
+
+    def dump_snapshot(self) -> dict[str, dict[str, str]]:
+        """Serialize the records of all inverters for the snapshot store."""
+        return {
+            str(inverter_serial_number): {
+                "updated_at": record.last_updated.isoformat(),
+                "data": base64.b64encode(record.data.SerializeToString()).decode(),
+            }
+            for inverter_serial_number, record in self.data.items()
+        }
+
+    def dump_diagnostics(
+        self, data: dict[int, EnergyStorageRecord]
+    ) -> dict[str, dict[str, Any]]:
+        """Decode the records of recent_data for the diagnostics download."""
+        return {
+            str(inverter_serial_number): {
+                "updated_at": record.last_updated.isoformat(),
+                "stale": record.stale,
+                "data": MessageToDict(record.data, preserving_proto_field_name=True),
+            }
+            for inverter_serial_number, record in data.items()
+        }
+
+    def dump_statistics(self) -> dict[str, Any]:
+        """Return the duration of the last cycle and the latency of each inverter."""
+        return {
+            "cycle_time": self.cycle_time,
+            "inverter_latencies": {
+                str(inverter_serial_number): latency
+                for inverter_serial_number, latency in self.inverter_latencies.items()
+            },
+        }
+
+    def load_snapshot(
+        self, stored: dict[str, dict[str, str]], updated_at: datetime
+    ) -> dict[int, EnergyStorageRecord]:
+        """Deserialize records saved by dump_snapshot, marked as stale."""
+        return {
+            int(inverter_serial_number): EnergyStorageRecord(
+                data=self.DATA_TYPE.FromString(base64.b64decode(record["data"])),
+                last_updated=dt_util.parse_datetime(record["updated_at"]),
+                stale=True,
+            )
+            for inverter_serial_number, record in stored.items()
+        }
+
+    def get_field_value(self, field: Hashable, data: Any) -> Any:
+        """Get the value of a (inverter serial number, accessor) field."""
+        inverter_serial_number, accessor = field
+        record = data.get(inverter_serial_number)
+        if record is None:
+            return None
+        return record.stale, accessor(record.data)
+
+    async def _async_get_inverter_data(self, inverter: dict):
+        """Get the energy storage data of a single inverter."""
+        inverter_serial_number = inverter["inverter_serial_number"]
+
+        async def _async_request():
+            request_start = time.monotonic()
             storage_data = await self._dtu.async_get_energy_storage_data(
                 dtu_serial_number=int(self._dtu_serial_number),
-                inverter_serial_number=inverter["inverter_serial_number"],
+                inverter_serial_number=inverter_serial_number,
             )
-            if storage_data is not None:
-                responses.append(storage_data)
-
-        if not responses:
+            latency = time.monotonic() - request_start
+            self.inverter_latencies[inverter_serial_number] = latency
             _LOGGER.debug(
-                "Unable to retrieve energy storage data. Inverter might be offline."
+                "Energy storage data of inverter %s took %.2fs",
+                inverter_serial_number,
+                latency,
             )
-        return responses
+            return storage_data
+
+        try:
+            return await self._async_request(RequestPriority.REAL_DATA, _async_request)
+        except DTUUnreachable:
+            return None
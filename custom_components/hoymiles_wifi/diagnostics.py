@@ -0,0 +1,139 @@
+"""Diagnostics support for Hoymiles."""
+
+from __future__ import annotations
+
+from collections import Counter
+import dataclasses
+from typing import Any
+
+from google.protobuf.json_format import MessageToDict
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .capture import CaptureSession
+from .const import (
+    CONF_ENC_RAND,
+    DOMAIN,
+    HASS_COORDINATORS,
+    HASS_DATA_COORDINATOR,
+    HASS_DTU,
+    HASS_SCHEDULER,
+)
+from .coordinator import HoymilesDataUpdateCoordinator
+from .transport import PersistentConnectionDTU
+
+# Keys of the config entry and of decoded DTU responses.
+TO_REDACT = {
+    CONF_ENC_RAND,
+    "wifi_ssid",
+    "wifi_password",
+    "apn_name",
+    "apn_password",
+    "dtu_ap_ssid",
+    "dtu_ap_pass",
+    "lock_password",
+    "gprs_imei",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    Statistics are only read and responses only decoded here, nothing is
+    collected for the diagnostics while polling.
+    """
+    hass_data = hass.data[DOMAIN][config_entry.entry_id]
+    scheduler = hass_data[HASS_SCHEDULER]
+    dtu = hass_data[HASS_DTU]
+
+    entity_registry = er.async_get(hass)
+    entities = Counter(
+        entity.domain
+        for entity in er.async_entries_for_config_entry(
+            entity_registry, config_entry.entry_id
+        )
+    )
+
+    return async_redact_data(
+        {
+            "config_entry": config_entry.as_dict(),
+            "scheduler": {
+                **dataclasses.asdict(scheduler.statistics),
+                "average_wait": scheduler.statistics.average_wait,
+                "queue_depth": scheduler.queue_depth,
+                "circuit_breaker": {
+                    "state": scheduler.circuit_breaker.state.value,
+                    "consecutive_failures": (
+                        scheduler.circuit_breaker.consecutive_failures
+                    ),
+                    "opened_count": scheduler.circuit_breaker.opened_count,
+                },
+            },
+            "connection": (
+                {
+                    "connected": dtu.connected,
+                    "connections_opened": dtu.connections_opened,
+                    "reconnects": dtu.reconnects,
+                }
+                if isinstance(dtu, PersistentConnectionDTU)
+                else None
+            ),
+            "coordinators": {
+                key: _coordinator_diagnostics(hass_data[key])
+                for key in HASS_COORDINATORS
+                if key in hass_data
+            },
+            "entities": dict(entities),
+            "capture": _capture_diagnostics(
+                getattr(hass_data.get(HASS_DATA_COORDINATOR), "capture", None)
+            ),
+        },
+        TO_REDACT,
+    )
+
+
+def _coordinator_diagnostics(
+    coordinator: HoymilesDataUpdateCoordinator,
+) -> dict[str, Any]:
+    """Return the statistics and recent data of a coordinator."""
+    return {
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": (
+            coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None
+        ),
+        "data_restored": coordinator.data_restored,
+        "requests": coordinator.request_statistics.as_dict(),
+        "statistics": coordinator.dump_statistics(),
+        "recent_data": [
+            {
+                "updated_at": updated_at.isoformat(),
+                "data": coordinator.dump_diagnostics(data),
+            }
+            for updated_at, data in coordinator.recent_data
+        ],
+    }
+
+
+def _capture_diagnostics(capture: CaptureSession | None) -> dict[str, Any] | None:
+    """Return all samples of the last capture."""
+    if capture is None:
+        return None
+    return {
+        "active": capture.active,
+        "started_at": capture.started_at.isoformat(),
+        "ends_at": capture.ends_at.isoformat(),
+        "published": capture.published,
+        "samples": [
+            {
+                "received_at": received_at.isoformat(),
+                "data": MessageToDict(data, preserving_proto_field_name=True),
+            }
+            for received_at, data in capture.samples
+        ],
+    }
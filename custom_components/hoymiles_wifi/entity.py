@@ -1,13 +1,16 @@
 """Entity base for Hoymiles entities."""
 
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 import logging
 
 from enum import Enum
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity import Entity, EntityDescription
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from hoymiles_wifi.hoymiles import (
     DTUType,
@@ -43,6 +46,11 @@ class HoymilesEntityDescription(EntityDescription):
     phase: str = None
 
 
+def get_unique_id(config_entry_id: str, key: str) -> str:
+    """Get the unique ID of the entity of a config entry with an entity key."""
+    return f"hoymiles_{config_entry_id}_{key}"
+
+
 class HoymilesEntity(Entity):
     """Base class for Hoymiles entities."""
 
@@ -53,7 +61,7 @@ class HoymilesEntity(Entity):
         super().__init__()
         self.entity_description = description
         self._config_entry = config_entry
-        self._attr_unique_id = f"hoymiles_{config_entry.entry_id}_{description.key}"
+        self._attr_unique_id = get_unique_id(config_entry.entry_id, description.key)
 
         if description.port_number:
             self._attr_translation_placeholders = {
@@ -114,3 +122,30 @@ class HoymilesCoordinatorEntity(CoordinatorEntity, HoymilesEntity):
         """Pass coordinator to CoordinatorEntity."""
         CoordinatorEntity.__init__(self, coordinator)
         HoymilesEntity.__init__(self, config_entry, description)
+        self._cancel_scheduled_state_write: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_schedule_state_write(self, delay: timedelta) -> None:
+        """Write the state again after a delay, even if the data did not change.
+
+        Entities that set a field as coordinator_context are only updated when
+        that field changes. This is used when the state depends on time as well.
+        """
+        if self._cancel_scheduled_state_write is not None:
+            self._cancel_scheduled_state_write()
+        self._cancel_scheduled_state_write = async_call_later(
+            self.hass, max(delay, timedelta()), self._async_write_scheduled_state
+        )
+
+    @callback
+    def _async_write_scheduled_state(self, _now: datetime) -> None:
+        """Write the state scheduled by async_schedule_state_write."""
+        self._cancel_scheduled_state_write = None
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a scheduled state write when the entity is removed."""
+        await super().async_will_remove_from_hass()
+        if self._cancel_scheduled_state_write is not None:
+            self._cancel_scheduled_state_write()
+            self._cancel_scheduled_state_write = None
@@ -5,3 +5,7 @@ from homeassistant.exceptions import HomeAssistantError
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
+
+
+class DTUUnreachable(HomeAssistantError):
+    """Error to indicate the DTU circuit breaker rejected a request."""
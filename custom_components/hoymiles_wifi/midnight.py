@@ -0,0 +1,60 @@
+"""Reset daily values of Hoymiles entities at midnight."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_change
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HoymilesMidnightScheduler:
+    """Call the reset callbacks of all entities of a config entry at midnight.
+
+    A single time listener is used for all entities. It follows the time zone
+    and clock of Home Assistant and only runs while callbacks are registered.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._callbacks: list[Callable[[], None]] = []
+        self._unsub_time_change: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_register(self, reset: Callable[[], None]) -> CALLBACK_TYPE:
+        """Register a callback called at midnight, return a function removing it."""
+        self._callbacks.append(reset)
+        if self._unsub_time_change is None:
+            self._unsub_time_change = async_track_time_change(
+                self._hass, self._async_midnight, hour=0, minute=0, second=0
+            )
+
+        @callback
+        def remove() -> None:
+            """Remove the callback."""
+            if reset in self._callbacks:
+                self._callbacks.remove(reset)
+            if not self._callbacks:
+                self.async_stop()
+
+        return remove
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the time listener and forget all callbacks."""
+        self._callbacks.clear()
+        if self._unsub_time_change is not None:
+            self._unsub_time_change()
+            self._unsub_time_change = None
+
+    @callback
+    def _async_midnight(self, now: datetime) -> None:
+        """Reset the daily values of all registered entities."""
+        _LOGGER.debug("Resetting %d daily values", len(self._callbacks))
+        for reset in list(self._callbacks):
+            reset()
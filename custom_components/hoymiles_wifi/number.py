@@ -23,8 +23,7 @@ from .const import (
     HASS_CONFIG_COORDINATOR,
 )
 from .entity import HoymilesCoordinatorEntity, HoymilesEntityDescription
-
-from hoymiles_wifi.hoymiles import DTUType, get_dtu_model_type
+from .power_limit import PowerLimitWriter
 
 
 class SetAction(Enum):
@@ -77,7 +76,7 @@ async def async_setup_entry(
     three_phase_inverters = config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
     dtu_serial_number = config_entry.data[CONF_DTU_SERIAL_NUMBER]
 
-    if single_phase_inverters or three_phase_inverters:
+    if any(single_phase_inverters) or any(three_phase_inverters):
         sensors = []
         for description in CONFIG_CONTROL_ENTITIES:
             if description.is_dtu_sensor is True:
@@ -103,61 +102,93 @@ class HoymilesNumberEntity(HoymilesCoordinatorEntity, NumberEntity):
     ) -> None:
         """Initialize the HoymilesNumberEntity."""
         super().__init__(config_entry, description, coordinator)
-        self._attribute_name = description.key
+        # Only wake this entity when the value it reads changed.
+        self.coordinator_context = coordinator.get_field(
+            description.key, description.serial_number, description.port_number
+        )
         self._conversion_factor = description.conversion_factor
         self._set_action = description.set_action
         self._native_value = None
-        self._assumed_state = False
+        self._attr_assumed_state = False
+        self._power_limit_writer: PowerLimitWriter | None = None
 
         self.update_state_value()
 
+    async def async_added_to_hass(self) -> None:
+        """Create the power limit writer when added to hass."""
+        await super().async_added_to_hass()
+        if self._set_action == SetAction.POWER_LIMIT:
+            self._power_limit_writer = PowerLimitWriter(
+                self.hass,
+                self._config_entry,
+                self.coordinator,
+                update_callback=self._handle_power_limit_written,
+            )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop a power limit that was not written yet."""
+        await super().async_will_remove_from_hass()
+        if self._power_limit_writer is not None:
+            self._power_limit_writer.async_cancel()
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         self.update_state_value()
         super()._handle_coordinator_update()
 
+    @callback
+    def _handle_power_limit_written(self) -> None:
+        """Show the power limit reported by the DTU once it was written."""
+        self.update_state_value()
+        self.async_write_ha_state()
+
     @property
     def native_value(self) -> float:
         """Get the native value of the entity."""
         return self._native_value
 
-    @property
-    def assumed_state(self):
-        """Return the assumed state of the entity."""
-        return self._assumed_state
-
     async def async_set_native_value(self, value: float) -> None:
         """Set the native value of the entity.
 
+        The power limit is written once the value stopped changing, until
+        then the value set last is shown as assumed state.
+
         Args:
             value (float): The value to set.
         """
         if self._set_action == SetAction.POWER_LIMIT:
-            dtu = self.coordinator.get_dtu()
-            if value < 0 and value > 100:
+            if value < 0 or value > 100:
                 _LOGGER.error("Power limit value out of range")
                 return
-            await dtu.async_set_power_limit(value)
-            await self.coordinator.async_request_refresh()
+            self._power_limit_writer.async_set(value)
         else:
             _LOGGER.error("Invalid set action!")
             return
 
-        self._assumed_state = True
+        self._attr_assumed_state = True
         self._native_value = value
+        self.async_write_ha_state()
 
     def update_state_value(self):
         """Update the state value of the entity."""
 
+        # Keep showing a value set by the user until it was written.
+        if (
+            self._power_limit_writer is not None
+            and self._power_limit_writer.pending is not None
+        ):
+            return
+
         # For the moment, we can only retrive the power limit
-        self._native_value = getattr(
-            self.coordinator.data,
-            self._attribute_name,
-            None,
-        )
+        if self.coordinator.data is None:
+            self._native_value = None
+        else:
+            self._native_value = self.coordinator.get_field_value(
+                self.coordinator_context, self.coordinator.data
+            )
 
-        self._assumed_state = False
+        self._attr_assumed_state = False
 
         if self._native_value is not None and self._conversion_factor is not None:
             self._native_value *= self._conversion_factor
@@ -0,0 +1,113 @@
+"""Adaptive polling for the Hoymiles real data coordinator."""
+
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timedelta
+import time
+
+from homeassistant.util import dt as dt_util
+
+# Relative power change between two polls above which polling speeds up.
+FAST_CHANGE_RATIO = 0.1
+# Relative power change below which the power is considered stable.
+STABLE_CHANGE_RATIO = 0.02
+# Power changes below this value (W) are noise and never speed up polling.
+MIN_POWER_CHANGE = 10.0
+# Factor by which the interval grows while power is stable or the DTU is silent.
+BACKOFF_FACTOR = 1.5
+
+POLL_STATISTICS_WINDOW = timedelta(days=1)
+
+
+class AdaptivePollingPolicy:
+    """Choose the interval until the next real data poll.
+
+    Polling backs off towards the maximum interval at night, after repeated
+    empty responses and while power is stable. It drops to the minimum
+    interval as soon as power changes quickly.
+    """
+
+    def __init__(
+        self,
+        min_interval: timedelta,
+        max_interval: timedelta,
+        base_interval: timedelta,
+    ) -> None:
+        """Initialize the policy."""
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.base_interval = self._clamp(base_interval)
+        self.interval = self.base_interval
+        self.empty_responses = 0
+        self._last_power: float | None = None
+
+    def _clamp(self, interval: timedelta) -> timedelta:
+        """Keep an interval between the minimum and maximum interval."""
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def next_interval(self, power: float | None, sun_up: bool) -> timedelta:
+        """Return the interval until the next poll.
+
+        power is the total AC power (W) of the last response, or None if the
+        DTU did not return any data.
+        """
+        if power is None:
+            self.empty_responses += 1
+            interval = self.interval
+            if self.empty_responses > 1:
+                interval = self.interval * BACKOFF_FACTOR
+        else:
+            self.empty_responses = 0
+            interval = self.base_interval
+
+            if self._last_power is not None:
+                change = abs(power - self._last_power)
+                reference = max(power, self._last_power)
+
+                if change >= max(MIN_POWER_CHANGE, FAST_CHANGE_RATIO * reference):
+                    interval = self.min_interval
+                elif change <= max(MIN_POWER_CHANGE, STABLE_CHANGE_RATIO * reference):
+                    interval = max(self.interval, self.base_interval) * BACKOFF_FACTOR
+
+        if not sun_up:
+            interval = self.max_interval
+
+        self._last_power = power
+        self.interval = self._clamp(interval)
+        return self.interval
+
+
+class PollingStatistics:
+    """Measure how often the DTU is polled and how fresh the data is."""
+
+    def __init__(self) -> None:
+        """Initialize the statistics."""
+        self._polls: deque[float] = deque()
+        self.last_data_received: datetime | None = None
+
+    def record_poll(self, has_data: bool) -> None:
+        """Record a poll and whether it returned data."""
+        self._polls.append(time.monotonic())
+        self._purge()
+        if has_data:
+            self.last_data_received = dt_util.utcnow()
+
+    def _purge(self) -> None:
+        """Forget polls that are older than the statistics window."""
+        oldest = time.monotonic() - POLL_STATISTICS_WINDOW.total_seconds()
+        while self._polls and self._polls[0] < oldest:
+            self._polls.popleft()
+
+    @property
+    def polls_per_day(self) -> int:
+        """Return the number of polls within the last 24 hours."""
+        self._purge()
+        return len(self._polls)
+
+    @property
+    def data_age(self) -> timedelta | None:
+        """Return the age of the last data received from the DTU."""
+        if self.last_data_received is None:
+            return None
+        return dt_util.utcnow() - self.last_data_received
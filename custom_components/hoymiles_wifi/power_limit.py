@@ -0,0 +1,129 @@
+"""Coalesced writes of the power limit of a DTU."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, POWER_LIMIT_WRITE_DELAY_SECONDS
+from .coordinator import HoymilesConfigUpdateCoordinator
+from .scheduler import RequestPriority
+
+_LOGGER = logging.getLogger(__name__)
+
+# The DTU reports the power limit in 0.1 %.
+POWER_LIMIT_SCALE = 10
+
+
+class PowerLimitWriter:
+    """Write the power limit once it stopped changing.
+
+    A slider sets many values in quick succession, only the last one is sent
+    after a quiet period. It is not sent if the DTU already reports it, and
+    the config is read back once after it was sent. update_callback is called
+    once the pending value was handled.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        coordinator: HoymilesConfigUpdateCoordinator,
+        delay: timedelta = timedelta(seconds=POWER_LIMIT_WRITE_DELAY_SECONDS),
+        update_callback: CALLBACK_TYPE | None = None,
+    ) -> None:
+        """Initialize the writer."""
+        self._hass = hass
+        self._config_entry = config_entry
+        self._coordinator = coordinator
+        self._delay = delay
+        self._update_callback = update_callback
+        self._lock = asyncio.Lock()
+        self._cancel_write: CALLBACK_TYPE | None = None
+        self.pending: float | None = None
+        self.writes = 0
+        self.skipped_writes = 0
+
+    def is_confirmed(self, value: float) -> bool:
+        """Return whether the DTU reported the power limit last time."""
+        limit = getattr(self._coordinator.data, "limit_power_mypower", None)
+        return limit is not None and round(value * POWER_LIMIT_SCALE) == limit
+
+    @callback
+    def async_set(self, value: float) -> None:
+        """Write the power limit in percent after the quiet period."""
+        self.pending = value
+        if self._cancel_write is not None:
+            self._cancel_write()
+        self._cancel_write = async_call_later(
+            self._hass, self._delay, self._async_write_pending
+        )
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop the pending power limit."""
+        if self._cancel_write is not None:
+            self._cancel_write()
+            self._cancel_write = None
+        self.pending = None
+
+    @callback
+    def _async_write_pending(self, _now: datetime) -> None:
+        """Write the pending power limit once the quiet period passed."""
+        self._cancel_write = None
+        self._config_entry.async_create_background_task(
+            self._hass, self.async_flush(), f"{DOMAIN} power limit write"
+        )
+
+    async def async_flush(self) -> None:
+        """Write the pending power limit now."""
+        if self._cancel_write is not None:
+            self._cancel_write()
+            self._cancel_write = None
+
+        async with self._lock:
+            value = self.pending
+            self.pending = None
+            if value is None:
+                return
+
+            if self.is_confirmed(value):
+                _LOGGER.debug("Power limit is already %s%%", value)
+                self.skipped_writes += 1
+                self._async_notify()
+                return
+
+            dtu = self._coordinator.get_dtu()
+            response = await self._coordinator.get_scheduler().async_request(
+                RequestPriority.CONTROL, dtu.async_set_power_limit, value
+            )
+            self.writes += 1
+            if response is None:
+                _LOGGER.warning(
+                    "Setting the power limit of %s to %s%% was not acknowledged",
+                    self._config_entry.data.get(CONF_HOST),
+                    value,
+                )
+
+            # A single read of the config confirms the last value.
+            await self._coordinator.async_refresh()
+            if not self.is_confirmed(value):
+                _LOGGER.warning(
+                    "Power limit of %s is not %s%% after setting it",
+                    self._config_entry.data.get(CONF_HOST),
+                    value,
+                )
+            # The readback only wakes the entity if the power limit changed.
+            self._async_notify()
+
+    @callback
+    def _async_notify(self) -> None:
+        """Call the update callback."""
+        if self._update_callback is not None:
+            self._update_callback()
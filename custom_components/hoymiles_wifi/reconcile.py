@@ -0,0 +1,323 @@
+"""Reconcile the devices of a config entry with the devices reported by the DTU."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_HYBRID_INVERTERS,
+    CONF_INVERTERS,
+    CONF_METERS,
+    CONF_PORTS,
+    CONF_THREE_PHASE_INVERTERS,
+    DEFAULT_HYBRID_PHASE_COUNT,
+    DEFAULT_HYBRID_PV_PANEL_COUNT,
+    DOMAIN,
+    RECONCILE_INTERVAL_SECONDS,
+    RECONCILE_REMOVE_AFTER_SECONDS,
+)
+from .coordinator import (
+    HoymilesEnergyStorageUpdateCoordinator,
+    HoymilesRealDataUpdateCoordinator,
+)
+from .entity import get_unique_id
+from .sensor import get_hybrid_inverter_sensor_keys
+from .topology import (
+    Topology,
+    async_get_topology_cache,
+    device_identity,
+    merge_devices,
+)
+from .util import get_energy_storage_counts, get_real_data_devices
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_KEYS = (CONF_INVERTERS, CONF_THREE_PHASE_INVERTERS, CONF_PORTS, CONF_METERS)
+
+# Counts of a hybrid inverter with their default.
+HYBRID_COUNTS = (
+    ("pv_panel_count", DEFAULT_HYBRID_PV_PANEL_COUNT),
+    ("phase_count", DEFAULT_HYBRID_PHASE_COUNT),
+)
+
+
+class HoymilesTopologyReconciler:
+    """Add and remove devices reported by the DTU without reloading the entry.
+
+    A device is added after two passes in a row reported it. A device is only
+    removed after the DTU reported other devices but not this one for a day.
+    The PV panel and phase counts of hybrid inverters follow their live energy
+    storage data.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        coordinator: HoymilesRealDataUpdateCoordinator | None,
+        energy_storage_coordinator: (
+            HoymilesEnergyStorageUpdateCoordinator | None
+        ) = None,
+    ) -> None:
+        """Initialize the reconciler."""
+        self._hass = hass
+        self._config_entry = config_entry
+        self._coordinator = coordinator
+        self._energy_storage_coordinator = energy_storage_coordinator
+        self._platforms: list[Callable[[set[str]], None]] = []
+        self._pending: dict[str, list] | None = None
+        self._pending_since: datetime | None = None
+
+    @callback
+    def async_add_platform(self, add_devices: Callable[[set[str]], None]) -> None:
+        """Register a callback adding the entities of new devices to a platform."""
+        self._platforms.append(add_devices)
+
+    @callback
+    def async_start(self) -> None:
+        """Reconcile periodically until the config entry is unloaded."""
+        self._config_entry.async_on_unload(
+            async_track_time_interval(
+                self._hass,
+                self.async_reconcile,
+                timedelta(seconds=RECONCILE_INTERVAL_SECONDS),
+            )
+        )
+
+    async def async_reconcile(self, _now: datetime | None = None) -> None:
+        """Compare the reported devices with the config entry."""
+        self._async_reconcile_hybrid_inverters()
+        if self._coordinator is not None:
+            await self._async_reconcile_devices()
+
+    async def _async_reconcile_devices(self) -> None:
+        """Compare the devices in the real data with the config entry."""
+        coordinator = self._coordinator
+        if (
+            coordinator.data is None
+            or coordinator.data_restored
+            or not coordinator.last_update_success
+        ):
+            return
+
+        reported = dict(zip(DEVICE_KEYS, get_real_data_devices(coordinator.data)))
+        if not any(reported.values()):
+            # The DTU does not report any device at night.
+            return
+
+        configured = {key: self._config_entry.data.get(key, []) for key in DEVICE_KEYS}
+        if _identities(reported) == _identities(configured):
+            self._pending = None
+            return
+
+        if self._pending is None or _identities(self._pending) != _identities(reported):
+            self._pending = reported
+            self._pending_since = dt_util.utcnow()
+            return
+
+        added = _serial_numbers(reported) - _serial_numbers(configured)
+        removed = _serial_numbers(configured) - _serial_numbers(reported)
+        if removed and dt_util.utcnow() - self._pending_since < timedelta(
+            seconds=RECONCILE_REMOVE_AFTER_SECONDS
+        ):
+            return
+
+        self._pending = None
+        await self._async_apply(
+            _merge(configured, reported),
+            added,
+            removed,
+            _has_new_ports(configured, reported, added),
+        )
+
+    async def _async_apply(
+        self,
+        devices: dict[str, list],
+        added: set[str],
+        removed: set[str],
+        reload: bool,
+    ) -> None:
+        """Update the config entry, devices and entities."""
+        config_entry = self._config_entry
+        host = config_entry.data[CONF_HOST]
+        _LOGGER.info(
+            "Devices of %s changed, added: %s, removed: %s",
+            host,
+            sorted(added),
+            sorted(removed),
+        )
+
+        self._hass.config_entries.async_update_entry(
+            config_entry, data={**config_entry.data, **devices}
+        )
+        await async_get_topology_cache(self._hass).async_set(
+            host, Topology.from_entry_data(config_entry.data)
+        )
+
+        device_registry = dr.async_get(self._hass)
+        entity_registry = er.async_get(self._hass)
+        for serial_number in removed:
+            device = device_registry.async_get_device(
+                identifiers={(DOMAIN, serial_number)}
+            )
+            if device is None:
+                continue
+            for entity in er.async_entries_for_device(
+                entity_registry, device.id, include_disabled_entities=True
+            ):
+                if entity.config_entry_id == config_entry.entry_id:
+                    entity_registry.async_remove(entity.entity_id)
+            device_registry.async_update_device(
+                device.id, remove_config_entry_id=config_entry.entry_id
+            )
+
+        if reload:
+            _LOGGER.info("Ports or meters of %s changed, reloading", host)
+            self._hass.config_entries.async_schedule_reload(config_entry.entry_id)
+            return
+
+        if added:
+            for add_devices in self._platforms:
+                add_devices(added)
+
+    @callback
+    def async_update_hybrid_inverters(self) -> list[tuple[int, dict, dict]]:
+        """Update the PV panel and phase counts of the hybrid inverters.
+
+        Counts are only taken from live energy storage data. Returns the
+        position, old and new config entry data of every changed inverter.
+        """
+        coordinator = self._energy_storage_coordinator
+        if coordinator is None or not coordinator.data:
+            return []
+
+        inverters = list(self._config_entry.data.get(CONF_HYBRID_INVERTERS, []))
+        changes = []
+        for index, inverter in enumerate(inverters):
+            if inverter is None:
+                continue
+            record = coordinator.data.get(inverter["inverter_serial_number"])
+            if record is None or record.stale:
+                continue
+
+            pv_panel_count, phase_count = get_energy_storage_counts(record.data)
+            updated = {**inverter, "pv_panel_count": pv_panel_count}
+            if phase_count:
+                updated["phase_count"] = phase_count
+            if updated != inverter:
+                inverters[index] = updated
+                changes.append((index, inverter, updated))
+
+        if changes:
+            self._hass.config_entries.async_update_entry(
+                self._config_entry,
+                data={**self._config_entry.data, CONF_HYBRID_INVERTERS: inverters},
+            )
+        return changes
+
+    @callback
+    def _async_reconcile_hybrid_inverters(self) -> None:
+        """Remove or add entities of changed hybrid inverter counts.
+
+        Entities of PV panels and phases that no longer exist are removed. If
+        there are more, the entry is reloaded to create their entities.
+        """
+        config_entry = self._config_entry
+        device_registry = dr.async_get(self._hass)
+        entity_registry = er.async_get(self._hass)
+        reload = False
+
+        for index, old, new in self.async_update_hybrid_inverters():
+            _LOGGER.info(
+                "Hybrid inverter %s changed from %s to %s",
+                new["inverter_serial_number"],
+                old,
+                new,
+            )
+            if any(
+                new.get(key, default) > old.get(key, default)
+                for key, default in HYBRID_COUNTS
+            ):
+                reload = True
+
+            removed_unique_ids = {
+                get_unique_id(config_entry.entry_id, key)
+                for key in get_hybrid_inverter_sensor_keys(index, old)
+                - get_hybrid_inverter_sensor_keys(index, new)
+            }
+            device = device_registry.async_get_device(
+                identifiers={(DOMAIN, str(new["inverter_serial_number"]))}
+            )
+            if not removed_unique_ids or device is None:
+                continue
+            for entity in er.async_entries_for_device(
+                entity_registry, device.id, include_disabled_entities=True
+            ):
+                if (
+                    entity.config_entry_id == config_entry.entry_id
+                    and entity.unique_id in removed_unique_ids
+                ):
+                    entity_registry.async_remove(entity.entity_id)
+
+        if reload:
+            self._hass.config_entries.async_schedule_reload(config_entry.entry_id)
+
+
+def _serial_number(device: str | dict[str, Any]) -> str:
+    """Return the serial number of an inverter, port or meter."""
+    if isinstance(device, str):
+        return device
+    return device.get("inverter_serial_number") or device["meter_serial_number"]
+
+
+def _identities(devices: dict[str, list]) -> dict[str, set]:
+    """Return the identities of all devices, without removed ones."""
+    return {
+        key: {device_identity(device) for device in devices[key] if device is not None}
+        for key in devices
+    }
+
+
+def _serial_numbers(devices: dict[str, list]) -> set[str]:
+    """Return the serial numbers of all devices, without removed ones."""
+    return {
+        _serial_number(device)
+        for key in DEVICE_KEYS
+        for device in devices[key]
+        if device is not None
+    }
+
+
+def _merge(configured: dict[str, list], reported: dict[str, list]) -> dict[str, list]:
+    """Return the configured devices with removed ones left as None.
+
+    See merge_devices, entity keys contain the position of a device in the
+    config entry.
+    """
+    return {key: merge_devices(configured[key], reported[key]) for key in DEVICE_KEYS}
+
+
+def _has_new_ports(
+    configured: dict[str, list], reported: dict[str, list], added: set[str]
+) -> bool:
+    """Return whether a new port or meter type belongs to an existing device.
+
+    Entities are only added for new devices, so the entry is reloaded then.
+    """
+    configured_identities = _identities(configured)
+    return any(
+        device_identity(device) not in configured_identities[key]
+        and _serial_number(device) not in added
+        for key in DEVICE_KEYS
+        for device in reported[key]
+    )
@@ -0,0 +1,221 @@
+"""Request scheduler for Hoymiles DTUs."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import Any, TypeVar
+
+from hoymiles_wifi.dtu import DTU, NetworkState
+
+from .breaker import CircuitBreaker
+from .error import DTUUnreachable
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Number of recent requests latency percentiles are calculated from.
+REQUEST_STATISTICS_SAMPLES = 100
+
+
+class RequestPriority(IntEnum):
+    """Priority of a DTU request. Lower values are served first."""
+
+    CONTROL = 0
+    REAL_DATA = 1
+    CONFIG = 2
+    APP_INFO = 3
+
+
+@dataclass
+class SchedulerStatistics:
+    """Statistics collected by the request scheduler."""
+
+    requests: int = 0
+    max_queue_depth: int = 0
+    last_wait: float = 0.0
+    max_wait: float = 0.0
+    total_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """Return the average time a request waited for the DTU."""
+        if self.requests == 0:
+            return 0.0
+        return self.total_wait / self.requests
+
+
+class RequestStatistics:
+    """Latency and outcome of the requests of a single request type.
+
+    Counters are kept since Home Assistant started. Latency percentiles are
+    calculated from the last REQUEST_STATISTICS_SAMPLES requests.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the statistics."""
+        self.requests = 0
+        self.timeouts = 0
+        self.empty_responses = 0
+        self.bytes_decoded = 0
+        self._latencies: deque[float] = deque(maxlen=REQUEST_STATISTICS_SAMPLES)
+
+    def record(self, latency: float, response: Any, timed_out: bool) -> None:
+        """Record a request.
+
+        timed_out is whether the DTU could not be reached, a response that
+        could not be decoded is empty.
+        """
+        self.requests += 1
+        self._latencies.append(latency)
+        if response is not None:
+            self.bytes_decoded += response.ByteSize()
+        elif timed_out:
+            self.timeouts += 1
+        else:
+            self.empty_responses += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics for the diagnostics download."""
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "empty_responses": self.empty_responses,
+            "bytes_decoded": self.bytes_decoded,
+            "latency_median": self.latency_percentile(50),
+            "latency_p95": self.latency_percentile(95),
+            "latencies": list(self._latencies),
+        }
+
+    def latency_percentile(self, percentile: float) -> float | None:
+        """Return a percentile (0-100) of the recent latencies in seconds."""
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        rank = math.ceil(percentile / 100 * len(latencies))
+        return latencies[max(rank, 1) - 1]
+
+
+class HoymilesRequestScheduler:
+    """Serialize all requests sent to a single DTU.
+
+    The DTU only handles one request at a time. Every caller (coordinators,
+    buttons, number entities and services) submits its request here and
+    waits for its turn. Waiting requests are served by priority first and
+    in submission order second.
+
+    The scheduler also owns the circuit breaker of the DTU. While it is open,
+    all requests except control requests are rejected with DTUUnreachable.
+    """
+
+    def __init__(self, dtu: DTU) -> None:
+        """Initialize the scheduler."""
+        self._dtu = dtu
+        self._busy = False
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.statistics = SchedulerStatistics()
+        self.circuit_breaker = CircuitBreaker()
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of requests waiting for the DTU."""
+        return len(self._waiters)
+
+    def get_dtu(self) -> DTU:
+        """Get the DTU object."""
+        return self._dtu
+
+    async def async_request(
+        self,
+        priority: RequestPriority,
+        method: Callable[..., Awaitable[_T]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> _T:
+        """Run a DTU request once all higher priority requests are done."""
+        enqueued_at = time.monotonic()
+        await self._async_acquire(priority)
+        self._record_wait(time.monotonic() - enqueued_at)
+
+        try:
+            if (
+                not self.circuit_breaker.allow_request()
+                and priority is not RequestPriority.CONTROL
+            ):
+                raise DTUUnreachable(f"DTU {self._dtu.host} is not responding")
+
+            try:
+                result = await method(*args, **kwargs)
+            except asyncio.CancelledError:
+                self.circuit_breaker.release_probe()
+                raise
+            except Exception:
+                self.circuit_breaker.record_failure()
+                raise
+        finally:
+            self._release()
+
+        if self._dtu.get_state() == NetworkState.Offline:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        return result
+
+    async def _async_acquire(self, priority: RequestPriority) -> None:
+        """Wait until the DTU is free for a request with the given priority."""
+        if not self._busy:
+            self._busy = True
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._waiters, waiter)
+        self.statistics.max_queue_depth = max(
+            self.statistics.max_queue_depth, len(self._waiters)
+        )
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over to us, pass it on to the next waiter.
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self) -> None:
+        """Hand the DTU over to the next waiting request."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy = False
+
+    def _record_wait(self, wait: float) -> None:
+        """Record the time a request waited for the DTU."""
+        statistics = self.statistics
+        statistics.requests += 1
+        statistics.last_wait = wait
+        statistics.total_wait += wait
+        statistics.max_wait = max(statistics.max_wait, wait)
+
+        if wait > 1:
+            _LOGGER.debug(
+                "Request waited %.2fs for DTU %s (queue depth: %d)",
+                wait,
+                self._dtu.host,
+                self.queue_depth,
+            )
@@ -1,11 +1,12 @@
 """Support for Hoymiles sensors."""
 
+from collections.abc import Callable
 import dataclasses
 from dataclasses import dataclass
-from datetime import datetime, time, timedelta
+from datetime import datetime, timedelta
 from enum import Enum
 import logging
-import re
+from typing import Any
 
 from homeassistant.components.sensor import (
     RestoreSensor,
@@ -22,15 +23,19 @@ from homeassistant.const import (
     UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfFrequency,
+    UnitOfInformation,
     UnitOfPower,
     UnitOfTemperature,
+    UnitOfTime,
     UnitOfReactivePower,
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
 import hoymiles_wifi.hoymiles
 from hoymiles_wifi.hoymiles import DTUType, get_dtu_model_type
 
+from .accessor import compile_accessor
 from .const import (
     CONF_DTU_SERIAL_NUMBER,
     CONF_INVERTERS,
@@ -38,6 +43,8 @@ from .const import (
     CONF_METERS,
     CONF_PORTS,
     CONF_THREE_PHASE_INVERTERS,
+    DEFAULT_HYBRID_PHASE_COUNT,
+    DEFAULT_HYBRID_PV_PANEL_COUNT,
     DOMAIN,
     FCTN_GENERATE_DTU_VERSION_STRING,
     FCTN_GENERATE_INVERTER_HW_VERSION_STRING,
@@ -46,7 +53,10 @@ from .const import (
     HASS_CONFIG_COORDINATOR,
     HASS_DATA_COORDINATOR,
     HASS_ENERGY_STORAGE_DATA_COORDINATOR,
+    HASS_MIDNIGHT_SCHEDULER,
+    HASS_RECONCILER,
 )
+from .coordinator import HoymilesRealDataUpdateCoordinator
 from .entity import (
     HoymilesCoordinatorEntity,
     HoymilesEntityDescription,
@@ -55,6 +65,27 @@ from .entity import (
 
 _LOGGER = logging.getLogger(__name__)
 
+# How long the last known value is kept when an inverter suddenly reports 0.
+LAST_KNOWN_VALUE_TIMEOUT = timedelta(minutes=3)
+
+# Changes of measurements within these deadbands are not written to the state
+# machine, unless the state was not written for MAX_WRITE_INTERVAL.
+POWER_DEADBAND = 1.0
+VOLTAGE_DEADBAND = 0.5
+CURRENT_DEADBAND = 0.05
+FREQUENCY_DEADBAND = 0.02
+TEMPERATURE_DEADBAND = 0.5
+MAX_WRITE_INTERVAL = timedelta(minutes=5)
+
+DEVICE_CLASS_DEADBANDS = {
+    SensorDeviceClass.POWER: POWER_DEADBAND,
+    SensorDeviceClass.REACTIVE_POWER: POWER_DEADBAND,
+    SensorDeviceClass.VOLTAGE: VOLTAGE_DEADBAND,
+    SensorDeviceClass.CURRENT: CURRENT_DEADBAND,
+    SensorDeviceClass.FREQUENCY: FREQUENCY_DEADBAND,
+    SensorDeviceClass.TEMPERATURE: TEMPERATURE_DEADBAND,
+}
+
 
 class ConversionAction(Enum):
     """Enumeration for conversion actions."""
@@ -73,13 +104,22 @@ class HoymilesSensorEntityDescription(
 ):
     """Describes Hoymiles data sensor entity."""
 
-    conversion_factor: float = None
+    conversion_factor: float | None = None
     reset_at_midnight: bool = False
     version_translation_function: str = None
     version_prefix: str = None
     assume_state: bool = False
     requires_device_type: int = DeviceType.ALL_DEVICES
     force_keep_maximum_within_day: bool = False
+    # Changes smaller than the absolute deadband or the relative deadband (a
+    # fraction of the last written value) are not written. The deadband
+    # defaults to the one of the device class. The state is written at most
+    # every min_write_interval and at least every max_write_interval while
+    # the value changes.
+    deadband: float | None = None
+    relative_deadband: float | None = None
+    min_write_interval: timedelta | None = None
+    max_write_interval: timedelta | None = MAX_WRITE_INTERVAL
 
 
 @dataclass(frozen=True)
@@ -89,7 +129,7 @@ class HoymilesEnergyStorageSensorEntityDescription(
     """Describes Hoymiles energy storage data sensor entity."""
 
     model_name: str = None
-    conversion_factor: float = None
+    conversion_factor: float | None = None
     reset_at_midnight: bool = False
     version_translation_function: str = None
     version_prefix: str = None
@@ -107,6 +147,15 @@ class HoymilesDiagnosticEntityDescription(
     separator: str = None
 
 
+@dataclass(frozen=True)
+class HoymilesCoordinatorDiagnosticEntityDescription(
+    HoymilesEntityDescription, SensorEntityDescription
+):
+    """Describes a sensor reporting on a Hoymiles coordinator itself."""
+
+    value_fn: Callable[[HoymilesRealDataUpdateCoordinator], Any] = None
+
+
 HOYMILES_SENSORS = [
     HoymilesSensorEntityDescription(
         key="dtu_power",
@@ -594,6 +643,108 @@ CONFIG_DIAGNOSTIC_SENSORS = [
     ),
 ]
 
+POLLING_DIAGNOSTIC_SENSORS: tuple[
+    HoymilesCoordinatorDiagnosticEntityDescription, ...
+] = (
+    HoymilesCoordinatorDiagnosticEntityDescription(
+        key="polls_per_day",
+        translation_key="polls_per_day",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:counter",
+        is_dtu_sensor=True,
+        value_fn=lambda coordinator: coordinator.polling_statistics.polls_per_day,
+    ),
+    HoymilesCoordinatorDiagnosticEntityDescription(
+        key="update_interval",
+        translation_key="update_interval",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        is_dtu_sensor=True,
+        value_fn=lambda coordinator: coordinator.update_interval.total_seconds(),
+    ),
+    HoymilesCoordinatorDiagnosticEntityDescription(
+        key="last_data_received",
+        translation_key="last_data_received",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        is_dtu_sensor=True,
+        value_fn=lambda coordinator: (
+            coordinator.polling_statistics.last_data_received
+        ),
+    ),
+)
+
+
+def _latency_ms(coordinator, percentile: float) -> float | None:
+    """Return a latency percentile of the requests of a coordinator in ms."""
+    latency = coordinator.request_statistics.latency_percentile(percentile)
+    if latency is None:
+        return None
+    return round(latency * 1000)
+
+
+def get_request_diagnostic_sensors(
+    key_prefix: str,
+) -> tuple[HoymilesCoordinatorDiagnosticEntityDescription, ...]:
+    """Get the sensors reporting on the requests of a coordinator."""
+    return (
+        HoymilesCoordinatorDiagnosticEntityDescription(
+            key=f"{key_prefix}_request_latency_median",
+            translation_key=f"{key_prefix}_request_latency_median",
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            device_class=SensorDeviceClass.DURATION,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+            is_dtu_sensor=True,
+            value_fn=lambda coordinator: _latency_ms(coordinator, 50),
+        ),
+        HoymilesCoordinatorDiagnosticEntityDescription(
+            key=f"{key_prefix}_request_latency_p95",
+            translation_key=f"{key_prefix}_request_latency_p95",
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            device_class=SensorDeviceClass.DURATION,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            is_dtu_sensor=True,
+            value_fn=lambda coordinator: _latency_ms(coordinator, 95),
+        ),
+        HoymilesCoordinatorDiagnosticEntityDescription(
+            key=f"{key_prefix}_request_timeouts",
+            translation_key=f"{key_prefix}_request_timeouts",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            icon="mdi:timer-alert-outline",
+            is_dtu_sensor=True,
+            value_fn=lambda coordinator: coordinator.request_statistics.timeouts,
+        ),
+        HoymilesCoordinatorDiagnosticEntityDescription(
+            key=f"{key_prefix}_request_empty_responses",
+            translation_key=f"{key_prefix}_request_empty_responses",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+            icon="mdi:message-alert-outline",
+            is_dtu_sensor=True,
+            value_fn=lambda coordinator: (
+                coordinator.request_statistics.empty_responses
+            ),
+        ),
+        HoymilesCoordinatorDiagnosticEntityDescription(
+            key=f"{key_prefix}_request_bytes_decoded",
+            translation_key=f"{key_prefix}_request_bytes_decoded",
+            native_unit_of_measurement=UnitOfInformation.BYTES,
+            device_class=SensorDeviceClass.DATA_SIZE,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+            is_dtu_sensor=True,
+            value_fn=lambda coordinator: coordinator.request_statistics.bytes_decoded,
+        ),
+    )
+
+
 APP_INFO_SENSORS: tuple[HoymilesSensorEntityDescription, ...] = (
     HoymilesSensorEntityDescription(
         key="dtu_info.dtu_sw_version",
@@ -1156,9 +1307,6 @@ async def async_setup_entry(
     """Set up sensor platform."""
 
     hass_data = hass.data[DOMAIN][config_entry.entry_id]
-    data_coordinator = hass_data.get(HASS_DATA_COORDINATOR, None)
-    config_coordinator = hass_data.get(HASS_CONFIG_COORDINATOR, None)
-    app_info_coordinator = hass_data.get(HASS_APP_INFO_COORDINATOR, None)
     energy_storage_data_coordinator = hass_data.get(
         HASS_ENERGY_STORAGE_DATA_COORDINATOR, None
     )
@@ -1166,106 +1314,187 @@ async def async_setup_entry(
     single_phase_inverters = config_entry.data.get(CONF_INVERTERS, [])
     three_phase_inverters = config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
     hybrid_inverters = config_entry.data.get(CONF_HYBRID_INVERTERS, [])
-    meters = config_entry.data.get(CONF_METERS, [])
     inverters = single_phase_inverters + three_phase_inverters
-    ports = config_entry.data[CONF_PORTS]
     sensors = []
 
     # Real Data Sensors
 
-    if inverters:
-        for description in HOYMILES_SENSORS:
-            device_class = description.device_class
-            if device_class == SensorDeviceClass.ENERGY:
-                class_name = HoymilesEnergySensorEntity
-            else:
-                class_name = HoymilesDataSensorEntity
+    if any(inverters):
+        sensors.extend(get_real_data_sensors(config_entry, hass_data))
 
-            if "sgs_data" in description.key and single_phase_inverters:
-                sensor_entities = get_sensors_for_description(
-                    config_entry,
-                    description,
-                    data_coordinator,
-                    class_name,
-                    dtu_serial_number,
-                    single_phase_inverters,
-                    [],
-                )
-                sensors.extend(sensor_entities)
+        reconciler = hass_data[HASS_RECONCILER]
+        reconciler.async_add_platform(
+            lambda serial_numbers: async_add_entities(
+                get_real_data_sensors(config_entry, hass_data, serial_numbers)
+            )
+        )
 
-            elif "tgs_data" in description.key and three_phase_inverters:
-                sensor_entities = get_sensors_for_description(
-                    config_entry,
-                    description,
-                    data_coordinator,
-                    class_name,
-                    dtu_serial_number,
-                    three_phase_inverters,
-                    [],
-                )
-                sensors.extend(sensor_entities)
-            elif "meter" in description.key and meters:
-                sensor_entities = get_sensors_for_description(
+    if any(hybrid_inverters):
+        for description in HOYMILES_ENERGY_STORAGE_SENSORS:
+            sensor_entities = get_sensors_for_hybrid_inverter_description(
+                config_entry,
+                description,
+                energy_storage_data_coordinator,
+                HoymilesEnergyStorageSensorEntity,
+                dtu_serial_number,
+                hybrid_inverters,
+            )
+            sensors.extend(sensor_entities)
+
+        for description in get_request_diagnostic_sensors("energy_storage"):
+            sensors.extend(
+                get_sensors_for_description(
                     config_entry,
                     description,
-                    data_coordinator,
-                    class_name,
+                    energy_storage_data_coordinator,
+                    HoymilesCoordinatorDiagnosticSensorEntity,
                     dtu_serial_number,
                     [],
                     [],
-                    meters,
                 )
-                sensors.extend(sensor_entities)
+            )
 
-            else:
-                sensor_entities = get_sensors_for_description(
-                    config_entry,
-                    description,
-                    data_coordinator,
-                    class_name,
-                    dtu_serial_number,
-                    [],
-                    ports,
-                )
-                sensors.extend(sensor_entities)
+    async_add_entities(sensors)
+
+
+def get_real_data_sensors(
+    config_entry: ConfigEntry,
+    hass_data: dict[str, Any],
+    serial_numbers: set[str] | None = None,
+) -> list[SensorEntity]:
+    """Get the sensors of the real data, config and app info coordinators.
+
+    If serial_numbers is given, only sensors of these devices are returned.
+    """
+
+    data_coordinator = hass_data.get(HASS_DATA_COORDINATOR, None)
+    config_coordinator = hass_data.get(HASS_CONFIG_COORDINATOR, None)
+    app_info_coordinator = hass_data.get(HASS_APP_INFO_COORDINATOR, None)
+    dtu_serial_number = config_entry.data[CONF_DTU_SERIAL_NUMBER]
+    single_phase_inverters = config_entry.data.get(CONF_INVERTERS, [])
+    three_phase_inverters = config_entry.data.get(CONF_THREE_PHASE_INVERTERS, [])
+    meters = config_entry.data.get(CONF_METERS, [])
+    inverters = single_phase_inverters + three_phase_inverters
+    ports = config_entry.data[CONF_PORTS]
+    sensors = []
+
+    for description in HOYMILES_SENSORS:
+        device_class = description.device_class
+        if device_class == SensorDeviceClass.ENERGY:
+            class_name = HoymilesEnergySensorEntity
+        else:
+            class_name = HoymilesDataSensorEntity
 
-        for description in CONFIG_DIAGNOSTIC_SENSORS:
+        if "sgs_data" in description.key and single_phase_inverters:
             sensor_entities = get_sensors_for_description(
                 config_entry,
                 description,
-                config_coordinator,
-                HoymilesDiagnosticSensorEntity,
+                data_coordinator,
+                class_name,
                 dtu_serial_number,
-                inverters,
-                ports,
+                single_phase_inverters,
+                [],
+                serial_numbers=serial_numbers,
             )
             sensors.extend(sensor_entities)
 
-        for description in APP_INFO_SENSORS:
+        elif "tgs_data" in description.key and three_phase_inverters:
             sensor_entities = get_sensors_for_description(
                 config_entry,
                 description,
-                app_info_coordinator,
-                HoymilesDataSensorEntity,
+                data_coordinator,
+                class_name,
                 dtu_serial_number,
-                inverters,
+                three_phase_inverters,
+                [],
+                serial_numbers=serial_numbers,
+            )
+            sensors.extend(sensor_entities)
+        elif "meter" in description.key and meters:
+            sensor_entities = get_sensors_for_description(
+                config_entry,
+                description,
+                data_coordinator,
+                class_name,
+                dtu_serial_number,
+                [],
+                [],
+                meters,
+                serial_numbers=serial_numbers,
+            )
+            sensors.extend(sensor_entities)
+
+        else:
+            sensor_entities = get_sensors_for_description(
+                config_entry,
+                description,
+                data_coordinator,
+                class_name,
+                dtu_serial_number,
+                [],
                 ports,
+                serial_numbers=serial_numbers,
             )
             sensors.extend(sensor_entities)
 
-    if hybrid_inverters:
-        for description in HOYMILES_ENERGY_STORAGE_SENSORS:
-            sensor_entities = get_sensors_for_hybrid_inverter_description(
+    for description in POLLING_DIAGNOSTIC_SENSORS:
+        sensor_entities = get_sensors_for_description(
+            config_entry,
+            description,
+            data_coordinator,
+            HoymilesCoordinatorDiagnosticSensorEntity,
+            dtu_serial_number,
+            inverters,
+            ports,
+            serial_numbers=serial_numbers,
+        )
+        sensors.extend(sensor_entities)
+
+    for key_prefix, coordinator in (
+        ("real_data", data_coordinator),
+        ("config", config_coordinator),
+        ("app_info", app_info_coordinator),
+    ):
+        for description in get_request_diagnostic_sensors(key_prefix):
+            sensor_entities = get_sensors_for_description(
                 config_entry,
                 description,
-                energy_storage_data_coordinator,
-                HoymilesEnergyStorageSensorEntity,
+                coordinator,
+                HoymilesCoordinatorDiagnosticSensorEntity,
                 dtu_serial_number,
-                hybrid_inverters,
+                inverters,
+                ports,
+                serial_numbers=serial_numbers,
             )
             sensors.extend(sensor_entities)
 
-    async_add_entities(sensors)
+    for description in CONFIG_DIAGNOSTIC_SENSORS:
+        sensor_entities = get_sensors_for_description(
+            config_entry,
+            description,
+            config_coordinator,
+            HoymilesDiagnosticSensorEntity,
+            dtu_serial_number,
+            inverters,
+            ports,
+            serial_numbers=serial_numbers,
+        )
+        sensors.extend(sensor_entities)
+
+    for description in APP_INFO_SENSORS:
+        sensor_entities = get_sensors_for_description(
+            config_entry,
+            description,
+            app_info_coordinator,
+            HoymilesDataSensorEntity,
+            dtu_serial_number,
+            inverters,
+            ports,
+            serial_numbers=serial_numbers,
+        )
+        sensors.extend(sensor_entities)
+
+    return sensors
 
 
 def get_sensors_for_description(
@@ -1277,13 +1506,21 @@ def get_sensors_for_description(
     inverters: list,
     ports: list,
     meters: list = [],
+    serial_numbers: set[str] | None = None,
 ) -> list[SensorEntity]:
-    """Get sensors for the given description."""
+    """Get sensors for the given description.
+
+    If serial_numbers is given, only sensors of these devices are returned.
+    """
 
     sensors = []
 
     if "<inverter_count>" in description.key:
         for index, inverter_serial in enumerate(inverters):
+            if inverter_serial is None or (
+                serial_numbers is not None and inverter_serial not in serial_numbers
+            ):
+                continue
             new_key = description.key.replace("<inverter_count>", str(index))
             updated_description = dataclasses.replace(
                 description, key=new_key, serial_number=inverter_serial
@@ -1292,8 +1529,12 @@ def get_sensors_for_description(
             sensors.append(sensor)
     elif "<pv_count>" in description.key:
         for index, port in enumerate(ports):
+            if port is None:
+                continue
             inverter_serial = port["inverter_serial_number"]
             port_number = port["port_number"]
+            if serial_numbers is not None and inverter_serial not in serial_numbers:
+                continue
             new_key = str(description.key).replace("<pv_count>", str(index))
             updated_description = dataclasses.replace(
                 description,
@@ -1305,8 +1546,12 @@ def get_sensors_for_description(
             sensors.append(sensor)
     elif "meter_count" in description.key:
         for index, meter in enumerate(meters):
+            if meter is None:
+                continue
             meter_serial = meter["meter_serial_number"]
             meter_type = meter["device_type"]
+            if serial_numbers is not None and meter_serial not in serial_numbers:
+                continue
 
             if description.requires_device_type.value in (
                 DeviceType.ALL_DEVICES.value,
@@ -1318,7 +1563,7 @@ def get_sensors_for_description(
                 )
                 sensor = class_name(config_entry, updated_description, coordinator)
                 sensors.append(sensor)
-    else:
+    elif serial_numbers is None:
         if description.supported_dtu_types is not None:
             serial_bytes = bytes.fromhex(dtu_serial_number)
 
@@ -1326,7 +1571,7 @@ def get_sensors_for_description(
             try:
                 dtu_type = get_dtu_model_type(serial_bytes)
             except ValueError as e:
-                _LOGGER.error(f"Error getting DTU model type: {e}")
+                _LOGGER.error("Error getting DTU model type: %s", e)
 
         if (
             description.supported_dtu_types is None
@@ -1341,6 +1586,31 @@ def get_sensors_for_description(
     return sensors
 
 
+def get_hybrid_inverter_sensor_keys(index: int, inverter: dict) -> set[str]:
+    """Get the keys of the sensors of a hybrid inverter at a config entry position."""
+    pv_panel_count = inverter.get("pv_panel_count", DEFAULT_HYBRID_PV_PANEL_COUNT)
+    phase_count = inverter.get("phase_count", DEFAULT_HYBRID_PHASE_COUNT)
+
+    keys = set()
+    for description in HOYMILES_ENERGY_STORAGE_SENSORS:
+        if "<inverter_count>" not in description.key:
+            continue
+        key = description.key.replace("<inverter_count>", str(index))
+        if "<pv_panel_count>" in key:
+            keys.update(
+                key.replace("<pv_panel_count>", str(pv_index))
+                for pv_index in range(pv_panel_count)
+            )
+        elif "<phase_count>" in key:
+            keys.update(
+                key.replace("<phase_count>", str(phase_index))
+                for phase_index in range(phase_count)
+            )
+        else:
+            keys.add(key)
+    return keys
+
+
 def get_sensors_for_hybrid_inverter_description(
     config_entry: ConfigEntry,
     description: SensorEntityDescription,
@@ -1355,11 +1625,15 @@ def get_sensors_for_hybrid_inverter_description(
 
     if "<inverter_count>" in description.key:
         for index, inverter in enumerate(inverters):
+            if inverter is None:
+                continue
             new_key = description.key.replace("<inverter_count>", str(index))
 
             if "<pv_panel_count>" in description.key:
-                # TODO: Dynamically determine number of PV panels
-                for pv_index in range(0, 2):
+                pv_panel_count = inverter.get(
+                    "pv_panel_count", DEFAULT_HYBRID_PV_PANEL_COUNT
+                )
+                for pv_index in range(pv_panel_count):
                     new_pv_index_key = new_key.replace(
                         "<pv_panel_count>", str(pv_index)
                     )
@@ -1373,8 +1647,8 @@ def get_sensors_for_hybrid_inverter_description(
                     sensor = class_name(config_entry, updated_description, coordinator)
                     sensors.append(sensor)
             elif "<phase_count>" in description.key:
-                # TODO: Dynamically determine number of phases
-                for phase_index in range(0, 3):
+                phase_count = inverter.get("phase_count", DEFAULT_HYBRID_PHASE_COUNT)
+                for phase_index in range(phase_count):
                     new_phase_index_key = new_key.replace(
                         "<phase_count>", str(phase_index)
                     )
@@ -1421,14 +1695,26 @@ class HoymilesDataSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
         super().__init__(config_entry, description, coordinator)
 
         self._attribute_name = description.key
+        # Only wake this entity when the value it reads changed.
+        self.coordinator_context = coordinator.get_field(
+            description.key, description.serial_number, description.port_number
+        )
         self._conversion_factor = description.conversion_factor
         self._version_translation_function = description.version_translation_function
         self._version_prefix = description.version_prefix
+        self._deadband = (
+            description.deadband
+            if description.deadband is not None
+            else DEVICE_CLASS_DEADBANDS.get(description.device_class)
+        )
         self._native_value = None
         self._assumed_state = False
         self._last_known_value = None
         self._last_successful_update = None
         self._last_update_state = None
+        self._last_written_value = None
+        self._last_written_at: datetime | None = None
+        self._last_written_available: bool | None = None
 
         self.update_state_value()
 
@@ -1436,8 +1722,17 @@ class HoymilesDataSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         self.update_state_value()
+        self._update_last_known_value()
+        if self._defer_state_write():
+            return
         super()._handle_coordinator_update()
 
+        if self._assumed_state and self._last_successful_update is not None:
+            # The last known value expires even if the data does not change.
+            self.async_schedule_state_write(
+                self._last_successful_update + LAST_KNOWN_VALUE_TIMEOUT - datetime.now()
+            )
+
     @property
     def native_value(self):
         """Return the native value of the sensor."""
@@ -1447,7 +1742,7 @@ class HoymilesDataSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
             elif (
                 self._last_successful_update is not None
                 and datetime.now() - self._last_successful_update
-                <= timedelta(minutes=3)
+                <= LAST_KNOWN_VALUE_TIMEOUT
             ):
                 _LOGGER.debug(
                     "[%s] Returning last known value: %s, instead of 0.0 to cope with inverter in offline mode.",
@@ -1465,7 +1760,59 @@ class HoymilesDataSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
     @property
     def assumed_state(self):
         """Return the assumed state of the sensor."""
-        return self._assumed_state
+        return self._assumed_state or self.coordinator.data_restored
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state and remember what was written."""
+        super().async_write_ha_state()
+        self._last_written_value = self._native_value
+        self._last_written_at = dt_util.utcnow()
+        self._last_written_available = self.available
+
+    def _update_last_known_value(self) -> None:
+        """Remember the new value, also if its state write is deferred."""
+        if self._native_value != 0.0:
+            self._last_successful_update = datetime.now()
+            self._last_known_value = self._native_value
+
+    def _defer_state_write(self) -> bool:
+        """Return whether the state write of a new value is deferred.
+
+        Availability changes and changes to or from 0 are always written. A
+        deferred value is written by a scheduled write once the minimum or
+        maximum write interval passed.
+        """
+        description = self.entity_description
+        value = self._native_value
+        last_value = self._last_written_value
+        if (
+            self._last_written_at is None
+            or self.available != self._last_written_available
+            or not isinstance(value, (int, float))
+            or not isinstance(last_value, (int, float))
+            or not value
+            or not last_value
+        ):
+            return False
+
+        elapsed = dt_util.utcnow() - self._last_written_at
+        max_interval = description.max_write_interval
+        if max_interval is not None and elapsed >= max_interval:
+            return False
+
+        min_interval = description.min_write_interval
+        if min_interval is not None and elapsed < min_interval:
+            self.async_schedule_state_write(min_interval - elapsed)
+        elif abs(value - last_value) < max(
+            self._deadband or 0,
+            (description.relative_deadband or 0) * abs(last_value),
+        ):
+            if max_interval is not None:
+                self.async_schedule_state_write(max_interval - elapsed)
+        else:
+            return False
+        return True
 
     def update_state_value(self):
         """Update the state value of the sensor based on the coordinator data."""
@@ -1475,35 +1822,9 @@ class HoymilesDataSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
             not hasattr(self.coordinator, "data") or self.coordinator.data is None
         ):
             new_native_value = 0.0
-        elif "[" in self._attribute_name and "]" in self._attribute_name:
-            # Extracting the list index and attribute dynamically
-            attribute_name, index = self._attribute_name.split("[")
-            index = int(index.split("]")[0])
-            nested_attribute = (
-                self._attribute_name.split("].")[1]
-                if "]." in self._attribute_name
-                else None
-            )
-
-            attribute = getattr(self.coordinator.data, attribute_name.split("[")[0], [])
-
-            if index < len(attribute):
-                if nested_attribute is not None:
-                    new_native_value = getattr(attribute[index], nested_attribute, None)
-                else:
-                    new_native_value = attribute[index]
-            else:
-                new_native_value = None
-        elif "." in self._attribute_name:
-            attribute_parts = self._attribute_name.split(".")
-            attribute = self.coordinator.data
-            for part in attribute_parts:
-                attribute = getattr(attribute, part, None)
-            new_native_value = attribute
-
         else:
-            new_native_value = getattr(
-                self.coordinator.data, self._attribute_name, None
+            new_native_value = self.coordinator.get_field_value(
+                self.coordinator_context, self.coordinator.data
             )
 
         if new_native_value is not None and self._conversion_factor is not None:
@@ -1541,7 +1862,7 @@ class HoymilesDataSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
 
         state = await self.async_get_last_sensor_data()
         if state:
-            self.last_known_value = state.native_value
+            self._last_known_value = state.native_value
 
 
 class HoymilesEnergySensorEntity(HoymilesDataSensorEntity, RestoreSensor):
@@ -1558,18 +1879,7 @@ class HoymilesEnergySensorEntity(HoymilesDataSensorEntity, RestoreSensor):
         # Important to set to None to not mess with long term stats
         self._last_known_value = None
 
-    def schedule_midnight_reset(self, reset_sensor_value: bool = True):
-        """Schedule the reset function to run again at the next midnight."""
-        now = datetime.now()
-        midnight = datetime.combine(now.date(), time(0, 0))
-        midnight = midnight + timedelta(days=1) if now > midnight else midnight
-        time_until_midnight = (midnight - datetime.now()).total_seconds()
-
-        if reset_sensor_value:
-            self.reset_sensor_value()
-
-        self.hass.loop.call_later(time_until_midnight, self.schedule_midnight_reset)
-
+    @callback
     def reset_sensor_value(self):
         """Reset the sensor value."""
         self._last_known_value = 0
@@ -1599,7 +1909,12 @@ class HoymilesEnergySensorEntity(HoymilesDataSensorEntity, RestoreSensor):
             self._last_known_value = state.native_value
 
         if self.entity_description.reset_at_midnight:
-            self.schedule_midnight_reset(reset_sensor_value=False)
+            midnight_scheduler = self.hass.data[DOMAIN][self._config_entry.entry_id][
+                HASS_MIDNIGHT_SCHEDULER
+            ]
+            self.async_on_remove(
+                midnight_scheduler.async_register(self.reset_sensor_value)
+            )
 
 
 class HoymilesDiagnosticSensorEntity(
@@ -1677,6 +1992,44 @@ class HoymilesDiagnosticSensorEntity(
             self._last_known_value = state.native_value
 
 
+class HoymilesCoordinatorDiagnosticSensorEntity(
+    HoymilesCoordinatorEntity, SensorEntity
+):
+    """Represents a diagnostic sensor reporting on a Hoymiles coordinator."""
+
+    def __init__(
+        self,
+        config_entry: ConfigEntry,
+        description: HoymilesCoordinatorDiagnosticEntityDescription,
+        coordinator: HoymilesCoordinatorEntity,
+    ):
+        """Initialize the sensor."""
+        super().__init__(config_entry, description, coordinator)
+        self._last_written_value = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state if the value changed since it was last written."""
+        if self.native_value != self._last_written_value:
+            super()._handle_coordinator_update()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state and remember what was written."""
+        super().async_write_ha_state()
+        self._last_written_value = self.native_value
+
+    @property
+    def available(self) -> bool:
+        """Return True, the coordinator can be reported on while the DTU is offline."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the native value of the sensor."""
+        return self.entity_description.value_fn(self.coordinator)
+
+
 class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor):
     """Represents a sensor entity for Hoymiles data."""
 
@@ -1690,6 +2043,13 @@ class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor
         super().__init__(config_entry, description, coordinator)
 
         self._attribute_name = description.key
+        # Keys start with the inverter, e.g. "[0].grid.phases[2].voltage". The
+        # coordinator data is keyed by inverter serial number, so only the rest
+        # of the key is resolved against the data of this entity's inverter.
+        self._accessor = compile_accessor(description.key.partition("].")[2])
+        self._data_stale = False
+        # Only wake this entity when the value it reads changed.
+        self.coordinator_context = (description.serial_number, self._accessor)
         self._conversion_factor = description.conversion_factor
         self._version_translation_function = description.version_translation_function
         self._version_prefix = description.version_prefix
@@ -1707,6 +2067,12 @@ class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor
         self.update_state_value()
         super()._handle_coordinator_update()
 
+        if self._assumed_state and self._last_successful_update is not None:
+            # The last known value expires even if the data does not change.
+            self.async_schedule_state_write(
+                self._last_successful_update + LAST_KNOWN_VALUE_TIMEOUT - datetime.now()
+            )
+
     @property
     def native_value(self):
         """Return the native value of the sensor."""
@@ -1716,7 +2082,7 @@ class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor
             elif (
                 self._last_successful_update is not None
                 and datetime.now() - self._last_successful_update
-                <= timedelta(minutes=3)
+                <= LAST_KNOWN_VALUE_TIMEOUT
             ):
                 _LOGGER.debug(
                     "[%s] Returning last known value: %s, instead of 0.0 to cope with inverter in offline mode.",
@@ -1734,7 +2100,7 @@ class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor
     @property
     def assumed_state(self):
         """Return the assumed state of the sensor."""
-        return self._assumed_state
+        return self._assumed_state or self._data_stale
 
     def update_state_value(self):
         """Update the state value of the sensor based on the coordinator data."""
@@ -1748,25 +2114,14 @@ class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor
             self._native_value = 0.0
             return
 
-        def resolve_path(obj, path):
-            tokens = re.findall(r"\w+|\[\d+\]", path)
-            for token in tokens:
-                if obj is None:
-                    return None
-                if token.startswith("["):
-                    index = int(token[1:-1])
-                    try:
-                        obj = obj[index]
-                    except (IndexError, TypeError):
-                        logging.error(
-                            "Index %d out of range for object: %s", index, obj
-                        )
-                        return None
-                else:
-                    obj = getattr(obj, token, None)
-            return obj
-
-        new_native_value = resolve_path(self.coordinator.data, self._attribute_name)
+        record = self.coordinator.data.get(self.entity_description.serial_number)
+        if record is None:
+            self._data_stale = False
+            self._native_value = 0.0
+            return
+
+        self._data_stale = record.stale
+        new_native_value = self._accessor(record.data)
 
         if new_native_value is not None and self._conversion_factor is not None:
             new_native_value *= self._conversion_factor
@@ -1797,10 +2152,10 @@ class HoymilesEnergyStorageSensorEntity(HoymilesCoordinatorEntity, RestoreSensor
         self._last_update_state = datetime.now()
         self._native_value = new_native_value
 
-        async def async_added_to_hass(self) -> None:
-            """Call when entity about to be added to hass."""
-            await super().async_added_to_hass()
+    async def async_added_to_hass(self) -> None:
+        """Call when entity about to be added to hass."""
+        await super().async_added_to_hass()
 
-            state = await self.async_get_last_sensor_data()
-            if state:
-                self.last_known_value = state.native_value
+        state = await self.async_get_last_sensor_data()
+        if state:
+            self._last_known_value = state.native_value
@@ -1,9 +1,11 @@
+from datetime import timedelta
+
 from homeassistant.core import ServiceCall
 from hoymiles_wifi.dtu import DTU
 
 from hoymiles_wifi.hoymiles import BMSWorkingMode
 
-from custom_components.hoymiles_wifi.const import HASS_DTU, DOMAIN
+from custom_components.hoymiles_wifi.const import HASS_DTU, HASS_SCHEDULER, DOMAIN
 from homeassistant.helpers.device_registry import async_get as async_get_device_registry
 
 
@@ -11,7 +13,8 @@ from hoymiles_wifi.utils import parse_time_periods_input, parse_time_settings_in
 
 import logging
 
-from .const import CONF_DTU_SERIAL_NUMBER
+from .const import CONF_DTU_SERIAL_NUMBER, HASS_DATA_COORDINATOR
+from .scheduler import RequestPriority
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,13 +37,17 @@ async def async_handle_set_bms_mode(call: ServiceCall):
 
     bms_working_mode = BMSWorkingMode[bms_mode_str.upper()]
 
-    _LOGGER.debug(f"Setting BMS mode to {bms_working_mode}")
-    _LOGGER.debug(f"  rev_soc: {rev_soc}")
-    _LOGGER.debug(f"  max_power: {max_power}")
-    _LOGGER.debug(f"  peak_soc: {peak_soc}")
-    _LOGGER.debug(f"  peak_meter_power: {peak_meter_power}")
-    _LOGGER.debug(f"  time_settings_str: {time_settings_str}")
-    _LOGGER.debug(f"  time_periods_str: {time_periods_str}")
+    _LOGGER.debug(
+        "Setting BMS mode to %s, rev_soc: %s, max_power: %s, peak_soc: %s, "
+        "peak_meter_power: %s, time_settings: %s, time_periods: %s",
+        bms_working_mode,
+        rev_soc,
+        max_power,
+        peak_soc,
+        peak_meter_power,
+        time_settings_str,
+        time_periods_str,
+    )
 
     if rev_soc is None:
         raise ValueError("No reserve SOC provided!")
@@ -71,7 +78,7 @@ async def async_handle_set_bms_mode(call: ServiceCall):
     for device_id in device_ids:
         device = device_registry.async_get(device_id)
         if not device:
-            _LOGGER.error(f"Device {device_id} not found in registry")
+            _LOGGER.error("Device %s not found in registry", device_id)
             continue
 
         for entry_id in device.config_entries:
@@ -81,7 +88,7 @@ async def async_handle_set_bms_mode(call: ServiceCall):
 
             dtu = hass_data[HASS_DTU]
             if not dtu or not isinstance(dtu, DTU):
-                _LOGGER.error(f"DTU not found for entry {entry_id}")
+                _LOGGER.error("DTU not found for entry %s", entry_id)
                 continue
 
             _LOGGER.debug("Found DTU for entry %s -> %s", entry_id, dtu)
@@ -89,17 +96,24 @@ async def async_handle_set_bms_mode(call: ServiceCall):
             dtu_serial_number_str = hass_data.get(CONF_DTU_SERIAL_NUMBER, None)
 
             if not dtu_serial_number_str:
-                _LOGGER.error(f"DTU serial number not found in config entry {entry_id}")
+                _LOGGER.error(
+                    "DTU serial number not found in config entry %s", entry_id
+                )
                 continue
 
             dtu_serial_number = int(dtu_serial_number_str)
             inverter_serial_number = int(device.serial_number)
 
             _LOGGER.debug(
-                f"Setting BMS mode for inverter_serial_number: {inverter_serial_number}"
+                "Setting BMS mode for inverter_serial_number: %s",
+                inverter_serial_number,
             )
 
-            await dtu.async_set_energy_storage_working_mode(
+            scheduler = hass_data[HASS_SCHEDULER]
+
+            await scheduler.async_request(
+                RequestPriority.CONTROL,
+                dtu.async_set_energy_storage_working_mode,
                 dtu_serial_number=dtu_serial_number,
                 inverter_serial_number=inverter_serial_number,
                 bms_working_mode=bms_working_mode,
@@ -110,3 +124,33 @@ async def async_handle_set_bms_mode(call: ServiceCall):
                 peak_meter_power=peak_meter_power,
                 time_periods=time_periods,
             )
+
+
+async def async_handle_start_capture(call: ServiceCall):
+    """Enable the performance data mode of DTUs and capture their real data."""
+    hass = call.hass
+    device_registry = async_get_device_registry(hass)
+    duration = timedelta(seconds=call.data["duration"])
+    device_ids = call.data.get("device_id", [])
+
+    if device_ids:
+        entry_ids = set()
+        for device_id in device_ids:
+            device = device_registry.async_get(device_id)
+            if not device:
+                _LOGGER.error("Device %s not found in registry", device_id)
+                continue
+            entry_ids.update(device.config_entries)
+    else:
+        entry_ids = set(hass.data.get(DOMAIN, {}))
+
+    for entry_id in entry_ids:
+        hass_data = hass.data[DOMAIN].get(entry_id)
+        if not hass_data or HASS_DATA_COORDINATOR not in hass_data:
+            continue
+
+        dtu = hass_data[HASS_DTU]
+        await hass_data[HASS_SCHEDULER].async_request(
+            RequestPriority.CONTROL, dtu.async_enable_performance_data_mode
+        )
+        await hass_data[HASS_DATA_COORDINATOR].async_start_capture(duration)
@@ -0,0 +1,121 @@
+"""Flattened snapshots of Hoymiles real data."""
+
+from __future__ import annotations
+
+from array import array
+import math
+import re
+from typing import Any
+
+from .accessor import Accessor, compile_accessor
+
+MISSING = math.nan
+
+# Attribute paths into a list of device records, e.g. ``sgs_data[0].voltage``.
+_DEVICE_PATH_PATTERN = re.compile(
+    r"^(sgs_data|tgs_data|meter_data|pv_data)\[\d+\]\.(\w+)$"
+)
+
+
+class RealDataIndex:
+    """Records of a real data response by serial number and port.
+
+    Built once per poll, so an entity finds the record of its device with a
+    single dict lookup, whatever the order the DTU reports the devices in.
+    """
+
+    __slots__ = ("data", "meter_data", "pv_data", "sgs_data", "tgs_data")
+
+    def __init__(self, data: Any) -> None:
+        """Index the device records of real data."""
+        self.data = data
+        self.sgs_data = {record.serial_number: record for record in data.sgs_data}
+        self.tgs_data = {record.serial_number: record for record in data.tgs_data}
+        self.meter_data = {record.serial_number: record for record in data.meter_data}
+        self.pv_data = {
+            (record.serial_number, record.port_number): record
+            for record in data.pv_data
+        }
+
+
+def compile_index_accessor(
+    path: str, serial_number: str | None = None, port_number: int | None = None
+) -> Accessor:
+    """Compile an attribute path into a function reading it from an index.
+
+    Paths into a device list are bound to the record of the given device, the
+    list position in the path is ignored then.
+    """
+    match = None
+    if serial_number is not None:
+        match = _DEVICE_PATH_PATTERN.match(path)
+
+    if match is None:
+        accessor = compile_accessor(path)
+
+        def _accessor(index: RealDataIndex) -> Any:
+            return accessor(index.data)
+
+        return _accessor
+
+    list_name, attribute = match.groups()
+    # Serial numbers are shown as hex, but reported as integers.
+    key = int(serial_number, 16)
+    if list_name == "pv_data":
+        key = (key, port_number)
+
+    def _device_accessor(index: RealDataIndex) -> Any:
+        return getattr(getattr(index, list_name).get(key), attribute, None)
+
+    return _device_accessor
+
+
+class SnapshotLayout:
+    """Assign a slot in a flat snapshot to every attribute path read by entities.
+
+    Each poll the nested response is flattened once into an ``array("d")``
+    holding one value per slot. Entities keep their slot and read a single
+    array item instead of walking the protobuf message.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty layout."""
+        self._slots: dict[tuple[str, str | None, int | None], int] = {}
+        self._accessors: list[Accessor] = []
+
+    def __len__(self) -> int:
+        """Return the number of slots."""
+        return len(self._accessors)
+
+    def get_slot(
+        self,
+        path: str,
+        serial_number: str | None = None,
+        port_number: int | None = None,
+    ) -> int:
+        """Return the slot of an attribute path, adding it if needed.
+
+        Paths into a device list are bound to the device with serial_number
+        and port_number, if given.
+        """
+        key = (path, serial_number, port_number)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self._accessors)
+            self._accessors.append(
+                compile_index_accessor(path, serial_number, port_number)
+            )
+        return slot
+
+    def flatten(self, index: RealDataIndex) -> array:
+        """Flatten indexed data into a snapshot with one value per slot.
+
+        Missing and non-numeric values are stored as NaN.
+        """
+        return array(
+            "d",
+            [
+                value if isinstance(value, (int, float)) else MISSING
+                for value in [accessor(index) for accessor in self._accessors]
+            ],
+        )
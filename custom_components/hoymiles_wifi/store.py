@@ -0,0 +1,113 @@
+"""Persist the last data of the Hoymiles coordinators across restarts."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+from typing import TYPE_CHECKING, Any
+
+from google.protobuf.message import DecodeError
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, SNAPSHOT_MAX_AGE_SECONDS, SNAPSHOT_SAVE_DELAY_SECONDS
+
+if TYPE_CHECKING:
+    from .coordinator import HoymilesDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class HoymilesSnapshotStore:
+    """Save the last live data of the coordinators of a config entry.
+
+    Coordinators are rehydrated from the store before their first refresh, so
+    entities have values before the DTU answers. Writes are debounced.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshots")
+        self._coordinators: dict[str, HoymilesDataUpdateCoordinator] = {}
+        self._stored: dict[str, dict[str, Any]] = {}
+        self._save_scheduled = False
+
+    async def async_load(self) -> None:
+        """Load the stored snapshots."""
+        self._stored = await self._store.async_load() or {}
+
+    async def async_remove(self) -> None:
+        """Remove the stored snapshots."""
+        await self._store.async_remove()
+
+    @callback
+    def async_restore(self, coordinator: HoymilesDataUpdateCoordinator) -> None:
+        """Register a coordinator and restore its last saved data."""
+        key = coordinator.SNAPSHOT_KEY
+        self._coordinators[key] = coordinator
+        coordinator.snapshot_store = self
+
+        stored = self._stored.get(key)
+        if stored is None:
+            return
+
+        updated_at = dt_util.parse_datetime(stored["updated_at"])
+        if not is_snapshot_recent(updated_at):
+            _LOGGER.debug("Not restoring %s data from %s", key, updated_at)
+            return
+
+        try:
+            data = coordinator.load_snapshot(stored["data"], updated_at)
+        except (DecodeError, KeyError, TypeError, ValueError) as err:
+            _LOGGER.debug("Unable to restore %s data: %s", key, err)
+            return
+
+        coordinator.async_set_restored_data(data, updated_at)
+        _LOGGER.debug("Restored %s data from %s", key, updated_at)
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the snapshots after a delay."""
+        self._save_scheduled = True
+        self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY_SECONDS)
+
+    async def async_unload(self) -> None:
+        """Save a scheduled save now and release the coordinators.
+
+        Saving cancels the delayed save, which would keep the coordinators of
+        an unloaded entry alive until it runs.
+        """
+        if self._save_scheduled:
+            await self._store.async_save(self._data_to_save())
+        self._coordinators.clear()
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        """Serialize the live data of all coordinators."""
+        self._save_scheduled = False
+        for key, coordinator in self._coordinators.items():
+            if coordinator.data is None or coordinator.data_restored:
+                continue
+            self._stored[key] = {
+                "updated_at": coordinator.data_updated_at.isoformat(),
+                "data": coordinator.dump_snapshot(),
+            }
+        return self._stored
+
+
+def is_snapshot_recent(updated_at: datetime | None) -> bool:
+    """Return whether saved data is recent enough to be shown again.
+
+    Data from a previous day is never restored, daily energy values would be
+    kept as the maximum of the new day otherwise.
+    """
+    if updated_at is None:
+        return False
+    now = dt_util.now()
+    return (
+        now - updated_at <= timedelta(seconds=SNAPSHOT_MAX_AGE_SECONDS)
+        and dt_util.as_local(updated_at).date() == now.date()
+    )
@@ -0,0 +1,387 @@
+"""Cached topology of Hoymiles DTUs."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable
+import dataclasses
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_DTU_SERIAL_NUMBER,
+    CONF_ENC_RAND,
+    CONF_HYBRID_INVERTERS,
+    CONF_INVERTERS,
+    CONF_IS_ENCRYPTED,
+    CONF_METERS,
+    CONF_PORTS,
+    CONF_THREE_PHASE_INVERTERS,
+    DATA_TOPOLOGY_CACHE,
+    DOMAIN,
+)
+from .error import CannotConnect
+from .scheduler import HoymilesRequestScheduler
+from .util import async_get_config_entry_data_for_host
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Version of a topology record. Records of another version are ignored.
+TOPOLOGY_VERSION = 1
+
+# Config entry keys describing the devices behind a DTU.
+DEVICE_KEYS = (
+    CONF_INVERTERS,
+    CONF_THREE_PHASE_INVERTERS,
+    CONF_PORTS,
+    CONF_METERS,
+    CONF_HYBRID_INVERTERS,
+)
+
+
+@dataclass(frozen=True)
+class Topology:
+    """Devices discovered behind a DTU.
+
+    Devices that are no longer reported are kept as None in the device lists,
+    see merge_devices.
+    """
+
+    dtu_serial_number: str
+    single_phase_inverters: list[str] = field(default_factory=list)
+    three_phase_inverters: list[str] = field(default_factory=list)
+    ports: list[dict[str, Any]] = field(default_factory=list)
+    meters: list[dict[str, Any]] = field(default_factory=list)
+    hybrid_inverters: list[dict[str, Any]] = field(default_factory=list)
+    is_encrypted: bool = False
+    enc_rand: str = ""
+    discovered_at: str | None = None
+    version: int = TOPOLOGY_VERSION
+
+    @classmethod
+    def from_entry_data(cls, data: dict[str, Any]) -> Topology | None:
+        """Create a topology from config entry data, if it contains one."""
+        if not data.get(CONF_DTU_SERIAL_NUMBER):
+            return None
+        return cls(
+            dtu_serial_number=data[CONF_DTU_SERIAL_NUMBER],
+            single_phase_inverters=data.get(CONF_INVERTERS, []),
+            three_phase_inverters=data.get(CONF_THREE_PHASE_INVERTERS, []),
+            ports=data.get(CONF_PORTS, []),
+            meters=data.get(CONF_METERS, []),
+            hybrid_inverters=data.get(CONF_HYBRID_INVERTERS, []),
+            is_encrypted=data.get(CONF_IS_ENCRYPTED, False),
+            enc_rand=data.get(CONF_ENC_RAND) or "",
+        )
+
+    def as_entry_data(self) -> dict[str, Any]:
+        """Return the config entry data of the topology."""
+        return {
+            CONF_DTU_SERIAL_NUMBER: self.dtu_serial_number,
+            CONF_INVERTERS: self.single_phase_inverters,
+            CONF_THREE_PHASE_INVERTERS: self.three_phase_inverters,
+            CONF_PORTS: self.ports,
+            CONF_METERS: self.meters,
+            CONF_HYBRID_INVERTERS: self.hybrid_inverters,
+            CONF_IS_ENCRYPTED: self.is_encrypted,
+            CONF_ENC_RAND: self.enc_rand,
+        }
+
+    @property
+    def has_devices(self) -> bool:
+        """Return whether any device was found behind the DTU."""
+        return (
+            any(self.single_phase_inverters)
+            or any(self.three_phase_inverters)
+            or any(self.meters)
+            or any(self.hybrid_inverters)
+        )
+
+    def matches(self, other: Topology) -> bool:
+        """Return whether both topologies describe the same devices.
+
+        The order of the devices is ignored. Hybrid inverters are compared by
+        serial number only, their PV panel and phase counts are kept up to
+        date from energy storage data.
+        """
+        data = self.as_entry_data()
+        other_data = other.as_entry_data()
+        return self.dtu_serial_number == other.dtu_serial_number and all(
+            _identities(key, data[key]) == _identities(key, other_data[key])
+            for key in DEVICE_KEYS
+        )
+
+    def merge(self, reported: Topology) -> Topology:
+        """Return a reported topology with the device positions of this one."""
+        data = self.as_entry_data()
+        reported_data = reported.as_entry_data()
+        for key in DEVICE_KEYS:
+            reported_data[key] = merge_devices(
+                data[key], reported_data[key], _get_identity_function(key)
+            )
+        return dataclasses.replace(
+            Topology.from_entry_data(reported_data),
+            discovered_at=reported.discovered_at,
+        )
+
+
+class HoymilesTopologyCache:
+    """Store the last discovered topology of every DTU host."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.topology")
+        self._topologies: dict[str, Topology] | None = None
+
+    async def _async_load(self) -> dict[str, Topology]:
+        """Load the cached topologies once."""
+        if self._topologies is None:
+            stored = await self._store.async_load() or {}
+            self._topologies = {}
+            for host, record in stored.items():
+                if record.get("version") != TOPOLOGY_VERSION:
+                    _LOGGER.debug("Ignoring outdated topology record of %s", host)
+                    continue
+                try:
+                    self._topologies[host] = Topology(**record)
+                except TypeError as err:
+                    _LOGGER.debug("Ignoring invalid topology of %s: %s", host, err)
+        return self._topologies
+
+    async def async_get(self, host: str) -> Topology | None:
+        """Return the cached topology of a host."""
+        return (await self._async_load()).get(host)
+
+    async def async_set(self, host: str, topology: Topology) -> None:
+        """Cache the topology of a host."""
+        topologies = await self._async_load()
+        if topologies.get(host) == topology:
+            return
+        topologies[host] = topology
+        self._store.async_delay_save(self._data_to_save)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        """Serialize the cached topologies."""
+        return {
+            host: dataclasses.asdict(topology)
+            for host, topology in (self._topologies or {}).items()
+        }
+
+
+@callback
+def async_get_topology_cache(hass: HomeAssistant) -> HoymilesTopologyCache:
+    """Return the topology cache shared by all config entries."""
+    if DATA_TOPOLOGY_CACHE not in hass.data:
+        hass.data[DATA_TOPOLOGY_CACHE] = HoymilesTopologyCache(hass)
+    return hass.data[DATA_TOPOLOGY_CACHE]
+
+
+async def async_probe_topology(
+    hass: HomeAssistant,
+    host: str,
+    scheduler: HoymilesRequestScheduler | None = None,
+) -> Topology:
+    """Discover the topology behind a DTU and cache it.
+
+    Raises CannotConnect if the DTU does not respond.
+    """
+    (
+        dtu_sn,
+        single_phase_inverters,
+        three_phase_inverters,
+        ports,
+        meters,
+        hybrid_inverters,
+        is_encrypted,
+        enc_rand,
+    ) = await async_get_config_entry_data_for_host(host, scheduler)
+
+    topology = Topology(
+        dtu_serial_number=dtu_sn,
+        single_phase_inverters=single_phase_inverters,
+        three_phase_inverters=three_phase_inverters,
+        ports=ports,
+        meters=meters,
+        hybrid_inverters=hybrid_inverters,
+        is_encrypted=is_encrypted,
+        enc_rand=enc_rand,
+        discovered_at=dt_util.utcnow().isoformat(),
+    )
+    await async_get_topology_cache(hass).async_set(host, topology)
+    return topology
+
+
+async def async_get_topology(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> Topology:
+    """Return the topology of a config entry without contacting the DTU.
+
+    The config entry data is preferred, the cached topology only fills in
+    keys missing from it. The DTU is only probed if neither is known.
+
+    Raises CannotConnect if the DTU had to be probed and does not respond.
+    """
+    host = config_entry.data[CONF_HOST]
+    cached = await async_get_topology_cache(hass).async_get(host)
+    from_entry = Topology.from_entry_data(config_entry.data)
+
+    topology = from_entry
+    if cached is not None:
+        topology = Topology.from_entry_data(
+            {
+                **cached.as_entry_data(),
+                **{
+                    key: value
+                    for key, value in config_entry.data.items()
+                    if value is not None
+                },
+            }
+        )
+    elif not _has_all_keys(config_entry.data):
+        # Entries of older versions miss devices added to the schema since.
+        try:
+            return await async_probe_topology(hass, host)
+        except CannotConnect:
+            if topology is None:
+                raise
+            _LOGGER.warning(
+                "Could not probe %s, continuing with the devices already known", host
+            )
+
+    return topology
+
+
+async def async_topology_needs_reprobe(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> bool:
+    """Return whether the topology of a config entry should be probed again.
+
+    This is the case if no device is known, the entry and the cache disagree
+    or the topology belongs to another DTU.
+    """
+    cached = await async_get_topology_cache(hass).async_get(
+        config_entry.data[CONF_HOST]
+    )
+    from_entry = Topology.from_entry_data(config_entry.data)
+    topology = from_entry or cached
+    return (
+        topology is None
+        or not topology.has_devices
+        or bool(
+            config_entry.unique_id
+            and topology.dtu_serial_number != config_entry.unique_id
+        )
+        or bool(cached and from_entry and not cached.matches(from_entry))
+    )
+
+
+@callback
+def async_schedule_reprobe(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    scheduler: HoymilesRequestScheduler,
+) -> None:
+    """Probe the DTU of a config entry in the background.
+
+    The requests go through the scheduler of the entry, after its polling.
+    """
+    config_entry.async_create_background_task(
+        hass,
+        _async_reprobe(hass, config_entry, scheduler),
+        f"{DOMAIN} {config_entry.data[CONF_HOST]} topology probe",
+    )
+
+
+async def _async_reprobe(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    scheduler: HoymilesRequestScheduler,
+) -> None:
+    """Probe the DTU and update the config entry with its topology."""
+    host = config_entry.data[CONF_HOST]
+    try:
+        topology = await async_probe_topology(hass, host, scheduler)
+    except CannotConnect:
+        _LOGGER.debug("Could not probe the topology of %s", host)
+        return
+
+    if config_entry.unique_id and topology.dtu_serial_number != config_entry.unique_id:
+        _LOGGER.warning(
+            "DTU %s at %s does not match config entry %s",
+            topology.dtu_serial_number,
+            host,
+            config_entry.unique_id,
+        )
+        return
+
+    current = Topology.from_entry_data(config_entry.data)
+    if current is not None:
+        if current.matches(topology):
+            return
+        topology = current.merge(topology)
+
+    _LOGGER.info("Topology of %s changed, it is used after the next reload", host)
+    hass.config_entries.async_update_entry(
+        config_entry, data={**config_entry.data, **topology.as_entry_data()}
+    )
+
+
+def device_identity(device: str | dict[str, Any]) -> str | tuple:
+    """Return a hashable representation of an inverter, port or meter."""
+    if isinstance(device, str):
+        return device
+    return tuple(sorted(device.items()))
+
+
+def merge_devices(
+    configured: list,
+    reported: list,
+    identity: Callable[[Any], Hashable] = device_identity,
+) -> list:
+    """Return the configured devices still reported, followed by new ones.
+
+    Entity keys contain the position of a device in the config entry, so a
+    device keeps its position. A device that is no longer reported leaves
+    None in its place, a new device never takes the position of another one.
+    """
+    configured_identities = {
+        identity(device) for device in configured if device is not None
+    }
+    reported_identities = {identity(device) for device in reported}
+    return [
+        (
+            device
+            if device is not None and identity(device) in reported_identities
+            else None
+        )
+        for device in configured
+    ] + [device for device in reported if identity(device) not in configured_identities]
+
+
+def _get_identity_function(key: str) -> Callable[[Any], Hashable]:
+    """Return the function identifying the devices of a config entry key.
+
+    Hybrid inverters are identified by serial number, their counts change.
+    """
+    if key == CONF_HYBRID_INVERTERS:
+        return lambda inverter: inverter["inverter_serial_number"]
+    return device_identity
+
+
+def _identities(key: str, devices: list) -> set:
+    """Return the identities of the devices of a config entry key."""
+    identity = _get_identity_function(key)
+    return {identity(device) for device in devices if device is not None}
+
+
+def _has_all_keys(data: dict[str, Any]) -> bool:
+    """Return whether config entry data contains a full topology."""
+    return all(key in data for key in (CONF_DTU_SERIAL_NUMBER, *DEVICE_KEYS))
@@ -0,0 +1,243 @@
+"""Connection to the DTU kept open between requests."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+import struct
+import time
+from typing import Any
+
+from hoymiles_wifi.const import (
+    CMD_APP_GET_HIST_POWER_RES,
+    CMD_APP_INFO_DATA_RES_DTO,
+    CMD_ES_DATA_DTO,
+    CMD_ES_REG_RES_DTO,
+    CMD_GET_CONFIG,
+    CMD_GW_INFO_RES_DTO,
+    CMD_GW_NET_INFO_RES,
+    CMD_HB_RES_DTO,
+    CMD_NETWORK_INFO_RES,
+    CMD_REAL_DATA_RES_DTO,
+    CMD_REAL_RES_DTO,
+    DTU_PORT,
+    NOT_ENCRYPTED_COMMANDS,
+)
+from hoymiles_wifi.dtu import DTU, NetworkState
+
+from .const import CONNECTION_IDLE_TIMEOUT_SECONDS, CONNECTION_KEEPALIVE_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+HEADER_SIZE = 10
+GCM_TAG_SIZE = 16
+# hoymiles_wifi waits this long between the end of a request and the next one.
+MIN_REQUEST_INTERVAL_SECONDS = 2
+# Commands that only read data, they can be sent again if the response was lost.
+READ_ONLY_COMMANDS = frozenset(
+    {
+        CMD_APP_GET_HIST_POWER_RES,
+        CMD_APP_INFO_DATA_RES_DTO,
+        CMD_ES_DATA_DTO,
+        CMD_ES_REG_RES_DTO,
+        CMD_GET_CONFIG,
+        CMD_GW_INFO_RES_DTO,
+        CMD_GW_NET_INFO_RES,
+        CMD_HB_RES_DTO,
+        CMD_NETWORK_INFO_RES,
+        CMD_REAL_DATA_RES_DTO,
+        CMD_REAL_RES_DTO,
+    }
+)
+
+
+class PersistentConnectionDTU(DTU):
+    """DTU client sending all requests over one TCP connection.
+
+    hoymiles_wifi opens a connection for every request. Here the connection
+    stays open with TCP keepalive and is closed after idle_timeout without
+    requests. A connection closed by the DTU is opened again and the request
+    sent again, callers see the same responses as with hoymiles_wifi. Other
+    requests are only sent again if they were not written yet, so a control
+    command is never executed twice.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        idle_timeout: float = CONNECTION_IDLE_TIMEOUT_SECONDS,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the client."""
+        super().__init__(host, **kwargs)
+        self.idle_timeout = idle_timeout
+        self.connections_opened = 0
+        self.reconnects = 0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._port: int | None = None
+        self._idle_timer: asyncio.TimerHandle | None = None
+
+    @property
+    def connected(self) -> bool:
+        """Return whether a connection is open and not closed by the DTU."""
+        return (
+            self._writer is not None
+            and not self._writer.is_closing()
+            and not self._reader.at_eof()
+        )
+
+    async def async_send_request(
+        self,
+        command: bytes,
+        request: Any,
+        response_type: Any,
+        dtu_port: int = DTU_PORT,
+        is_extended_format: bool = False,
+        dtu_serial_number: int = 0,
+        number: int = 0,
+    ):
+        """Send a request over the open connection and return the response."""
+        message = self.generate_message(
+            command, request, is_extended_format, dtu_serial_number, number
+        )
+
+        async with self.mutex:
+            self._cancel_idle_timer()
+
+            elapsed_time = time.time() - self.last_request_time
+            if elapsed_time < MIN_REQUEST_INTERVAL_SECONDS:
+                await asyncio.sleep(MIN_REQUEST_INTERVAL_SECONDS - elapsed_time)
+
+            try:
+                buffer = await self._async_exchange(
+                    message, dtu_port, is_extended_format, command in READ_ONLY_COMMANDS
+                )
+            except (OSError, EOFError, ValueError, TimeoutError) as err:
+                # A late response must not be read as the answer to the next
+                # request, so the connection is not used again.
+                _LOGGER.debug("Request to %s failed: %s", self.host, err)
+                self._close()
+                self.set_state(NetworkState.Offline)
+                return None
+            except BaseException:
+                # A cancelled request may leave its response unread.
+                self._close()
+                raise
+
+            self.last_request_time = time.time()
+            self._idle_timer = asyncio.get_running_loop().call_later(
+                self.idle_timeout, self._close
+            )
+
+        return self.parse_response(buffer, response_type, is_extended_format)
+
+    async def async_close(self) -> None:
+        """Close the connection."""
+        self._cancel_idle_timer()
+        writer = self._writer
+        self._close()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError as err:
+                _LOGGER.debug("Error closing connection to %s: %s", self.host, err)
+
+    async def _async_exchange(
+        self, message: bytes, port: int, is_extended_format: bool, read_only: bool
+    ) -> bytes:
+        """Write a message and read a single response."""
+        reused = self.connected and self._port == port
+        if not reused:
+            self._close()
+            await self._async_connect(port)
+
+        written = False
+        try:
+            await self._async_write(message)
+            written = True
+            return await self._async_read(is_extended_format)
+        except (ConnectionError, EOFError):
+            # The DTU may have executed a written command before it closed
+            # the connection.
+            if not reused or (written and not read_only):
+                raise
+
+        # The DTU closed the connection while it was idle.
+        _LOGGER.debug("Connection to %s was closed, reconnecting", self.host)
+        self.reconnects += 1
+        self._close()
+        await self._async_connect(port)
+        await self._async_write(message)
+        return await self._async_read(is_extended_format)
+
+    async def _async_connect(self, port: int) -> None:
+        """Open a connection with TCP keepalive."""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host=self.host,
+                port=port,
+                local_addr=(
+                    (self.local_addr, 0) if self.local_addr is not None else None
+                ),
+            ),
+            timeout=self.timeout,
+        )
+        self._port = port
+        self.connections_opened += 1
+
+        sock = self._writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                sock.setsockopt(
+                    socket.IPPROTO_TCP,
+                    socket.TCP_KEEPIDLE,
+                    CONNECTION_KEEPALIVE_SECONDS,
+                )
+                sock.setsockopt(
+                    socket.IPPROTO_TCP,
+                    socket.TCP_KEEPINTVL,
+                    CONNECTION_KEEPALIVE_SECONDS,
+                )
+
+    async def _async_write(self, message: bytes) -> None:
+        """Write a message, raising if the connection was closed before."""
+        self._writer.write(message)
+        await self._writer.drain()
+
+    async def _async_read(self, is_extended_format: bool) -> bytes:
+        """Read the response, using the length in its header."""
+        return await asyncio.wait_for(
+            self._async_read_response(is_extended_format), timeout=self.timeout
+        )
+
+    async def _async_read_response(self, is_extended_format: bool) -> bytes:
+        """Read exactly one response, so the next one starts at its header."""
+        header = await self._reader.readexactly(HEADER_SIZE)
+        (length,) = struct.unpack(">H", header[8:10])
+        if (
+            self.is_encrypted
+            and header[2:4] not in NOT_ENCRYPTED_COMMANDS
+            and not is_extended_format
+        ):
+            length += GCM_TAG_SIZE
+        if length < HEADER_SIZE:
+            raise ValueError(f"Invalid response length {length}")
+        return header + await self._reader.readexactly(length - HEADER_SIZE)
+
+    def _cancel_idle_timer(self) -> None:
+        """Cancel closing the idle connection."""
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _close(self) -> None:
+        """Close the connection without waiting for it to be closed."""
+        self._idle_timer = None
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+        self._port = None
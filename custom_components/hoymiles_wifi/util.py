@@ -1,6 +1,6 @@
 """Utils for hoymiles-wifi."""
 
-from typing import Union
+from typing import Any, Union
 import asyncio
 import logging
 
@@ -10,16 +10,18 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
 from hoymiles_wifi.const import IS_ENCRYPTED_BIT_INDEX
+from hoymiles_wifi.protobuf import ESData_pb2, ESRegPB_pb2, RealDataNew_pb2
 
-from .error import CannotConnect
+from .error import CannotConnect, DTUUnreachable
 
 from .const import CONF_ENC_RAND, DEFAULT_TIMEOUT_SECONDS
+from .scheduler import HoymilesRequestScheduler, RequestPriority
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_get_config_entry_data_for_host(
-    host,
+    host, scheduler: HoymilesRequestScheduler | None = None
 ) -> tuple[
     str,
     list[str],
@@ -29,7 +31,20 @@ async def async_get_config_entry_data_for_host(
     bool,
     str,
 ]:
-    """Get data for config entry from host."""
+    """Get data for config entry from host.
+
+    With the scheduler of a set up config entry, its DTU client is used and
+    the requests are queued with its polling. The scheduler spaces the
+    requests, so there is no need to wait between them.
+    """
+
+    async def _async_request(priority: RequestPriority, method, *args, **kwargs):
+        if scheduler is None:
+            return await method(*args, **kwargs)
+        try:
+            return await scheduler.async_request(priority, method, *args, **kwargs)
+        except DTUUnreachable as err:
+            raise CannotConnect from err
 
     single_phase_inverters = []
     three_phase_inverters = []
@@ -40,15 +55,25 @@ async def async_get_config_entry_data_for_host(
     is_encrypted = False
     enc_rand = ""
 
-    dtu = DTU(host, timeout=DEFAULT_TIMEOUT_SECONDS)
+    if scheduler is not None:
+        dtu = scheduler.get_dtu()
+    else:
+        dtu = DTU(host, timeout=DEFAULT_TIMEOUT_SECONDS)
 
-    app_information_data = await dtu.async_app_information_data()
+    app_information_data = await _async_request(
+        RequestPriority.APP_INFO, dtu.async_app_information_data
+    )
 
     if app_information_data and app_information_data.dtu_info.dfs:
         if is_encrypted_dtu(app_information_data.dtu_info.dfs):
             logging.debug("DTU is encrypted.")
             is_encrypted = True
             enc_rand = app_information_data.dtu_info.enc_rand.hex()
+        if is_encrypted and scheduler is not None:
+            # Key the DTU client of the config entry with the probed enc_rand.
+            dtu.is_encrypted = True
+            dtu.enc_rand = bytes.fromhex(enc_rand)
+        elif is_encrypted:
             dtu = DTU(
                 host,
                 is_encrypted=is_encrypted,
@@ -58,53 +83,34 @@ async def async_get_config_entry_data_for_host(
             await asyncio.sleep(2)
 
     logging.debug("Trying get_real_data_new()!")
-    real_data = await dtu.async_get_real_data_new()
+    real_data = await _async_request(
+        RequestPriority.CONFIG, dtu.async_get_real_data_new
+    )
     logging.debug(f"RealDataNew call done. Result: {real_data}")
 
     if real_data:
         dtu_sn = real_data.device_serial_number
-
-        single_phase_inverters = [
-            generate_inverter_serial_number(sgs_data.serial_number)
-            for sgs_data in real_data.sgs_data
-        ]
-
-        three_phase_inverters = [
-            generate_inverter_serial_number(tgs_data.serial_number)
-            for tgs_data in real_data.tgs_data
-        ]
-
-        ports = [
-            {
-                "inverter_serial_number": generate_inverter_serial_number(
-                    pv_data.serial_number
-                ),
-                "port_number": pv_data.port_number,
-            }
-            for pv_data in real_data.pv_data
-        ]
-
-        meters = [
-            {
-                "meter_serial_number": generate_inverter_serial_number(
-                    meter_data.serial_number
-                ),
-                "device_type": meter_data.device_type,
-            }
-            for meter_data in real_data.meter_data
-        ]
+        (
+            single_phase_inverters,
+            three_phase_inverters,
+            ports,
+            meters,
+        ) = get_real_data_devices(real_data)
     else:
-        logging.debug(
-            "RealDataNew is None. Sleeping for 5s before trying get_gateway_info()!"
+        logging.debug("RealDataNew is None. Trying get_gateway_info()!")
+        if scheduler is None:
+            await asyncio.sleep(5)
+        gateway_info = await _async_request(
+            RequestPriority.CONFIG, dtu.async_get_gateway_info
         )
-        await asyncio.sleep(5)
-        gateway_info = await dtu.async_get_gateway_info()
         logging.debug(f"GatewayInfo call done. Result: {gateway_info}")
 
         if gateway_info:
             logging.debug("Trying get energy storage registry call.")
-            registry = await dtu.async_get_energy_storage_registry(
-                dtu_serial_number=gateway_info.serial_number
+            registry = await _async_request(
+                RequestPriority.CONFIG,
+                dtu.async_get_energy_storage_registry,
+                dtu_serial_number=gateway_info.serial_number,
             )
             logging.debug(f"Get energy storage registry call done. Result: {registry}")
 
@@ -112,11 +118,7 @@ async def async_get_config_entry_data_for_host(
                 dtu_sn = str(gateway_info.serial_number)
 
                 hybrid_inverters = [
-                    {
-                        "inverter_serial_number": inverter.serial_number,
-                        "model_name": inverter.model_name,
-                    }
-                    for inverter in registry.inverters
+                    get_registry_inverter(inverter) for inverter in registry.inverters
                 ]
                 logging.debug(f"Hybrid inverters: {hybrid_inverters}")
             else:
@@ -142,6 +144,83 @@ async def async_get_config_entry_data_for_host(
     )
 
 
+def get_real_data_devices(
+    real_data: RealDataNew_pb2.RealDataNewReqDTO,
+) -> tuple[
+    list[str],
+    list[str],
+    list[dict[str, str | int]],
+    list[dict[str, str | int]],
+]:
+    """Get the inverters, ports and meters reported in real data."""
+
+    single_phase_inverters = [
+        generate_inverter_serial_number(sgs_data.serial_number)
+        for sgs_data in real_data.sgs_data
+    ]
+
+    three_phase_inverters = [
+        generate_inverter_serial_number(tgs_data.serial_number)
+        for tgs_data in real_data.tgs_data
+    ]
+
+    ports = [
+        {
+            "inverter_serial_number": generate_inverter_serial_number(
+                pv_data.serial_number
+            ),
+            "port_number": pv_data.port_number,
+        }
+        for pv_data in real_data.pv_data
+    ]
+
+    meters = [
+        {
+            "meter_serial_number": generate_inverter_serial_number(
+                meter_data.serial_number
+            ),
+            "device_type": meter_data.device_type,
+        }
+        for meter_data in real_data.meter_data
+    ]
+
+    return single_phase_inverters, three_phase_inverters, ports, meters
+
+
+def get_registry_inverter(inverter: ESRegPB_pb2.RegInvMO) -> dict[str, Any]:
+    """Get the config entry data of a hybrid inverter in the registry."""
+
+    hybrid_inverter = {
+        "inverter_serial_number": inverter.serial_number,
+        "model_name": inverter.model_name,
+    }
+    if inverter.pv_num:
+        hybrid_inverter["pv_panel_count"] = inverter.pv_num
+    phase_count = get_model_phase_count(inverter.model_name)
+    if phase_count is not None:
+        hybrid_inverter["phase_count"] = phase_count
+    return hybrid_inverter
+
+
+def get_model_phase_count(model_name: str) -> int | None:
+    """Get the number of phases of a hybrid inverter from its model name."""
+    if model_name.startswith(("HYT", "HAT")):
+        return 3
+    if model_name.startswith(("HYS", "HAS")):
+        return 1
+    return None
+
+
+def get_energy_storage_counts(data: ESData_pb2.ESDataReqDTO) -> tuple[int, int]:
+    """Get the number of PV panels and phases in energy storage data."""
+    return len(data.pv_panels), max(
+        len(data.grid.phases),
+        len(data.load.phases),
+        len(data.inverter.phases),
+        len(data.pv_inverter.phases),
+    )
+
+
 def is_encrypted_dtu(dfs: int) -> bool:
     """Check if the DTU is encrypted."""
     return (dfs >> IS_ENCRYPTED_BIT_INDEX) & 1
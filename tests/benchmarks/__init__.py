@@ -0,0 +1,6 @@
+"""Benchmarks for the hoymiles_wifi integration.
+
+Benchmarks are not collected by default. Run them explicitly, for example:
+
+    pytest tests/benchmarks/bench_accessor.py -s --no-cov
+"""
@@ -0,0 +1,247 @@
+"""Micro-benchmark for the sensor attribute accessors."""
+
+import re
+import timeit
+
+from hoymiles_wifi.protobuf import ESData_pb2, RealDataNew_pb2
+
+from custom_components.hoymiles_wifi.accessor import compile_accessor
+from custom_components.hoymiles_wifi.snapshot import RealDataIndex, SnapshotLayout
+
+INVERTER_COUNT = 50
+PORT_COUNT = 200
+ROUNDS = 20
+
+
+def _legacy_resolve(data, attribute_name):
+    """Resolve a key the way HoymilesDataSensorEntity did before accessors."""
+    if "[" in attribute_name and "]" in attribute_name:
+        attribute_name_part, index = attribute_name.split("[")
+        index = int(index.split("]")[0])
+        nested_attribute = (
+            attribute_name.split("].")[1] if "]." in attribute_name else None
+        )
+
+        attribute = getattr(data, attribute_name_part.split("[")[0], [])
+
+        if index < len(attribute):
+            if nested_attribute is not None:
+                return getattr(attribute[index], nested_attribute, None)
+            return attribute[index]
+        return None
+    if "." in attribute_name:
+        attribute = data
+        for part in attribute_name.split("."):
+            attribute = getattr(attribute, part, None)
+        return attribute
+    return getattr(data, attribute_name, None)
+
+
+def _legacy_resolve_path(obj, path):
+    """Resolve a path the way HoymilesEnergyStorageSensorEntity did before."""
+    tokens = re.findall(r"\w+|\[\d+\]", path)
+    for token in tokens:
+        if obj is None:
+            return None
+        if token.startswith("["):
+            try:
+                obj = obj[int(token[1:-1])]
+            except (IndexError, TypeError):
+                return None
+        else:
+            obj = getattr(obj, token, None)
+    return obj
+
+
+def _build_real_data() -> RealDataNew_pb2.RealDataNewReqDTO:
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 12345
+    for index in range(INVERTER_COUNT):
+        sgs_data = real_data.sgs_data.add()
+        sgs_data.serial_number = 0x1161_0000_0000 + index
+        sgs_data.active_power = index
+    for index in range(PORT_COUNT):
+        pv_data = real_data.pv_data.add()
+        pv_data.serial_number = 0x1161_0000_0000 + index // 4
+        pv_data.port_number = index % 4 + 1
+        pv_data.power = index
+    return real_data
+
+
+def _build_keys() -> list[str]:
+    keys = ["dtu_power", "dtu_daily_energy"]
+    for index in range(INVERTER_COUNT):
+        keys.extend(
+            f"sgs_data[{index}].{attribute}"
+            for attribute in (
+                "active_power",
+                "reactive_power",
+                "voltage",
+                "current",
+                "frequency",
+                "power_factor",
+                "temperature",
+                "warning_number",
+            )
+        )
+    for index in range(PORT_COUNT):
+        keys.extend(
+            f"pv_data[{index}].{attribute}"
+            for attribute in (
+                "voltage",
+                "current",
+                "power",
+                "energy_total",
+                "energy_daily",
+                "error_code",
+            )
+        )
+    return keys
+
+
+def _build_devices() -> list[tuple[str | None, int | None]]:
+    """Return the serial number and port every key of _build_keys is bound to."""
+    devices = [(None, None), (None, None)]
+    for index in range(INVERTER_COUNT):
+        devices.extend([(f"{0x1161_0000_0000 + index:x}", None)] * 8)
+    for index in range(PORT_COUNT):
+        devices.extend([(f"{0x1161_0000_0000 + index // 4:x}", index % 4 + 1)] * 6)
+    return devices
+
+
+def test_benchmark_accessor() -> None:
+    """Compare compiled accessors with the legacy string parsing."""
+
+    real_data = _build_real_data()
+    keys = _build_keys()
+    accessors = [compile_accessor(key) for key in keys]
+
+    assert [accessor(real_data) for accessor in accessors] == [
+        _legacy_resolve(real_data, key) for key in keys
+    ]
+
+    legacy = min(
+        timeit.repeat(
+            lambda: [_legacy_resolve(real_data, key) for key in keys],
+            number=ROUNDS,
+            repeat=5,
+        )
+    )
+    compiled = min(
+        timeit.repeat(
+            lambda: [accessor(real_data) for accessor in accessors],
+            number=ROUNDS,
+            repeat=5,
+        )
+    )
+
+    print(
+        f"\n{len(keys)} keys x {ROUNDS} ticks: "
+        f"legacy {legacy * 1000:.1f} ms, compiled {compiled * 1000:.1f} ms, "
+        f"speedup {legacy / compiled:.1f}x"
+    )
+
+
+def test_benchmark_snapshot() -> None:
+    """Compare one accessor per entity with one flatten per poll and slot reads.
+
+    Slots are bound to devices by serial number, so every poll is indexed
+    before it is flattened.
+    """
+
+    real_data = _build_real_data()
+    keys = _build_keys()
+    accessors = [compile_accessor(key) for key in keys]
+    layout = SnapshotLayout()
+    slots = [
+        layout.get_slot(key, serial_number, port_number)
+        for key, (serial_number, port_number) in zip(keys, _build_devices())
+    ]
+
+    def snapshot_tick():
+        snapshot = layout.flatten(RealDataIndex(real_data))
+        return [snapshot[slot] for slot in slots]
+
+    assert snapshot_tick() == [accessor(real_data) for accessor in accessors]
+
+    compiled = min(
+        timeit.repeat(
+            lambda: [accessor(real_data) for accessor in accessors],
+            number=ROUNDS,
+            repeat=5,
+        )
+    )
+    flattened = min(timeit.repeat(snapshot_tick, number=ROUNDS, repeat=5))
+    snapshot = layout.flatten(RealDataIndex(real_data))
+    reads = min(
+        timeit.repeat(
+            lambda: [snapshot[slot] for slot in slots], number=ROUNDS, repeat=5
+        )
+    )
+
+    print(
+        f"\n{len(keys)} keys x {ROUNDS} ticks: "
+        f"compiled accessors {compiled * 1000:.1f} ms, "
+        f"flatten + slot reads {flattened * 1000:.1f} ms, "
+        f"slot reads only {reads * 1000:.1f} ms"
+    )
+
+
+def _build_energy_storage_data() -> list[ESData_pb2.ESDataReqDTO]:
+    responses = []
+    for _ in range(4):
+        response = ESData_pb2.ESDataReqDTO()
+        for index in range(3):
+            response.grid.phases.add().active_power = index
+            response.inverter.phases.add().voltage = index
+        for index in range(2):
+            response.pv_panels.add().power = index
+        response.battery_management.state_of_charge = 50
+        responses.append(response)
+    return responses
+
+
+def _build_energy_storage_keys() -> list[str]:
+    keys = []
+    for inverter in range(4):
+        keys.append(f"[{inverter}].battery_management.state_of_charge")
+        keys.append(f"[{inverter}].grid.param.frequency")
+        for phase in range(3):
+            keys.append(f"[{inverter}].grid.phases[{phase}].active_power")
+            keys.append(f"[{inverter}].inverter.phases[{phase}].voltage")
+        for panel in range(2):
+            keys.append(f"[{inverter}].pv_panels[{panel}].power")
+    return keys
+
+
+def test_benchmark_energy_storage_accessor() -> None:
+    """Compare compiled accessors with the legacy regex path resolution."""
+
+    data = _build_energy_storage_data()
+    keys = _build_energy_storage_keys() * 10
+    accessors = [compile_accessor(key) for key in keys]
+
+    assert [accessor(data) for accessor in accessors] == [
+        _legacy_resolve_path(data, key) for key in keys
+    ]
+
+    legacy = min(
+        timeit.repeat(
+            lambda: [_legacy_resolve_path(data, key) for key in keys],
+            number=ROUNDS,
+            repeat=5,
+        )
+    )
+    compiled = min(
+        timeit.repeat(
+            lambda: [accessor(data) for accessor in accessors],
+            number=ROUNDS,
+            repeat=5,
+        )
+    )
+
+    print(
+        f"\n{len(keys)} energy storage keys x {ROUNDS} ticks: "
+        f"legacy {legacy * 1000:.1f} ms, compiled {compiled * 1000:.1f} ms, "
+        f"speedup {legacy / compiled:.1f}x"
+    )
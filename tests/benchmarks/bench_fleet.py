@@ -0,0 +1,170 @@
+"""Benchmark for the sensor update path of a large DTU fleet."""
+
+import cProfile
+import io
+import pstats
+import time
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import async_get_platforms
+from hoymiles_wifi.protobuf import APPInfomationData_pb2, GetConfig_pb2
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+    HASS_DATA_COORDINATOR,
+    HASS_ENERGY_STORAGE_DATA_COORDINATOR,
+)
+
+from .fleet import (
+    HYBRID_SERIAL_NUMBER_BASE,
+    build_energy_storage_data,
+    build_entry_data,
+    build_real_data,
+)
+
+INVERTER_COUNT = 50
+PORTS_PER_INVERTER = 4
+METER_COUNT = 4
+HYBRID_INVERTER_COUNT = 4
+TICKS = 20
+PROFILE_LINES = 20
+
+
+class FleetDTU:
+    """Answer DTU requests with synthetic payloads of the current tick."""
+
+    def __init__(self) -> None:
+        """Initialize the payloads of the first tick."""
+        self.tick = 0
+
+    async def async_get_real_data_new(self, *args, **kwargs):
+        """Return the real data of all inverters and meters."""
+        return build_real_data(
+            INVERTER_COUNT, PORTS_PER_INVERTER, METER_COUNT, tick=self.tick
+        )
+
+    async def async_get_energy_storage_data(
+        self, dtu_serial_number: int, inverter_serial_number: int
+    ):
+        """Return the energy storage data of a hybrid inverter."""
+        return build_energy_storage_data(
+            seed=inverter_serial_number - HYBRID_SERIAL_NUMBER_BASE, tick=self.tick
+        )
+
+
+async def _async_setup_fleet(hass: HomeAssistant, dtu: FleetDTU) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(
+                build_real_data(INVERTER_COUNT, PORTS_PER_INVERTER, METER_COUNT),
+                HYBRID_INVERTER_COUNT,
+            ),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    # The entities are created by sensor.async_setup_entry while the entry is
+    # set up.
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.LOADED
+    return entry
+
+
+def _sensor_entities(hass: HomeAssistant) -> list:
+    return [
+        entity
+        for platform in async_get_platforms(hass, DOMAIN)
+        if platform.domain == "sensor"
+        for entity in platform.entities.values()
+    ]
+
+
+def _format_profile(profiler: cProfile.Profile) -> str:
+    stats = io.StringIO()
+    pstats.Stats(profiler, stream=stats).sort_stats("cumulative").print_stats(
+        PROFILE_LINES
+    )
+    return stats.getvalue()
+
+
+async def test_benchmark_fleet(hass: HomeAssistant) -> None:
+    """Time and profile coordinator ticks and entity updates of a large fleet."""
+
+    dtu = FleetDTU()
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=dtu.async_get_real_data_new,
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_energy_storage_data",
+            side_effect=dtu.async_get_energy_storage_data,
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        entry = await _async_setup_fleet(hass, dtu)
+        hass_data = hass.data[DOMAIN][entry.entry_id]
+        coordinators = [
+            hass_data[HASS_DATA_COORDINATOR],
+            hass_data[HASS_ENERGY_STORAGE_DATA_COORDINATOR],
+        ]
+        entities = _sensor_entities(hass)
+
+        # Every entity once, as if all of their values changed.
+        update_profiler = cProfile.Profile()
+        start = time.perf_counter()
+        for _ in range(TICKS):
+            update_profiler.enable()
+            for entity in entities:
+                entity._handle_coordinator_update()
+            update_profiler.disable()
+        handle_all = (time.perf_counter() - start) / TICKS
+
+        # Full ticks: fetch, flatten, dispatch of changed fields and states.
+        tick_profiler = cProfile.Profile()
+        start = time.perf_counter()
+        for tick in range(1, TICKS + 1):
+            dtu.tick = tick
+            tick_profiler.enable()
+            for coordinator in coordinators:
+                await coordinator.async_refresh()
+            tick_profiler.disable()
+        refresh = (time.perf_counter() - start) / TICKS
+
+    dispatched = sum(
+        coordinator.field_updates_dispatched for coordinator in coordinators
+    )
+    assert dispatched
+
+    print(
+        f"\n{INVERTER_COUNT} inverters, {INVERTER_COUNT * PORTS_PER_INVERTER} ports, "
+        f"{METER_COUNT} meters, {HYBRID_INVERTER_COUNT} hybrid inverters, "
+        f"{len(entities)} sensors: "
+        f"_handle_coordinator_update of all sensors {handle_all * 1000:.1f} ms, "
+        f"coordinator tick {refresh * 1000:.1f} ms"
+    )
+    print("_handle_coordinator_update of all sensors:")
+    print(_format_profile(update_profiler))
+    print("Coordinator ticks:")
+    print(_format_profile(tick_profiler))
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
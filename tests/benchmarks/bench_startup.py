@@ -0,0 +1,108 @@
+"""Benchmark for setting up several DTU config entries."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from hoymiles_wifi.protobuf import (
+    APPInfomationData_pb2,
+    GetConfig_pb2,
+    RealDataNew_pb2,
+)
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_DTU_SERIAL_NUMBER,
+    CONF_FAST_STARTUP,
+    CONF_INVERTERS,
+    CONF_PORTS,
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+    HASS_CONFIG_COORDINATOR,
+)
+
+DTU_COUNT = 5
+# Simulated round trip of a single DTU request.
+REQUEST_LATENCY = 0.2
+
+
+def _slow(response):
+    async def _request(*args, **kwargs):
+        await asyncio.sleep(REQUEST_LATENCY)
+        return response
+
+    return _request
+
+
+def _add_entries(hass: HomeAssistant, fast_startup: bool) -> list[MockConfigEntry]:
+    entries = []
+    for index in range(DTU_COUNT):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            version=CONFIG_VERSION,
+            unique_id=f"4143{index:08d}",
+            data={
+                "host": f"192.0.2.{index + 1}",
+                CONF_UPDATE_INTERVAL: 35,
+                CONF_DTU_SERIAL_NUMBER: f"4143{index:08d}",
+                CONF_INVERTERS: ["116100000001"],
+                CONF_PORTS: [
+                    {"inverter_serial_number": "116100000001", "port_number": 1}
+                ],
+                CONF_FAST_STARTUP: fast_startup,
+            },
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    return entries
+
+
+@pytest.mark.parametrize("fast_startup", [False, True])
+async def test_benchmark_startup(hass: HomeAssistant, fast_startup: bool) -> None:
+    """Measure how long it takes until all DTUs are set up."""
+
+    entries = _add_entries(hass, fast_startup)
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=_slow(RealDataNew_pb2.RealDataNewReqDTO(dtu_power=1)),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            side_effect=_slow(GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1)),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            side_effect=_slow(APPInfomationData_pb2.APPInfoDataReqDTO()),
+        ),
+    ):
+        start = time.monotonic()
+        assert await async_setup_component(hass, DOMAIN, {})
+        setup_done = time.monotonic() - start
+
+        config_coordinators = [
+            hass.data[DOMAIN][entry.entry_id][HASS_CONFIG_COORDINATOR]
+            for entry in entries
+        ]
+        while any(coordinator.data is None for coordinator in config_coordinators):
+            await asyncio.sleep(0.01)
+        all_done = time.monotonic() - start
+        await hass.async_block_till_done()
+
+    assert all(entry.state is ConfigEntryState.LOADED for entry in entries)
+
+    print(
+        f"\n{DTU_COUNT} DTUs, {REQUEST_LATENCY * 1000:.0f} ms per request, "
+        f"fast startup {fast_startup}: setup {setup_done:.2f}s, "
+        f"all refreshes {all_done:.2f}s"
+    )
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,59 @@
+"""Benchmark for requests over a new and a persistent connection."""
+
+import statistics
+import time
+
+from hoymiles_wifi.dtu import DTU
+from hoymiles_wifi.protobuf import GetConfig_pb2
+import pytest
+
+from custom_components.hoymiles_wifi.transport import PersistentConnectionDTU
+
+from ..simulator import DTUSimulator
+
+# The simulator listens on a real socket.
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+HOST = "127.0.0.1"
+ENC_RAND = bytes(range(16))
+REQUESTS = 500
+
+
+async def _measure(dtu: DTU) -> list[float]:
+    latencies = []
+    for _ in range(REQUESTS):
+        # Do not wait for the minimum time between two requests of the client.
+        dtu.last_request_time = 0
+        start = time.perf_counter()
+        assert await dtu.async_get_config()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+@pytest.mark.parametrize("enc_rand", [None, ENC_RAND])
+async def test_benchmark_transport(enc_rand: bytes | None) -> None:
+    """Measure the latency of requests with and without connection reuse."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        enc_rand=enc_rand,
+        keep_alive=True,
+    ):
+        kwargs = {"is_encrypted": enc_rand is not None, "enc_rand": enc_rand or b""}
+        per_request = await _measure(DTU(HOST, **kwargs))
+        persistent_dtu = PersistentConnectionDTU(HOST, **kwargs)
+        persistent = await _measure(persistent_dtu)
+        await persistent_dtu.async_close()
+
+    assert persistent_dtu.connections_opened == 1
+
+    per_request_median = statistics.median(per_request) * 1e6
+    persistent_median = statistics.median(persistent) * 1e6
+    print(
+        f"\n{REQUESTS} requests, encrypted {enc_rand is not None}: "
+        f"connection per request {per_request_median:.0f} µs, "
+        f"persistent connection {persistent_median:.0f} µs, "
+        f"saving {per_request_median - persistent_median:.0f} µs "
+        f"({1 - persistent_median / per_request_median:.0%}) per request"
+    )
@@ -0,0 +1,129 @@
+"""Synthetic payloads of a DTU fleet for benchmarks."""
+
+from typing import Any
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import Message
+from hoymiles_wifi.protobuf import ESData_pb2, RealDataNew_pb2
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_DTU_SERIAL_NUMBER,
+    CONF_HYBRID_INVERTERS,
+    CONF_INVERTERS,
+    CONF_METERS,
+    CONF_PORTS,
+    CONF_THREE_PHASE_INVERTERS,
+)
+from custom_components.hoymiles_wifi.entity import DeviceType
+from custom_components.hoymiles_wifi.util import get_real_data_devices
+
+DTU_SERIAL_NUMBER = "414312345678"
+SINGLE_PHASE_SERIAL_NUMBER_BASE = 0x1161_0000_0000
+THREE_PHASE_SERIAL_NUMBER_BASE = 0x1382_0000_0000
+METER_SERIAL_NUMBER_BASE = 0x37FF_0000_0000
+HYBRID_SERIAL_NUMBER_BASE = 0x2310_0000_0000
+
+NUMERIC_TYPES = {
+    FieldDescriptor.TYPE_INT32,
+    FieldDescriptor.TYPE_INT64,
+    FieldDescriptor.TYPE_UINT32,
+    FieldDescriptor.TYPE_UINT64,
+    FieldDescriptor.TYPE_SINT32,
+    FieldDescriptor.TYPE_SINT64,
+    FieldDescriptor.TYPE_FLOAT,
+    FieldDescriptor.TYPE_DOUBLE,
+}
+# Fields identifying a record, they are kept when values are filled in.
+IDENTITY_FIELDS = {"serial_number", "port_number", "device_type"}
+
+
+def fill_values(message: Message, seed: int, tick: int) -> None:
+    """Set every numeric field of a message and its submessages.
+
+    Values depend on the seed and the tick, so every tick changes them.
+    """
+    for index, field in enumerate(message.DESCRIPTOR.fields):
+        if field.name in IDENTITY_FIELDS:
+            continue
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            if _is_repeated(field):
+                for item_index, item in enumerate(getattr(message, field.name)):
+                    fill_values(item, seed * 31 + item_index, tick)
+            else:
+                fill_values(getattr(message, field.name), seed * 31 + index, tick)
+        elif field.type in NUMERIC_TYPES and not _is_repeated(field):
+            setattr(message, field.name, (seed * 7 + index * 13 + tick) % 1000 + 1)
+
+
+def _is_repeated(field: FieldDescriptor) -> bool:
+    """Return whether a field is repeated, for all protobuf versions."""
+    if hasattr(field, "is_repeated"):
+        return field.is_repeated
+    return field.label == FieldDescriptor.LABEL_REPEATED
+
+
+def build_real_data(
+    inverter_count: int,
+    ports_per_inverter: int = 4,
+    meter_count: int = 0,
+    three_phase_inverter_count: int = 0,
+    tick: int = 0,
+) -> RealDataNew_pb2.RealDataNewReqDTO:
+    """Build a real data response of a fleet of inverters and meters."""
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+
+    def _add_inverter(records, serial_number: int) -> None:
+        records.add(serial_number=serial_number)
+        for port_number in range(1, ports_per_inverter + 1):
+            real_data.pv_data.add(serial_number=serial_number, port_number=port_number)
+
+    for index in range(inverter_count):
+        _add_inverter(real_data.sgs_data, SINGLE_PHASE_SERIAL_NUMBER_BASE + index)
+    for index in range(three_phase_inverter_count):
+        _add_inverter(real_data.tgs_data, THREE_PHASE_SERIAL_NUMBER_BASE + index)
+    for index in range(meter_count):
+        real_data.meter_data.add(
+            serial_number=METER_SERIAL_NUMBER_BASE + index,
+            device_type=DeviceType.THREE_PHASE_METER.value,
+        )
+
+    fill_values(real_data, 0, tick)
+    return real_data
+
+
+def build_energy_storage_data(
+    pv_panel_count: int = 2, phase_count: int = 3, seed: int = 0, tick: int = 0
+) -> ESData_pb2.ESDataReqDTO:
+    """Build an energy storage response of a hybrid inverter."""
+    data = ESData_pb2.ESDataReqDTO()
+    for _ in range(pv_panel_count):
+        data.pv_panels.add()
+    for part in (data.grid, data.load, data.inverter, data.pv_inverter):
+        for _ in range(phase_count):
+            part.phases.add()
+
+    fill_values(data, seed, tick)
+    return data
+
+
+def build_entry_data(
+    real_data: RealDataNew_pb2.RealDataNewReqDTO, hybrid_inverter_count: int = 0
+) -> dict[str, Any]:
+    """Build the config entry data of the devices in a real data response."""
+    single_phase_inverters, three_phase_inverters, ports, meters = (
+        get_real_data_devices(real_data)
+    )
+    return {
+        CONF_DTU_SERIAL_NUMBER: DTU_SERIAL_NUMBER,
+        CONF_INVERTERS: single_phase_inverters,
+        CONF_THREE_PHASE_INVERTERS: three_phase_inverters,
+        CONF_PORTS: ports,
+        CONF_METERS: meters,
+        CONF_HYBRID_INVERTERS: [
+            {
+                "inverter_serial_number": HYBRID_SERIAL_NUMBER_BASE + index,
+                "model_name": "HYT",
+            }
+            for index in range(hybrid_inverter_count)
+        ],
+    }
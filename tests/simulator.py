@@ -0,0 +1,451 @@
+"""Local stand-in for a Hoymiles DTU.
+
+The simulator speaks the wire protocol of hoymiles_wifi.dtu.DTU, in plain and
+encrypted mode, and answers from configurable responses. Latency, dropped
+requests and DTUs serving a single connection at a time can be injected. Like
+hoymiles_wifi, the simulator uses a connection per request unless keep_alive
+is set.
+
+hoymiles_wifi always connects to port 10081, so several DTUs are simulated on
+different loopback addresses, for example 127.0.0.2 to 127.0.0.51:
+
+    python -m tests.simulator --count 50 --inverters 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import random
+import struct
+from typing import Self
+
+from crcmod import mkCrcFun
+from google.protobuf.message import Message
+from hoymiles_wifi.const import (
+    CMD_APP_INFO_DATA_RES_DTO,
+    CMD_CLOUD_COMMAND_RES_DTO,
+    CMD_COMMAND_RES_DTO,
+    CMD_ES_DATA_DTO,
+    CMD_ES_REG_RES_DTO,
+    CMD_ES_USER_SET_RES_DTO,
+    CMD_GET_CONFIG,
+    CMD_GW_INFO_RES_DTO,
+    CMD_GW_NET_INFO_RES,
+    CMD_HB_RES_DTO,
+    CMD_HEADER,
+    CMD_REAL_RES_DTO,
+    CMD_SET_CONFIG,
+    DTU_PORT,
+    IS_ENCRYPTED_BIT_INDEX,
+    NOT_ENCRYPTED_COMMANDS,
+)
+from hoymiles_wifi.crypt_util import crypt_data
+from hoymiles_wifi.protobuf import (
+    APPHeartbeatPB_pb2,
+    APPInfomationData_pb2,
+    CommandPB_pb2,
+    ESData_pb2,
+    ESRegPB_pb2,
+    ESUserSet_pb2,
+    GetConfig_pb2,
+    GWInfo_pb2,
+    GWNetInfo_pb2,
+    RealDataNew_pb2,
+    SetConfig_pb2,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+crc16 = mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+
+HEADER_SIZE = 10
+EXTENDED_HEADER_SIZE = 24
+GCM_TAG_SIZE = 16
+# hoymiles_wifi reads a single chunk of 1024 bytes per request, so larger real
+# data is split into pages like a real DTU does. Pages leave room for the page
+# number and count.
+MAX_RESPONSE_SIZE = 1024
+MAX_REAL_DATA_PAGE_SIZE = MAX_RESPONSE_SIZE - HEADER_SIZE - GCM_TAG_SIZE - 8
+
+DEFAULT_DTU_SERIAL_NUMBER = "414312345678"
+REAL_DATA_RECORDS = ("sgs_data", "tgs_data", "pv_data", "meter_data")
+
+
+@dataclass(frozen=True)
+class Command:
+    """Request type of a command and whether it uses the extended format."""
+
+    request_type: type[Message]
+    extended: bool = False
+
+
+COMMANDS = {
+    CMD_APP_INFO_DATA_RES_DTO: Command(APPInfomationData_pb2.APPInfoDataResDTO),
+    CMD_REAL_RES_DTO: Command(RealDataNew_pb2.RealDataNewResDTO),
+    CMD_GET_CONFIG: Command(GetConfig_pb2.GetConfigResDTO),
+    CMD_SET_CONFIG: Command(SetConfig_pb2.SetConfigResDTO),
+    CMD_COMMAND_RES_DTO: Command(CommandPB_pb2.CommandResDTO),
+    CMD_CLOUD_COMMAND_RES_DTO: Command(CommandPB_pb2.CommandResDTO),
+    CMD_HB_RES_DTO: Command(APPHeartbeatPB_pb2.HBResDTO),
+    CMD_GW_INFO_RES_DTO: Command(GWInfo_pb2.GWInfoResDTO, extended=True),
+    CMD_GW_NET_INFO_RES: Command(GWNetInfo_pb2.GWNetInfoRes, extended=True),
+    CMD_ES_REG_RES_DTO: Command(ESRegPB_pb2.ESRegResDTO, extended=True),
+    CMD_ES_DATA_DTO: Command(ESData_pb2.ESDataResDTO, extended=True),
+    CMD_ES_USER_SET_RES_DTO: Command(ESUserSet_pb2.ESUserSetPutResDTO, extended=True),
+}
+
+
+class DTUSimulator:
+    """Answer hoymiles_wifi requests like a DTU.
+
+    Responses are read when a request arrives, so they can be replaced while
+    the simulator runs. Received requests are kept in requests.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DTU_PORT,
+        dtu_serial_number: str = DEFAULT_DTU_SERIAL_NUMBER,
+        real_data: RealDataNew_pb2.RealDataNewReqDTO | None = None,
+        config: GetConfig_pb2.GetConfigReqDTO | None = None,
+        app_info: APPInfomationData_pb2.APPInfoDataReqDTO | None = None,
+        gateway_info: GWInfo_pb2.GWInfoReqDTO | None = None,
+        gateway_network_info: GWNetInfo_pb2.GWNetInfoReq | None = None,
+        energy_storage_registry: ESRegPB_pb2.ESRegReqDTO | None = None,
+        energy_storage_data: dict[int, ESData_pb2.ESDataReqDTO] | None = None,
+        enc_rand: bytes | None = None,
+        latency: float = 0.0,
+        drop_rate: float = 0.0,
+        single_connection: bool = False,
+        keep_alive: bool = False,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the simulator.
+
+        If enc_rand is given, the DTU is encrypted and announces enc_rand in
+        its app information data. drop_rate is the share of requests closed
+        without an answer. A DTU with single_connection closes connections
+        arriving while another one is served. A DTU with keep_alive answers
+        further requests on a connection until the client closes it.
+        """
+        self.host = host
+        self.port = port
+        self.dtu_serial_number = dtu_serial_number
+        self.real_data = real_data
+        self.config = config
+        self.app_info = app_info
+        self.gateway_info = gateway_info
+        self.gateway_network_info = gateway_network_info
+        self.energy_storage_registry = energy_storage_registry
+        self.energy_storage_data = energy_storage_data or {}
+        self.enc_rand = enc_rand
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.single_connection = single_connection
+        self.keep_alive = keep_alive
+        self.requests: list[tuple[bytes, Message]] = []
+        self.dropped_requests = 0
+        self.refused_connections = 0
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._handlers: dict[bytes, Callable[[Message], Message | None]] = {
+            CMD_APP_INFO_DATA_RES_DTO: lambda _: self._app_info(),
+            CMD_REAL_RES_DTO: self._real_data_page,
+            CMD_GET_CONFIG: lambda _: self.config,
+            CMD_SET_CONFIG: lambda _: SetConfig_pb2.SetConfigReqDTO(),
+            CMD_COMMAND_RES_DTO: _command_response,
+            CMD_CLOUD_COMMAND_RES_DTO: _command_response,
+            CMD_HB_RES_DTO: lambda _: APPHeartbeatPB_pb2.HBReqDTO(),
+            CMD_GW_INFO_RES_DTO: lambda _: self.gateway_info,
+            CMD_GW_NET_INFO_RES: lambda _: self.gateway_network_info,
+            CMD_ES_REG_RES_DTO: lambda _: self.energy_storage_registry,
+            CMD_ES_DATA_DTO: lambda request: self.energy_storage_data.get(
+                request.serial_number
+            ),
+            CMD_ES_USER_SET_RES_DTO: lambda _: ESUserSet_pb2.ESUserSetPutReqDTO(),
+        }
+        self._active_connections = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._server: asyncio.Server | None = None
+
+    @property
+    def is_encrypted(self) -> bool:
+        """Return whether the DTU encrypts its messages."""
+        return self.enc_rand is not None
+
+    async def __aenter__(self) -> Self:
+        """Start the simulator."""
+        await self.async_start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Stop the simulator."""
+        await self.async_stop()
+
+    async def async_start(self) -> None:
+        """Listen for connections."""
+        self._server = await asyncio.start_server(
+            self._async_handle_connection, self.host, self.port
+        )
+
+    async def async_stop(self) -> None:
+        """Stop listening and close open connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.async_close_connections()
+
+    async def async_close_connections(self) -> None:
+        """Close open connections, like a DTU dropping idle clients."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def commands(self, command: bytes) -> list[Message]:
+        """Return the received requests of a command."""
+        return [request for tag, request in self.requests if tag == command]
+
+    async def _async_handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer a single request, or all requests with keep_alive."""
+        if self.single_connection and self._active_connections:
+            self.refused_connections += 1
+            writer.close()
+            return
+
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._active_connections += 1
+        self.connections += 1
+        try:
+            await self._async_answer(reader, writer)
+            while self.keep_alive:
+                await self._async_answer(reader, writer)
+        except asyncio.IncompleteReadError as err:
+            if err.partial:
+                _LOGGER.debug("Incomplete request to %s: %s", self.host, err)
+        except (ConnectionError, ValueError) as err:
+            _LOGGER.debug("Invalid request to %s: %s", self.host, err)
+        except asyncio.CancelledError:
+            # The simulator was stopped while the request was delayed.
+            pass
+        finally:
+            self._active_connections -= 1
+            self._tasks.discard(task)
+            writer.close()
+
+    async def _async_answer(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Read a request and write its response."""
+        header = await reader.readexactly(HEADER_SIZE)
+        if header[:2] != CMD_HEADER:
+            raise ValueError(f"Invalid header {header.hex()}")
+
+        tag = header[2:4]
+        (sequence,) = struct.unpack(">H", header[4:6])
+        (length,) = struct.unpack(">H", header[8:10])
+        command = COMMANDS.get(tag)
+        if command is None:
+            raise ValueError(f"Unknown command {tag.hex()}")
+
+        encrypted = (
+            self.is_encrypted
+            and not command.extended
+            and tag not in NOT_ENCRYPTED_COMMANDS
+        )
+        if encrypted:
+            length += GCM_TAG_SIZE
+        body = await reader.readexactly(length - HEADER_SIZE)
+
+        if command.extended:
+            payload = body[EXTENDED_HEADER_SIZE - HEADER_SIZE :]
+        elif encrypted:
+            payload = crypt_data(
+                False, self.enc_rand, struct.unpack(">H", tag)[0], sequence, body
+            )
+        else:
+            payload = body
+        request = command.request_type.FromString(payload)
+        self.requests.append((tag, request))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            self.dropped_requests += 1
+            return
+
+        response = self._handlers[tag](request)
+        if response is None:
+            return
+        writer.write(self._frame(tag, sequence, command, response))
+        await writer.drain()
+
+    def _app_info(self) -> APPInfomationData_pb2.APPInfoDataReqDTO:
+        """Return the app information data, announcing the encryption."""
+        app_info = APPInfomationData_pb2.APPInfoDataReqDTO()
+        if self.app_info is not None:
+            app_info.CopyFrom(self.app_info)
+        if not app_info.dtu_serial_number:
+            app_info.dtu_serial_number = self.dtu_serial_number
+        if self.is_encrypted:
+            app_info.dtu_info.dfs |= 1 << IS_ENCRYPTED_BIT_INDEX
+            app_info.dtu_info.enc_rand = self.enc_rand
+        return app_info
+
+    def _real_data_page(
+        self, request: RealDataNew_pb2.RealDataNewResDTO
+    ) -> RealDataNew_pb2.RealDataNewReqDTO | None:
+        """Return the requested page of the real data."""
+        if self.real_data is None:
+            return None
+        pages = paginate_real_data(self.real_data)
+        if request.cp >= len(pages):
+            return None
+        return pages[request.cp]
+
+    def _frame(
+        self, tag: bytes, sequence: int, command: Command, response: Message
+    ) -> bytes:
+        """Frame a response the way hoymiles_wifi parses it."""
+        payload = response.SerializeToString()
+
+        if command.extended:
+            metadata = struct.pack(">HH", sequence, crc16(payload)) + struct.pack(
+                ">HHQHH",
+                EXTENDED_HEADER_SIZE + len(payload),
+                EXTENDED_HEADER_SIZE - HEADER_SIZE,
+                int(self.dtu_serial_number),
+                0,
+                1,
+            )
+            message = CMD_HEADER + tag + metadata + payload
+        elif self.is_encrypted and tag not in NOT_ENCRYPTED_COMMANDS:
+            ciphertext = crypt_data(
+                True, self.enc_rand, struct.unpack(">H", tag)[0], sequence, payload
+            )
+            metadata = struct.pack(
+                ">HHH",
+                sequence,
+                crc16(ciphertext[:-GCM_TAG_SIZE]),
+                len(ciphertext) - GCM_TAG_SIZE + HEADER_SIZE,
+            )
+            message = CMD_HEADER + tag + metadata + ciphertext
+        else:
+            metadata = struct.pack(
+                ">HHH", sequence, crc16(payload), len(payload) + HEADER_SIZE
+            )
+            message = CMD_HEADER + tag + metadata + payload
+
+        if len(message) > MAX_RESPONSE_SIZE:
+            _LOGGER.debug(
+                "Response %s of %d bytes is cut off by the client",
+                tag.hex(),
+                len(message),
+            )
+        return message
+
+
+def _command_response(
+    request: CommandPB_pb2.CommandResDTO,
+) -> CommandPB_pb2.CommandReqDTO:
+    """Acknowledge a command."""
+    return CommandPB_pb2.CommandReqDTO(action=request.action, tid=request.tid)
+
+
+def paginate_real_data(
+    real_data: RealDataNew_pb2.RealDataNewReqDTO,
+    max_size: int = MAX_REAL_DATA_PAGE_SIZE,
+) -> list[RealDataNew_pb2.RealDataNewReqDTO]:
+    """Split real data into pages of at most max_size bytes.
+
+    Every page carries the DTU fields, the records are spread over the pages.
+    Page numbers are in cp, the number of pages in ap.
+    """
+    base = RealDataNew_pb2.RealDataNewReqDTO()
+    base.CopyFrom(real_data)
+    for name in REAL_DATA_RECORDS:
+        base.ClearField(name)
+
+    page = RealDataNew_pb2.RealDataNewReqDTO()
+    page.CopyFrom(base)
+    pages = [page]
+    for name in REAL_DATA_RECORDS:
+        for record in getattr(real_data, name):
+            getattr(page, name).add().CopyFrom(record)
+            if page.ByteSize() > max_size and _record_count(page) > 1:
+                del getattr(page, name)[-1]
+                page = RealDataNew_pb2.RealDataNewReqDTO()
+                page.CopyFrom(base)
+                getattr(page, name).add().CopyFrom(record)
+                pages.append(page)
+
+    for index, page in enumerate(pages):
+        page.cp = index
+        page.ap = len(pages)
+    return pages
+
+
+def _record_count(real_data: RealDataNew_pb2.RealDataNewReqDTO) -> int:
+    """Return the number of inverter, port and meter records in real data."""
+    return sum(len(getattr(real_data, name)) for name in REAL_DATA_RECORDS)
+
+
+async def async_main() -> None:
+    """Run simulated DTUs with synthetic data until interrupted."""
+    # Imported here, the fleet generator is only needed by the command line.
+    from .benchmarks.fleet import build_real_data
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1, help="number of DTUs")
+    parser.add_argument("--first-host", default="127.0.0.2")
+    parser.add_argument("--inverters", type=int, default=4)
+    parser.add_argument("--ports", type=int, default=4, help="ports per inverter")
+    parser.add_argument("--meters", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--encrypted", action="store_true")
+    parser.add_argument("--single-connection", action="store_true")
+    parser.add_argument("--keep-alive", action="store_true")
+    args = parser.parse_args()
+
+    prefix, first = args.first_host.rsplit(".", 1)
+    simulators = []
+    for index in range(args.count):
+        real_data = build_real_data(args.inverters, args.ports, args.meters)
+        real_data.device_serial_number = f"4143{index:08d}"
+        simulator = DTUSimulator(
+            host=f"{prefix}.{int(first) + index}",
+            dtu_serial_number=real_data.device_serial_number,
+            real_data=real_data,
+            config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1000),
+            enc_rand=bytes(range(16)) if args.encrypted else None,
+            latency=args.latency,
+            drop_rate=args.drop_rate,
+            single_connection=args.single_connection,
+            keep_alive=args.keep_alive,
+        )
+        await simulator.async_start()
+        simulators.append(simulator)
+        print(f"DTU {simulator.dtu_serial_number} listening on {simulator.host}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for simulator in simulators:
+            await simulator.async_stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(async_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,60 @@
+"""Unit tests for the compiled attribute accessors."""
+
+from hoymiles_wifi.protobuf import RealDataNew_pb2
+
+from custom_components.hoymiles_wifi.accessor import compile_accessor, parse_path
+
+
+def _real_data() -> RealDataNew_pb2.RealDataNewReqDTO:
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 1234
+    for index in range(2):
+        sgs_data = real_data.sgs_data.add()
+        sgs_data.serial_number = 0x1161_0000_0000 + index
+        sgs_data.active_power = 100 * (index + 1)
+    return real_data
+
+
+def test_parse_path() -> None:
+    """Test splitting attribute paths into steps."""
+
+    assert parse_path("dtu_power") == ((False, "dtu_power"),)
+    assert parse_path("sgs_data[1].active_power") == (
+        (False, "sgs_data"),
+        (True, 1),
+        (False, "active_power"),
+    )
+    assert parse_path("[0].grid.phases[2].voltage") == (
+        (True, 0),
+        (False, "grid"),
+        (False, "phases"),
+        (True, 2),
+        (False, "voltage"),
+    )
+    assert parse_path("tgs_data[0.current_phase_A") == (
+        (False, "tgs_data[0"),
+        (False, "current_phase_A"),
+    )
+
+
+def test_compile_accessor() -> None:
+    """Test reading values through compiled accessors."""
+
+    real_data = _real_data()
+
+    assert compile_accessor("dtu_power")(real_data) == 1234
+    assert compile_accessor("sgs_data[1].active_power")(real_data) == 200
+    assert compile_accessor("sgs_data[2].active_power")(real_data) is None
+    assert compile_accessor("sgs_data[0].unknown")(real_data) is None
+    assert compile_accessor("tgs_data[0.current_phase_A")(real_data) is None
+    assert compile_accessor("unknown.attribute")(real_data) is None
+    assert compile_accessor("[1].active_power")(real_data.sgs_data) == 200
+    assert compile_accessor("[5].active_power")(real_data.sgs_data) is None
+
+
+def test_compile_accessor_is_cached() -> None:
+    """Test that accessors for the same path are shared."""
+
+    assert compile_accessor("sgs_data[0].voltage") is compile_accessor(
+        "sgs_data[0].voltage"
+    )
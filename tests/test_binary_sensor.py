@@ -0,0 +1,80 @@
+"""Tests of the Hoymiles binary sensor entities."""
+
+from unittest.mock import patch
+
+from homeassistant.components.binary_sensor import DOMAIN as BINARY_SENSOR_DOMAIN
+from homeassistant.const import CONF_HOST, STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from hoymiles_wifi.dtu import NetworkState
+from hoymiles_wifi.protobuf import APPInfomationData_pb2, GetConfig_pb2
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+    HASS_DATA_COORDINATOR,
+)
+
+from .benchmarks.fleet import build_entry_data, build_real_data
+
+
+async def test_dtu_connectivity_is_only_updated_on_change(
+    hass: HomeAssistant,
+) -> None:
+    """Test that the DTU connectivity sensor is not woken by new real data."""
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(build_real_data(inverter_count=1)),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=lambda: build_real_data(inverter_count=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    entity_id = er.async_get(hass).async_get_entity_id(
+        BINARY_SENSOR_DOMAIN, DOMAIN, f"hoymiles_{entry.entry_id}_DTU"
+    )
+    coordinator = hass.data[DOMAIN][entry.entry_id][HASS_DATA_COORDINATOR]
+    dtu = coordinator.get_dtu()
+    dtu.set_state(NetworkState.Online)
+    coordinator.async_set_updated_data(coordinator.data)
+    assert hass.states.get(entity_id).state == STATE_ON
+
+    entity = hass.data[BINARY_SENSOR_DOMAIN].get_entity(entity_id)
+    with patch.object(
+        entity, "async_write_ha_state", wraps=entity.async_write_ha_state
+    ) as async_write_ha_state:
+        real_data = build_real_data(inverter_count=1)
+        real_data.dtu_power += 100
+        coordinator.async_set_updated_data(real_data)
+        async_write_ha_state.assert_not_called()
+
+        dtu.set_state(NetworkState.Offline)
+        coordinator.async_set_updated_data(coordinator.data)
+        async_write_ha_state.assert_called_once()
+    assert hass.states.get(entity_id).state == STATE_OFF
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,148 @@
+"""Unit tests for the DTU circuit breaker."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.core import HomeAssistant
+from hoymiles_wifi.dtu import NetworkState
+from hoymiles_wifi.protobuf import RealDataNew_pb2
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.breaker import CircuitBreaker, CircuitState
+from custom_components.hoymiles_wifi.const import DOMAIN
+from custom_components.hoymiles_wifi.coordinator import (
+    HoymilesRealDataUpdateCoordinator,
+)
+from custom_components.hoymiles_wifi.error import DTUUnreachable
+from custom_components.hoymiles_wifi.scheduler import (
+    HoymilesRequestScheduler,
+    RequestPriority,
+)
+
+
+def test_breaker_opens_and_recovers() -> None:
+    """Test the closed, open and half-open transitions."""
+
+    breaker = CircuitBreaker(failure_threshold=2, base_backoff=10, max_backoff=100)
+
+    breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert 8 <= breaker.retry_in <= 12
+
+    with patch(
+        "custom_components.hoymiles_wifi.breaker.time.monotonic",
+        return_value=breaker._retry_at,
+    ):
+        assert breaker.allow_request()
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert not breaker.allow_request()
+
+        breaker.record_failure()
+
+        assert breaker.state is CircuitState.OPEN
+        assert 16 <= breaker.retry_in <= 24
+
+    breaker.state = CircuitState.HALF_OPEN
+    breaker.record_success()
+
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow_request()
+
+
+async def test_open_breaker_returns_cached_data(hass: HomeAssistant) -> None:
+    """Test that coordinators skip the DTU while the breaker is open."""
+
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 1234
+
+    dtu = MagicMock()
+    dtu.get_state.return_value = NetworkState.Online
+    dtu.async_get_real_data_new = AsyncMock(return_value=real_data)
+    scheduler = HoymilesRequestScheduler(dtu)
+    coordinator = HoymilesRealDataUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=scheduler,
+        config_entry=MockConfigEntry(domain=DOMAIN),
+        update_interval=timedelta(seconds=35),
+    )
+
+    assert await coordinator._async_update_data() is real_data
+    coordinator.data = real_data
+
+    dtu.get_state.return_value = NetworkState.Offline
+    dtu.async_get_real_data_new.return_value = None
+    for _ in range(scheduler.circuit_breaker.failure_threshold):
+        await coordinator._async_update_data()
+
+    assert scheduler.circuit_breaker.state is CircuitState.OPEN
+    dtu.async_get_real_data_new.reset_mock()
+
+    assert await coordinator._async_update_data() is real_data
+    dtu.async_get_real_data_new.assert_not_called()
+
+    with pytest.raises(DTUUnreachable):
+        await scheduler.async_request(RequestPriority.CONFIG, AsyncMock())
+
+    control = AsyncMock(return_value="done")
+    assert await scheduler.async_request(RequestPriority.CONTROL, control) == "done"
+
+
+def _half_open_scheduler() -> HoymilesRequestScheduler:
+    dtu = MagicMock()
+    dtu.get_state.return_value = NetworkState.Online
+    scheduler = HoymilesRequestScheduler(dtu)
+    breaker = scheduler.circuit_breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker._retry_at = 0.0
+    return scheduler
+
+
+async def test_probe_raises() -> None:
+    """Test that a probe raising an exception opens the breaker again."""
+
+    scheduler = _half_open_scheduler()
+    breaker = scheduler.circuit_breaker
+
+    with pytest.raises(OSError):
+        await scheduler.async_request(
+            RequestPriority.REAL_DATA, AsyncMock(side_effect=OSError)
+        )
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.opened_count == 2
+    assert breaker.retry_in > 0
+
+
+async def test_probe_cancelled() -> None:
+    """Test that the request after a cancelled probe probes the DTU."""
+
+    scheduler = _half_open_scheduler()
+    breaker = scheduler.circuit_breaker
+    started = asyncio.Event()
+
+    async def _request():
+        started.set()
+        await asyncio.Event().wait()
+
+    task = asyncio.create_task(
+        scheduler.async_request(RequestPriority.REAL_DATA, _request)
+    )
+    await started.wait()
+    assert breaker.state is CircuitState.HALF_OPEN
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state is CircuitState.OPEN
+    probe = AsyncMock(return_value="data")
+    assert await scheduler.async_request(RequestPriority.REAL_DATA, probe) == "data"
+    assert breaker.state is CircuitState.CLOSED
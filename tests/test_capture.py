@@ -0,0 +1,116 @@
+"""Tests of the real data capture."""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.hoymiles_wifi.const import (
+    CAPTURE_UPDATE_INTERVAL_SECONDS,
+    DOMAIN,
+)
+from custom_components.hoymiles_wifi.coordinator import (
+    HoymilesRealDataUpdateCoordinator,
+)
+from custom_components.hoymiles_wifi.scheduler import HoymilesRequestScheduler
+
+from .benchmarks.fleet import build_real_data
+
+UPDATE_INTERVAL = timedelta(seconds=30)
+
+
+async def test_capture(hass: HomeAssistant, freezer: FrozenDateTimeFactory) -> None:
+    """Test that samples are buffered, downsampled and the interval restored."""
+
+    tick = 0
+
+    async def async_get_real_data_new():
+        return build_real_data(inverter_count=1, tick=tick)
+
+    dtu = MagicMock()
+    dtu.async_get_real_data_new = AsyncMock(side_effect=async_get_real_data_new)
+    coordinator = HoymilesRealDataUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=MockConfigEntry(domain=DOMAIN),
+        update_interval=UPDATE_INTERVAL,
+    )
+    listener = MagicMock()
+    coordinator.async_add_listener(listener, coordinator.get_field("dtu_power"))
+    # Listeners without a field, like diagnostic sensors.
+    update_listener = MagicMock()
+    coordinator.async_add_listener(update_listener)
+
+    monotonic = 1000.0
+    with patch(
+        "custom_components.hoymiles_wifi.capture.time.monotonic",
+        side_effect=lambda: monotonic,
+    ):
+        await coordinator.async_start_capture(timedelta(minutes=1))
+        assert coordinator.capturing
+        assert coordinator.update_interval == timedelta(
+            seconds=CAPTURE_UPDATE_INTERVAL_SECONDS
+        )
+        assert listener.call_count == 1
+        published = coordinator.data
+
+        for _ in range(5):
+            tick += 1
+            monotonic += CAPTURE_UPDATE_INTERVAL_SECONDS
+            await coordinator.async_refresh()
+
+        # Only the samples are updated within the publish interval.
+        assert coordinator.data is published
+        assert listener.call_count == 1
+        assert update_listener.call_count == 1
+        assert len(coordinator.capture.samples) == 6
+
+        tick += 1
+        monotonic += UPDATE_INTERVAL.total_seconds()
+        await coordinator.async_refresh()
+        assert coordinator.data is not published
+        assert listener.call_count == 2
+        assert update_listener.call_count == 2
+
+        # A poll due at the end of the capture is not a sample.
+        monotonic += UPDATE_INTERVAL.total_seconds()
+        freezer.tick(timedelta(minutes=1))
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+
+    assert not coordinator.capturing
+    assert not coordinator.capture.active
+    assert coordinator.capture.published == 2
+    assert len(coordinator.capture.samples) == 7
+    assert coordinator.update_interval == UPDATE_INTERVAL
+
+    await coordinator.async_shutdown()
+
+
+async def test_capture_is_stopped_on_shutdown(hass: HomeAssistant) -> None:
+    """Test that shutting down the coordinator ends a running capture."""
+
+    dtu = MagicMock()
+    dtu.async_get_real_data_new = AsyncMock(
+        return_value=build_real_data(inverter_count=1)
+    )
+    coordinator = HoymilesRealDataUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=MockConfigEntry(domain=DOMAIN),
+        update_interval=UPDATE_INTERVAL,
+    )
+    coordinator.async_add_listener(MagicMock())
+
+    await coordinator.async_start_capture(timedelta(minutes=1))
+    await coordinator.async_shutdown()
+
+    assert not coordinator.capturing
+    assert coordinator.update_interval == UPDATE_INTERVAL
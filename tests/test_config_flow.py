@@ -12,6 +12,8 @@ from custom_components.hoymiles_wifi.const import (
     CONF_INVERTERS,
     CONF_PORTS,
     CONF_DTU_SERIAL_NUMBER,
+    CONF_MAX_UPDATE_INTERVAL,
+    CONF_MIN_UPDATE_INTERVAL,
     DEFAULT_UPDATE_INTERVAL_SECONDS,
 )
 from custom_components.hoymiles_wifi.error import CannotConnect
@@ -134,3 +136,31 @@ async def test_flow_user_init_data_error_and_recover(
     assert result3["data"] == MOCK_DATA_RESULT
     assert len(mock_setup_entry.mock_calls) == 1
     assert len(mock_async_get_real_data_new.mock_calls) == 1
+
+
+async def test_form_invalid_update_interval_range(hass: HomeAssistant) -> None:
+    """Test that the maximum update interval must not be below the minimum."""
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+
+    with patch(
+        "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+        return_value=MOCK_DATA_REAL_DATA_NEW,
+    ) as mock_async_get_real_data_new:
+        result2 = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {
+                **MOCK_DATA_STEP,
+                CONF_MIN_UPDATE_INTERVAL: 120,
+                CONF_MAX_UPDATE_INTERVAL: 60,
+            },
+        )
+        await hass.async_block_till_done()
+
+    assert result2["type"] == FlowResultType.FORM
+    assert result2["errors"] == {
+        CONF_MAX_UPDATE_INTERVAL: "invalid_update_interval_range"
+    }
+    assert len(mock_async_get_real_data_new.mock_calls) == 0
@@ -0,0 +1,249 @@
+"""Unit tests for the Hoymiles coordinators."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.core import HomeAssistant
+from hoymiles_wifi.dtu import NetworkState
+from hoymiles_wifi.protobuf import ESData_pb2, GetConfig_pb2
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.accessor import compile_accessor
+from custom_components.hoymiles_wifi.const import CONF_DTU_SERIAL_NUMBER, DOMAIN
+from custom_components.hoymiles_wifi.coordinator import (
+    CONNECTIVITY_FIELD,
+    HoymilesConfigUpdateCoordinator,
+    HoymilesDataUpdateCoordinator,
+    HoymilesEnergyStorageUpdateCoordinator,
+)
+from custom_components.hoymiles_wifi.scheduler import (
+    HoymilesRequestScheduler,
+    RequestPriority,
+)
+
+DTU_TEST_SERIAL_NUMBER = "414312345678"
+
+HYBRID_INVERTERS = [
+    {"inverter_serial_number": 1001, "model_name": "HYS-4.6LV-EUG1"},
+    {"inverter_serial_number": 1002, "model_name": "HYS-4.6LV-EUG1"},
+]
+
+
+def _energy_storage_data(state_of_charge: int) -> ESData_pb2.ESDataReqDTO:
+    data = ESData_pb2.ESDataReqDTO()
+    data.battery_management.state_of_charge = state_of_charge
+    return data
+
+
+def _energy_storage_coordinator(
+    hass: HomeAssistant, dtu: MagicMock
+) -> HoymilesEnergyStorageUpdateCoordinator:
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_DTU_SERIAL_NUMBER: DTU_TEST_SERIAL_NUMBER}
+    )
+    return HoymilesEnergyStorageUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=config_entry,
+        update_interval=timedelta(seconds=35),
+        dtu_serial_number=DTU_TEST_SERIAL_NUMBER,
+        inverters=HYBRID_INVERTERS,
+    )
+
+
+async def test_energy_storage_data_is_keyed_by_serial(hass: HomeAssistant) -> None:
+    """Test that a failing inverter does not shift the data of the others."""
+
+    responses = {
+        1001: [_energy_storage_data(10), None],
+        1002: [_energy_storage_data(20)] * 2,
+    }
+
+    async def async_get_energy_storage_data(dtu_serial_number, inverter_serial_number):
+        return responses[inverter_serial_number].pop(0)
+
+    dtu = MagicMock()
+    dtu.async_get_energy_storage_data = AsyncMock(
+        side_effect=async_get_energy_storage_data
+    )
+    coordinator = _energy_storage_coordinator(hass, dtu)
+
+    data = await coordinator._async_update_data()
+
+    assert data[1001].data.battery_management.state_of_charge == 10
+    assert data[1002].data.battery_management.state_of_charge == 20
+    assert not data[1001].stale
+    assert set(coordinator.inverter_latencies) == {1001, 1002}
+    statistics = coordinator.dump_statistics()
+    assert statistics["cycle_time"] >= max(coordinator.inverter_latencies.values())
+    assert set(statistics["inverter_latencies"]) == {"1001", "1002"}
+
+    data = await coordinator._async_update_data()
+
+    assert data[1001].stale
+    assert data[1001].data.battery_management.state_of_charge == 10
+    assert not data[1002].stale
+    assert data[1002].data.battery_management.state_of_charge == 20
+
+
+async def test_energy_storage_requests_are_queued_together(
+    hass: HomeAssistant,
+) -> None:
+    """Test that a control request goes before the remaining inverters."""
+
+    order = []
+    first_request = asyncio.Event()
+    release = asyncio.Event()
+
+    async def async_get_energy_storage_data(dtu_serial_number, inverter_serial_number):
+        order.append(inverter_serial_number)
+        first_request.set()
+        await release.wait()
+        return _energy_storage_data(10)
+
+    async def async_set_power_limit(power_limit):
+        order.append("control")
+
+    dtu = MagicMock()
+    dtu.async_get_energy_storage_data = AsyncMock(
+        side_effect=async_get_energy_storage_data
+    )
+    coordinator = _energy_storage_coordinator(hass, dtu)
+
+    update = asyncio.create_task(coordinator._async_update_data())
+    await first_request.wait()
+    control = asyncio.create_task(
+        coordinator.get_scheduler().async_request(
+            RequestPriority.CONTROL, async_set_power_limit, 50
+        )
+    )
+    await asyncio.sleep(0)
+    release.set()
+    await control
+    data = await update
+
+    assert order == [1001, "control", 1002]
+    assert set(data) == {1001, 1002}
+
+
+async def test_field_listeners_only_called_on_change(hass: HomeAssistant) -> None:
+    """Test that field listeners are only called when their field changed."""
+
+    config_entry = MockConfigEntry(domain=DOMAIN)
+    dtu = MagicMock()
+    coordinator = HoymilesDataUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=config_entry,
+        update_interval=timedelta(seconds=35),
+    )
+    calls = {"soc": 0, "voltage": 0}
+
+    def listener(name):
+        def update_callback():
+            calls[name] += 1
+
+        return update_callback
+
+    remove_soc = coordinator.async_add_listener(
+        listener("soc"),
+        compile_accessor("battery_management.state_of_charge"),
+    )
+    coordinator.async_add_listener(
+        listener("voltage"), compile_accessor("battery_management.voltage")
+    )
+
+    coordinator.async_set_updated_data(_energy_storage_data(10))
+    assert calls == {"soc": 1, "voltage": 1}
+
+    coordinator.async_set_updated_data(_energy_storage_data(10))
+    assert calls == {"soc": 1, "voltage": 1}
+    assert coordinator.field_updates_suppressed == 2
+
+    coordinator.async_set_updated_data(_energy_storage_data(20))
+    assert calls == {"soc": 2, "voltage": 1}
+
+    coordinator.async_set_update_error(Exception("DTU offline"))
+    assert calls == {"soc": 3, "voltage": 2}
+
+    remove_soc()
+    coordinator.async_set_updated_data(_energy_storage_data(30))
+    assert calls == {"soc": 3, "voltage": 3}
+
+    await coordinator.async_shutdown()
+
+
+async def test_connectivity_listener_only_called_on_change(
+    hass: HomeAssistant,
+) -> None:
+    """Test that connectivity listeners are only called when the DTU state changed."""
+
+    dtu = MagicMock()
+    dtu.get_state.return_value = NetworkState.Online
+    coordinator = HoymilesConfigUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=MockConfigEntry(domain=DOMAIN),
+        update_interval=timedelta(seconds=35),
+    )
+    calls = 0
+
+    def update_callback():
+        nonlocal calls
+        calls += 1
+
+    coordinator.async_add_listener(update_callback, CONNECTIVITY_FIELD)
+
+    coordinator.async_set_updated_data(GetConfig_pb2.GetConfigReqDTO())
+    assert calls == 1
+
+    coordinator.async_set_updated_data(
+        GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800)
+    )
+    assert calls == 1
+
+    dtu.get_state.return_value = NetworkState.Offline
+    coordinator.async_set_updated_data(
+        GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800)
+    )
+    assert calls == 2
+
+    await coordinator.async_shutdown()
+
+
+async def test_request_statistics(hass: HomeAssistant) -> None:
+    """Test that timeouts, empty responses and decoded bytes are counted."""
+
+    config = GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800)
+    responses = [(None, NetworkState.Offline), (None, NetworkState.Unknown)] + [
+        (config, NetworkState.Online)
+    ] * 3
+
+    async def async_get_config():
+        response, state = responses.pop(0)
+        dtu.get_state.return_value = state
+        return response
+
+    dtu = MagicMock()
+    dtu.async_get_config = AsyncMock(side_effect=async_get_config)
+    coordinator = HoymilesConfigUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=MockConfigEntry(domain=DOMAIN),
+        update_interval=timedelta(seconds=35),
+    )
+
+    for _ in range(5):
+        await coordinator._async_update_data()
+
+    statistics = coordinator.request_statistics
+    assert statistics.requests == 5
+    assert statistics.timeouts == 1
+    assert statistics.empty_responses == 1
+    assert statistics.bytes_decoded == 3 * config.ByteSize()
+    assert statistics.latency_percentile(95) is not None
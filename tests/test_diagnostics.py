@@ -0,0 +1,98 @@
+"""Tests of the Hoymiles diagnostics."""
+
+from unittest.mock import patch
+
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from hoymiles_wifi.protobuf import APPInfomationData_pb2, GetConfig_pb2
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_ENC_RAND,
+    CONF_IS_ENCRYPTED,
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DIAGNOSTICS_SNAPSHOT_COUNT,
+    DOMAIN,
+    HASS_DATA_COORDINATOR,
+)
+from custom_components.hoymiles_wifi.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+
+from .benchmarks.fleet import build_entry_data, build_real_data
+
+
+async def test_diagnostics(hass: HomeAssistant) -> None:
+    """Test that recent data and statistics are returned with secrets redacted."""
+
+    real_data = build_real_data(inverter_count=2, meter_count=1)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            CONF_IS_ENCRYPTED: False,
+            CONF_ENC_RAND: "00112233445566778899aabbccddeeff",
+            **build_entry_data(real_data),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=lambda: build_real_data(inverter_count=2, meter_count=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(
+                limit_power_mypower=800, wifi_ssid="home", wifi_password="secret"
+            ),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        data_coordinator = hass.data[DOMAIN][entry.entry_id][HASS_DATA_COORDINATOR]
+        for _ in range(DIAGNOSTICS_SNAPSHOT_COUNT + 1):
+            await data_coordinator.async_refresh()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert diagnostics["config_entry"]["data"][CONF_ENC_RAND] == REDACTED
+
+    coordinators = diagnostics["coordinators"]
+    assert set(coordinators) == {
+        "data_coordinator",
+        "config_coordinator",
+        "app_info_coordinator",
+    }
+
+    real_data_diagnostics = coordinators["data_coordinator"]
+    assert len(real_data_diagnostics["recent_data"]) == DIAGNOSTICS_SNAPSHOT_COUNT
+    assert len(real_data_diagnostics["recent_data"][-1]["data"]["pv_data"]) == len(
+        real_data.pv_data
+    )
+    assert real_data_diagnostics["requests"]["requests"] == (
+        DIAGNOSTICS_SNAPSHOT_COUNT + 2
+    )
+    assert real_data_diagnostics["statistics"] == {}
+
+    (config,) = coordinators["config_coordinator"]["recent_data"]
+    assert config["data"]["limit_power_mypower"] == 800
+    assert config["data"]["wifi_ssid"] == REDACTED
+    assert config["data"]["wifi_password"] == REDACTED
+
+    assert diagnostics["scheduler"]["requests"] > 0
+    assert diagnostics["scheduler"]["circuit_breaker"]["state"] == "closed"
+    assert diagnostics["entities"]["sensor"] > 0
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
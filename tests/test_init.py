@@ -1,11 +1,118 @@
 """Test component setup."""
 
+import asyncio
+import gc
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
 from homeassistant.setup import async_setup_component
+from hoymiles_wifi.protobuf import APPInfomationData_pb2, GetConfig_pb2
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+)
+from custom_components.hoymiles_wifi.coordinator import HoymilesDataUpdateCoordinator
 
-from custom_components.hoymiles_wifi.const import DOMAIN
+from .benchmarks.fleet import (
+    build_energy_storage_data,
+    build_entry_data,
+    build_real_data,
+)
+
+RELOADS = 100
 
 
 async def test_async_setup(hass):
     """Test the component gets setup."""
 
     assert await async_setup_component(hass, DOMAIN, {}) is True
+
+
+def _is_delayed_write(handle: asyncio.TimerHandle) -> bool:
+    """Return whether a timer is a delayed write of a registry or store.
+
+    Depending on the Home Assistant version the timer calls the store, or a
+    job calling the store.
+    """
+    return any(
+        isinstance(getattr(target, "__self__", None), Store)
+        for target in (
+            handle._callback,
+            *(getattr(arg, "target", arg) for arg in handle._args),
+        )
+    )
+
+
+async def test_reload_does_not_leak(hass: HomeAssistant) -> None:
+    """Test that reloading an entry leaves no tasks, timers or objects behind."""
+
+    real_data = build_real_data(inverter_count=2, meter_count=1)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(real_data, hybrid_inverter_count=1),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    def _usage() -> tuple[int, int, int]:
+        gc.collect()
+        coordinators = sum(
+            isinstance(obj, HoymilesDataUpdateCoordinator) for obj in gc.get_objects()
+        )
+        timers = sum(
+            not handle.cancelled() and not _is_delayed_write(handle)
+            for handle in hass.loop._scheduled
+        )
+        return len(asyncio.all_tasks()), timers, coordinators
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=lambda: build_real_data(inverter_count=2, meter_count=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_energy_storage_data",
+            side_effect=lambda **kwargs: build_energy_storage_data(),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        usage = _usage()
+        state_count = len(hass.states.async_all())
+
+        for _ in range(RELOADS):
+            assert await hass.config_entries.async_reload(entry.entry_id)
+            await hass.async_block_till_done()
+
+        assert _usage() == usage
+        assert len(hass.states.async_all()) == state_count
+        assert hass.services.has_service(DOMAIN, "set_bms_mode")
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.NOT_LOADED
+    assert DOMAIN not in hass.data
+    assert not hass.services.has_service(DOMAIN, "set_bms_mode")
+    assert not hass.services.has_service(DOMAIN, "start_capture")
+    assert _usage()[2] == 0
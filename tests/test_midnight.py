@@ -0,0 +1,47 @@
+"""Tests of the midnight scheduler."""
+
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.hoymiles_wifi.midnight import HoymilesMidnightScheduler
+
+
+async def test_reset_at_midnight(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    """Test that all callbacks are called at local midnight until removed."""
+
+    freezer.move_to(dt_util.start_of_local_day() + timedelta(hours=23, minutes=59))
+    scheduler = HoymilesMidnightScheduler(hass)
+    first, second = MagicMock(), MagicMock()
+    scheduler.async_register(first)
+    remove_second = scheduler.async_register(second)
+
+    freezer.tick(timedelta(seconds=30))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert not first.called
+
+    freezer.tick(timedelta(seconds=30))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    first.assert_called_once_with()
+    second.assert_called_once_with()
+
+    remove_second()
+    freezer.tick(timedelta(days=1))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert first.call_count == 2
+    assert second.call_count == 1
+
+    scheduler.async_stop()
+    freezer.tick(timedelta(days=1))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert first.call_count == 2
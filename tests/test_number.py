@@ -0,0 +1,139 @@
+"""Tests of the Hoymiles number entities."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.components.number import (
+    ATTR_VALUE,
+    DOMAIN as NUMBER_DOMAIN,
+    SERVICE_SET_VALUE,
+)
+from homeassistant.const import ATTR_ENTITY_ID, CONF_HOST
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from hoymiles_wifi.protobuf import (
+    APPInfomationData_pb2,
+    CommandPB_pb2,
+    GetConfig_pb2,
+)
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+    HASS_CONFIG_COORDINATOR,
+    POWER_LIMIT_WRITE_DELAY_SECONDS,
+)
+
+from .benchmarks.fleet import build_entry_data, build_real_data
+
+
+async def test_power_limit_writes_are_coalesced(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    """Test that only the last power limit of a burst is written and read back."""
+
+    limit_power_mypower = 1000
+
+    def async_get_config():
+        return GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=limit_power_mypower)
+
+    def async_set_power_limit(power_limit):
+        nonlocal limit_power_mypower
+        limit_power_mypower = round(power_limit * 10)
+        return CommandPB_pb2.CommandReqDTO()
+
+    real_data = build_real_data(inverter_count=1)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(real_data),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=lambda: build_real_data(inverter_count=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config", side_effect=async_get_config
+        ) as get_config,
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_set_power_limit",
+            side_effect=async_set_power_limit,
+        ) as set_power_limit,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        entity_id = er.async_get(hass).async_get_entity_id(
+            NUMBER_DOMAIN, DOMAIN, f"hoymiles_{entry.entry_id}_limit_power_mypower"
+        )
+        assert float(hass.states.get(entity_id).state) == 100
+        config_requests = get_config.call_count
+
+        async def set_value(value: float) -> None:
+            await hass.services.async_call(
+                NUMBER_DOMAIN,
+                SERVICE_SET_VALUE,
+                {ATTR_ENTITY_ID: entity_id, ATTR_VALUE: value},
+                blocking=True,
+            )
+
+        async def wait_for_write() -> None:
+            freezer.tick(timedelta(seconds=POWER_LIMIT_WRITE_DELAY_SECONDS))
+            async_fire_time_changed(hass)
+            await hass.async_block_till_done()
+
+        for value in range(10, 60, 10):
+            await set_value(value)
+
+        # The slider shows the last value until it is written.
+        state = hass.states.get(entity_id)
+        assert float(state.state) == 50
+        assert state.attributes["assumed_state"]
+        set_power_limit.assert_not_called()
+
+        await wait_for_write()
+        set_power_limit.assert_called_once_with(50)
+        assert get_config.call_count == config_requests + 1
+        state = hass.states.get(entity_id)
+        assert float(state.state) == 50
+        assert "assumed_state" not in state.attributes
+
+        # The DTU already reports the power limit.
+        await set_value(50)
+        await wait_for_write()
+        assert set_power_limit.call_count == 1
+        assert get_config.call_count == config_requests + 1
+        assert "assumed_state" not in hass.states.get(entity_id).attributes
+
+        # Other config fields do not wake the entity.
+        coordinator = hass.data[DOMAIN][entry.entry_id][HASS_CONFIG_COORDINATOR]
+        dispatched = coordinator.field_updates_dispatched
+        coordinator.async_set_updated_data(
+            GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=500, lock_time=1)
+        )
+        assert coordinator.field_updates_dispatched == dispatched
+
+        coordinator.async_set_updated_data(
+            GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=400)
+        )
+        assert float(hass.states.get(entity_id).state) == 40
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
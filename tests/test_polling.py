@@ -0,0 +1,76 @@
+"""Unit tests for the adaptive polling policy."""
+
+from datetime import timedelta
+
+from custom_components.hoymiles_wifi.polling import (
+    AdaptivePollingPolicy,
+    PollingStatistics,
+)
+
+MIN_INTERVAL = timedelta(seconds=10)
+MAX_INTERVAL = timedelta(seconds=300)
+BASE_INTERVAL = timedelta(seconds=35)
+
+
+def _policy() -> AdaptivePollingPolicy:
+    return AdaptivePollingPolicy(MIN_INTERVAL, MAX_INTERVAL, BASE_INTERVAL)
+
+
+def test_speeds_up_when_power_changes_quickly() -> None:
+    """Test that a large power change drops to the minimum interval."""
+
+    policy = _policy()
+
+    assert policy.next_interval(1000, sun_up=True) == BASE_INTERVAL
+    assert policy.next_interval(1500, sun_up=True) == MIN_INTERVAL
+
+
+def test_backs_off_when_power_is_stable() -> None:
+    """Test that stable power grows the interval up to the maximum."""
+
+    policy = _policy()
+    policy.next_interval(1000, sun_up=True)
+
+    intervals = [policy.next_interval(1005, sun_up=True) for _ in range(10)]
+
+    assert intervals[0] > BASE_INTERVAL
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == MAX_INTERVAL
+
+
+def test_backs_off_after_repeated_empty_responses() -> None:
+    """Test that only repeated empty responses grow the interval."""
+
+    policy = _policy()
+
+    assert policy.next_interval(None, sun_up=True) == BASE_INTERVAL
+    assert policy.next_interval(None, sun_up=True) > BASE_INTERVAL
+    assert policy.empty_responses == 2
+
+    assert policy.next_interval(1000, sun_up=True) == BASE_INTERVAL
+    assert policy.empty_responses == 0
+
+
+def test_uses_maximum_interval_at_night() -> None:
+    """Test that the maximum interval is used until power rises at sunrise."""
+
+    policy = _policy()
+
+    assert policy.next_interval(0, sun_up=False) == MAX_INTERVAL
+    assert policy.next_interval(0, sun_up=True) == MAX_INTERVAL
+    assert policy.next_interval(50, sun_up=True) == MIN_INTERVAL
+
+
+def test_polling_statistics() -> None:
+    """Test that polls are counted and data freshness is tracked."""
+
+    statistics = PollingStatistics()
+
+    assert statistics.data_age is None
+
+    statistics.record_poll(has_data=False)
+    statistics.record_poll(has_data=True)
+
+    assert statistics.polls_per_day == 2
+    assert statistics.last_data_received is not None
+    assert statistics.data_age >= timedelta()
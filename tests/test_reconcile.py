@@ -0,0 +1,292 @@
+"""Unit tests for the topology reconciler."""
+
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.util import dt as dt_util
+from hoymiles_wifi.protobuf import ESData_pb2, RealDataNew_pb2
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_DTU_SERIAL_NUMBER,
+    CONF_HYBRID_INVERTERS,
+    CONF_INVERTERS,
+    CONF_METERS,
+    CONF_PORTS,
+    CONF_THREE_PHASE_INVERTERS,
+    DOMAIN,
+)
+from custom_components.hoymiles_wifi.coordinator import EnergyStorageRecord
+from custom_components.hoymiles_wifi.reconcile import HoymilesTopologyReconciler
+
+FIRST_INVERTER = "116100000001"
+SECOND_INVERTER = "116100000002"
+THIRD_INVERTER = "116100000003"
+
+
+def _ports(*serial_numbers: str) -> list[dict]:
+    return [
+        {"inverter_serial_number": serial_number, "port_number": 1}
+        for serial_number in serial_numbers
+    ]
+
+
+def _real_data(*serial_numbers: str) -> RealDataNew_pb2.RealDataNewReqDTO:
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    for serial_number in serial_numbers:
+        real_data.sgs_data.add(serial_number=int(serial_number, 16))
+        real_data.pv_data.add(serial_number=int(serial_number, 16), port_number=1)
+    return real_data
+
+
+def _setup(hass: HomeAssistant, *serial_numbers: str):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="414312345678",
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_DTU_SERIAL_NUMBER: "414312345678",
+            CONF_INVERTERS: list(serial_numbers),
+            CONF_THREE_PHASE_INVERTERS: [],
+            CONF_PORTS: _ports(*serial_numbers),
+            CONF_METERS: [],
+        },
+    )
+    entry.add_to_hass(hass)
+
+    coordinator = MagicMock(data_restored=False, last_update_success=True)
+    reconciler = HoymilesTopologyReconciler(hass, entry, coordinator)
+    add_devices = MagicMock()
+    reconciler.async_add_platform(add_devices)
+    return entry, coordinator, reconciler, add_devices
+
+
+async def test_new_inverter_is_added(hass: HomeAssistant) -> None:
+    """Test that an inverter is added once it was reported twice."""
+
+    entry, coordinator, reconciler, add_devices = _setup(hass, FIRST_INVERTER)
+    coordinator.data = _real_data(FIRST_INVERTER, SECOND_INVERTER)
+
+    await reconciler.async_reconcile()
+    assert not add_devices.mock_calls
+
+    await reconciler.async_reconcile()
+    add_devices.assert_called_once_with({SECOND_INVERTER})
+    assert entry.data[CONF_INVERTERS] == [FIRST_INVERTER, SECOND_INVERTER]
+    assert entry.data[CONF_PORTS] == _ports(FIRST_INVERTER, SECOND_INVERTER)
+
+
+async def test_missing_inverter_is_removed_after_a_day(hass: HomeAssistant) -> None:
+    """Test that an inverter is only removed after it was missing for a day."""
+
+    entry, coordinator, reconciler, _ = _setup(hass, FIRST_INVERTER, SECOND_INVERTER)
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, SECOND_INVERTER)}
+    )
+    entity = er.async_get(hass).async_get_or_create(
+        "sensor",
+        DOMAIN,
+        f"hoymiles_{entry.entry_id}_sgs_data[1].active_power",
+        config_entry=entry,
+        device_id=device.id,
+    )
+    coordinator.data = _real_data(FIRST_INVERTER)
+
+    await reconciler.async_reconcile()
+    await reconciler.async_reconcile()
+    assert entry.data[CONF_INVERTERS] == [FIRST_INVERTER, SECOND_INVERTER]
+
+    with patch(
+        "homeassistant.util.dt.utcnow",
+        return_value=dt_util.utcnow() + timedelta(days=1),
+    ):
+        await reconciler.async_reconcile()
+
+    assert entry.data[CONF_INVERTERS] == [FIRST_INVERTER, None]
+    assert entry.data[CONF_PORTS] == [*_ports(FIRST_INVERTER), None]
+    assert device_registry.async_get(device.id) is None
+    assert er.async_get(hass).async_get(entity.entity_id) is None
+
+
+async def test_removed_inverter_keeps_indexes(hass: HomeAssistant) -> None:
+    """Test that removing an inverter does not move the other inverters."""
+
+    entry, coordinator, reconciler, add_devices = _setup(
+        hass, FIRST_INVERTER, SECOND_INVERTER
+    )
+    coordinator.data = _real_data(SECOND_INVERTER)
+
+    await reconciler.async_reconcile()
+    with patch(
+        "homeassistant.util.dt.utcnow",
+        return_value=dt_util.utcnow() + timedelta(days=1),
+    ):
+        await reconciler.async_reconcile()
+
+    assert entry.data[CONF_INVERTERS] == [None, SECOND_INVERTER]
+    assert entry.data[CONF_PORTS] == [None, *_ports(SECOND_INVERTER)]
+
+    # A new inverter does not take the index of the removed one.
+    coordinator.data = _real_data(SECOND_INVERTER, THIRD_INVERTER)
+    await reconciler.async_reconcile()
+    await reconciler.async_reconcile()
+
+    add_devices.assert_called_once_with({THIRD_INVERTER})
+    assert entry.data[CONF_INVERTERS] == [None, SECOND_INVERTER, THIRD_INVERTER]
+    assert entry.data[CONF_PORTS] == [
+        None,
+        *_ports(SECOND_INVERTER, THIRD_INVERTER),
+    ]
+
+
+async def test_reordered_inverters_are_ignored(hass: HomeAssistant) -> None:
+    """Test that the config entry is kept if the DTU reorders its inverters."""
+
+    entry, coordinator, reconciler, add_devices = _setup(
+        hass, FIRST_INVERTER, SECOND_INVERTER
+    )
+    coordinator.data = _real_data(SECOND_INVERTER, FIRST_INVERTER)
+
+    with patch.object(
+        hass.config_entries, "async_schedule_reload", create=True
+    ) as mock_reload:
+        await reconciler.async_reconcile()
+        await reconciler.async_reconcile()
+        await hass.async_block_till_done()
+
+    assert not mock_reload.mock_calls
+    assert not add_devices.mock_calls
+    assert entry.data[CONF_INVERTERS] == [FIRST_INVERTER, SECOND_INVERTER]
+
+
+async def test_new_port_of_existing_inverter_reloads_entry(
+    hass: HomeAssistant,
+) -> None:
+    """Test that the entry is reloaded if an existing inverter got a port."""
+
+    entry, coordinator, reconciler, add_devices = _setup(hass, FIRST_INVERTER)
+    coordinator.data = _real_data(FIRST_INVERTER)
+    coordinator.data.pv_data.add(serial_number=int(FIRST_INVERTER, 16), port_number=2)
+
+    with patch.object(
+        hass.config_entries, "async_schedule_reload", create=True
+    ) as mock_reload:
+        await reconciler.async_reconcile()
+        await reconciler.async_reconcile()
+        await hass.async_block_till_done()
+
+    mock_reload.assert_called_once_with(entry.entry_id)
+    assert not add_devices.mock_calls
+    assert len(entry.data[CONF_PORTS]) == 2
+
+
+async def test_empty_data_is_ignored(hass: HomeAssistant) -> None:
+    """Test that nothing is removed while the DTU reports no device."""
+
+    entry, coordinator, reconciler, _ = _setup(hass, FIRST_INVERTER)
+    coordinator.data = _real_data()
+
+    with patch(
+        "homeassistant.util.dt.utcnow",
+        return_value=dt_util.utcnow() + timedelta(days=2),
+    ):
+        await reconciler.async_reconcile()
+        await reconciler.async_reconcile()
+
+    assert entry.data[CONF_INVERTERS] == [FIRST_INVERTER]
+
+
+def _setup_hybrid(hass: HomeAssistant, pv_panel_count: int, phase_count: int):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="414312345678",
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_DTU_SERIAL_NUMBER: "414312345678",
+            CONF_HYBRID_INVERTERS: [
+                {"inverter_serial_number": 1001, "model_name": "HYS"}
+            ],
+        },
+    )
+    entry.add_to_hass(hass)
+
+    data = ESData_pb2.ESDataReqDTO()
+    for _ in range(pv_panel_count):
+        data.pv_panels.add()
+    for _ in range(phase_count):
+        data.grid.phases.add()
+    energy_storage_coordinator = MagicMock(
+        data={1001: EnergyStorageRecord(data=data, last_updated=dt_util.utcnow())}
+    )
+    reconciler = HoymilesTopologyReconciler(
+        hass, entry, None, energy_storage_coordinator
+    )
+    return entry, reconciler
+
+
+async def test_hybrid_inverter_counts_remove_entities(hass: HomeAssistant) -> None:
+    """Test that entities of PV panels and phases no longer reported are removed."""
+
+    entry, reconciler = _setup_hybrid(hass, pv_panel_count=1, phase_count=1)
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, "1001")}
+    )
+    entity_registry = er.async_get(hass)
+    entity_ids = {
+        key: entity_registry.async_get_or_create(
+            "sensor",
+            DOMAIN,
+            f"hoymiles_{entry.entry_id}_[0].{key}",
+            config_entry=entry,
+            device_id=device.id,
+        ).entity_id
+        for key in (
+            "pv_panels[0].power",
+            "pv_panels[1].power",
+            "grid.phases[0].active_power",
+            "grid.phases[2].active_power",
+        )
+    }
+
+    with patch.object(
+        hass.config_entries, "async_schedule_reload", create=True
+    ) as mock_reload:
+        await reconciler.async_reconcile()
+        await hass.async_block_till_done()
+
+    assert not mock_reload.mock_calls
+    assert entry.data[CONF_HYBRID_INVERTERS] == [
+        {
+            "inverter_serial_number": 1001,
+            "model_name": "HYS",
+            "pv_panel_count": 1,
+            "phase_count": 1,
+        }
+    ]
+    assert {
+        key
+        for key, entity_id in entity_ids.items()
+        if entity_registry.async_get(entity_id) is not None
+    } == {"pv_panels[0].power", "grid.phases[0].active_power"}
+
+
+async def test_more_hybrid_inverter_pv_panels_reload_entry(
+    hass: HomeAssistant,
+) -> None:
+    """Test that the entry is reloaded if a hybrid inverter reports more panels."""
+
+    entry, reconciler = _setup_hybrid(hass, pv_panel_count=4, phase_count=3)
+
+    with patch.object(
+        hass.config_entries, "async_schedule_reload", create=True
+    ) as mock_reload:
+        await reconciler.async_reconcile()
+        await reconciler.async_reconcile()
+        await hass.async_block_till_done()
+
+    mock_reload.assert_called_once_with(entry.entry_id)
+    assert entry.data[CONF_HYBRID_INVERTERS][0]["pv_panel_count"] == 4
@@ -0,0 +1,124 @@
+"""Unit tests for the Hoymiles request scheduler."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from custom_components.hoymiles_wifi.scheduler import (
+    REQUEST_STATISTICS_SAMPLES,
+    HoymilesRequestScheduler,
+    RequestPriority,
+    RequestStatistics,
+)
+
+
+async def test_requests_are_served_by_priority() -> None:
+    """Test that waiting requests are served by priority, then in order."""
+
+    scheduler = HoymilesRequestScheduler(MagicMock())
+    release_first = asyncio.Event()
+    served = []
+
+    async def blocking_request():
+        await release_first.wait()
+        served.append("blocking")
+
+    async def request(name):
+        served.append(name)
+        return name
+
+    first = asyncio.create_task(
+        scheduler.async_request(RequestPriority.APP_INFO, blocking_request)
+    )
+    await asyncio.sleep(0)
+
+    tasks = [
+        asyncio.create_task(
+            scheduler.async_request(RequestPriority.APP_INFO, request, "app_info")
+        ),
+        asyncio.create_task(
+            scheduler.async_request(RequestPriority.CONFIG, request, "config")
+        ),
+        asyncio.create_task(
+            scheduler.async_request(RequestPriority.REAL_DATA, request, "real_data_1")
+        ),
+        asyncio.create_task(
+            scheduler.async_request(RequestPriority.REAL_DATA, request, "real_data_2")
+        ),
+        asyncio.create_task(
+            scheduler.async_request(RequestPriority.CONTROL, request, "control")
+        ),
+    ]
+    await asyncio.sleep(0)
+
+    assert scheduler.queue_depth == 5
+
+    release_first.set()
+    await asyncio.gather(first, *tasks)
+
+    assert served == [
+        "blocking",
+        "control",
+        "real_data_1",
+        "real_data_2",
+        "config",
+        "app_info",
+    ]
+    assert scheduler.queue_depth == 0
+    assert scheduler.statistics.requests == 6
+    assert scheduler.statistics.max_queue_depth == 5
+    assert scheduler.statistics.max_wait > 0
+
+
+async def test_cancelled_request_releases_the_dtu() -> None:
+    """Test that a cancelled waiting request does not block the queue."""
+
+    scheduler = HoymilesRequestScheduler(MagicMock())
+    release_first = asyncio.Event()
+
+    async def blocking_request():
+        await release_first.wait()
+
+    async def request():
+        return "done"
+
+    first = asyncio.create_task(
+        scheduler.async_request(RequestPriority.REAL_DATA, blocking_request)
+    )
+    await asyncio.sleep(0)
+
+    cancelled = asyncio.create_task(
+        scheduler.async_request(RequestPriority.CONTROL, request)
+    )
+    waiting = asyncio.create_task(
+        scheduler.async_request(RequestPriority.CONFIG, request)
+    )
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    release_first.set()
+
+    assert await waiting == "done"
+    await first
+    assert cancelled.cancelled()
+    assert scheduler.queue_depth == 0
+
+
+def test_request_latency_percentiles() -> None:
+    """Test that percentiles are taken from the most recent latencies."""
+
+    statistics = RequestStatistics()
+    assert statistics.latency_percentile(50) is None
+
+    for latency in range(1, 101):
+        statistics.record(latency / 100, None, timed_out=True)
+
+    assert statistics.latency_percentile(50) == 0.5
+    assert statistics.latency_percentile(95) == 0.95
+    assert statistics.latency_percentile(100) == 1.0
+    assert statistics.latency_percentile(0) == 0.01
+
+    for _ in range(REQUEST_STATISTICS_SAMPLES):
+        statistics.record(2.0, None, timed_out=True)
+
+    assert statistics.latency_percentile(50) == 2.0
+    assert statistics.timeouts == 100 + REQUEST_STATISTICS_SAMPLES
@@ -0,0 +1,210 @@
+"""Tests of the Hoymiles sensors."""
+
+from unittest.mock import patch
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant, State
+from homeassistant.helpers import entity_registry as er
+from hoymiles_wifi.protobuf import APPInfomationData_pb2, GetConfig_pb2
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+    mock_restore_cache_with_extra_data,
+)
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+    HASS_APP_INFO_COORDINATOR,
+    HASS_DATA_COORDINATOR,
+)
+from custom_components.hoymiles_wifi.sensor import MAX_WRITE_INTERVAL
+
+from .benchmarks.fleet import build_entry_data, build_real_data
+
+
+async def test_deadband(hass: HomeAssistant, freezer: FrozenDateTimeFactory) -> None:
+    """Test that changes within the deadband are only written periodically."""
+
+    # Every tick raises all raw values by one, the port power by 0.1 W.
+    tick = 0
+
+    def async_get_real_data_new():
+        return build_real_data(inverter_count=1, ports_per_inverter=1, tick=tick)
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(async_get_real_data_new()),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=async_get_real_data_new,
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        entity_id = er.async_get(hass).async_get_entity_id(
+            "sensor", DOMAIN, f"hoymiles_{entry.entry_id}_pv_data[0].power"
+        )
+        first_state = float(hass.states.get(entity_id).state)
+        coordinator = hass.data[DOMAIN][entry.entry_id][HASS_DATA_COORDINATOR]
+
+        tick = 5
+        await coordinator.async_refresh()
+        assert float(hass.states.get(entity_id).state) == first_state
+
+        # The change is written once the maximum write interval passed.
+        freezer.tick(MAX_WRITE_INTERVAL)
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+        assert float(hass.states.get(entity_id).state) == pytest.approx(
+            first_state + 0.5
+        )
+
+        tick = 15
+        await coordinator.async_refresh()
+        assert float(hass.states.get(entity_id).state) == pytest.approx(
+            first_state + 1.5
+        )
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_last_known_value_is_restored(hass: HomeAssistant) -> None:
+    """Test that the last known value is restored while the DTU reports none."""
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(build_real_data(inverter_count=1)),
+        },
+    )
+    entry.add_to_hass(hass)
+    entity_id = (
+        er.async_get(hass)
+        .async_get_or_create(
+            "sensor",
+            DOMAIN,
+            f"hoymiles_{entry.entry_id}_dtu_info.dtu_sw_version",
+            config_entry=entry,
+        )
+        .entity_id
+    )
+    mock_restore_cache_with_extra_data(
+        hass,
+        [
+            (
+                State(entity_id, "V00.01.11"),
+                {"native_value": "V00.01.11", "native_unit_of_measurement": None},
+            )
+        ],
+    )
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=lambda: build_real_data(inverter_count=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id][HASS_APP_INFO_COORDINATOR]
+        await coordinator.async_refresh()
+        assert hass.states.get(entity_id).state == "V00.01.11"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_request_statistics_are_only_written_on_change(
+    hass: HomeAssistant,
+) -> None:
+    """Test that request statistics sensors are not written on every poll."""
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: "192.0.2.1",
+            CONF_UPDATE_INTERVAL: 35,
+            **build_entry_data(build_real_data(inverter_count=1)),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_real_data_new",
+            side_effect=lambda: build_real_data(inverter_count=1),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_get_config",
+            return_value=GetConfig_pb2.GetConfigReqDTO(),
+        ),
+        patch(
+            "hoymiles_wifi.dtu.DTU.async_app_information_data",
+            return_value=APPInfomationData_pb2.APPInfoDataReqDTO(),
+        ),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"hoymiles_{entry.entry_id}_real_data_request_timeouts"
+    )
+    assert hass.states.get(entity_id).state == "0"
+    coordinator = hass.data[DOMAIN][entry.entry_id][HASS_DATA_COORDINATOR]
+
+    entity = hass.data[SENSOR_DOMAIN].get_entity(entity_id)
+    with patch.object(
+        entity, "async_write_ha_state", wraps=entity.async_write_ha_state
+    ) as async_write_ha_state:
+        coordinator.async_set_updated_data(build_real_data(inverter_count=1))
+        async_write_ha_state.assert_not_called()
+
+        coordinator.request_statistics.record(1.0, None, True)
+        coordinator.async_set_updated_data(coordinator.data)
+        async_write_ha_state.assert_called_once()
+    assert hass.states.get(entity_id).state == "1"
+
+    polls_per_day = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"hoymiles_{entry.entry_id}_polls_per_day"
+    )
+    assert "state_class" not in hass.states.get(polls_per_day).attributes
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,202 @@
+"""Tests of the hoymiles_wifi client and the coordinators against a simulated DTU."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from hoymiles_wifi.const import CMD_COMMAND_RES_DTO
+from hoymiles_wifi.dtu import DTU
+from hoymiles_wifi.protobuf import GetConfig_pb2
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import DOMAIN
+from custom_components.hoymiles_wifi.coordinator import (
+    HoymilesEnergyStorageUpdateCoordinator,
+    HoymilesRealDataUpdateCoordinator,
+)
+from custom_components.hoymiles_wifi.scheduler import HoymilesRequestScheduler
+from custom_components.hoymiles_wifi.util import (
+    async_get_config_entry_data_for_host,
+    generate_inverter_serial_number,
+)
+
+from .benchmarks.fleet import build_energy_storage_data, build_real_data
+from .simulator import DTUSimulator, paginate_real_data
+
+# The simulator listens on a real socket.
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+HOST = "127.0.0.1"
+ENC_RAND = bytes(range(16))
+
+
+def _real_data():
+    real_data = build_real_data(inverter_count=12, meter_count=2)
+    real_data.device_serial_number = "414312345678"
+    return real_data
+
+
+def _dtu(**kwargs) -> DTU:
+    dtu = DTU(HOST, timeout=1, **kwargs)
+    # Do not wait for the minimum time between two requests of the client.
+    dtu.last_request_time = 0
+    return dtu
+
+
+def test_large_real_data_is_paginated() -> None:
+    """Test that real data is split into pages the client can read."""
+
+    real_data = _real_data()
+    pages = paginate_real_data(real_data)
+
+    assert len(pages) > 1
+    assert all(page.ByteSize() < 1000 for page in pages)
+    assert [page.cp for page in pages] == list(range(len(pages)))
+    assert {page.ap for page in pages} == {len(pages)}
+    assert sum(len(page.pv_data) for page in pages) == len(real_data.pv_data)
+
+
+async def test_plain_dtu() -> None:
+    """Test that paginated real data and the config are served in plain mode."""
+
+    real_data = _real_data()
+    async with DTUSimulator(
+        HOST,
+        real_data=real_data,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+    ):
+        with patch("asyncio.sleep"):
+            response = await _dtu().async_get_real_data_new()
+        config = await _dtu().async_get_config()
+
+    assert list(response.pv_data) == list(real_data.pv_data)
+    assert list(response.meter_data) == list(real_data.meter_data)
+    assert response.device_serial_number == real_data.device_serial_number
+    assert config.limit_power_mypower == 800
+
+
+async def test_encrypted_dtu_is_discovered() -> None:
+    """Test that an encrypted DTU is discovered and queried."""
+
+    real_data = _real_data()
+    async with DTUSimulator(HOST, real_data=real_data, enc_rand=ENC_RAND):
+        with patch("asyncio.sleep"):
+            (
+                dtu_sn,
+                single_phase_inverters,
+                _,
+                ports,
+                meters,
+                _,
+                is_encrypted,
+                enc_rand,
+            ) = await async_get_config_entry_data_for_host(HOST)
+
+    assert is_encrypted
+    assert enc_rand == ENC_RAND.hex()
+    assert dtu_sn == real_data.device_serial_number
+    assert single_phase_inverters == [
+        generate_inverter_serial_number(sgs_data.serial_number)
+        for sgs_data in real_data.sgs_data
+    ]
+    assert len(ports) == len(real_data.pv_data)
+    assert len(meters) == len(real_data.meter_data)
+
+
+async def test_encrypted_dtu_rejects_wrong_key() -> None:
+    """Test that a client with another enc_rand gets no data."""
+
+    async with DTUSimulator(HOST, real_data=_real_data(), enc_rand=ENC_RAND):
+        dtu = _dtu(is_encrypted=True, enc_rand=bytes(16))
+        assert await dtu.async_get_config() is None
+
+
+async def test_power_limit_command() -> None:
+    """Test that control commands are received and acknowledged."""
+
+    async with DTUSimulator(HOST, enc_rand=ENC_RAND) as simulator:
+        dtu = _dtu(is_encrypted=True, enc_rand=ENC_RAND)
+        response = await dtu.async_set_power_limit(50)
+
+    assert response is not None
+    (command,) = simulator.commands(CMD_COMMAND_RES_DTO)
+    assert command.data == "A:500,B:0,C:0\r"
+
+
+async def test_latency_and_drops() -> None:
+    """Test that slow and dropped requests are not answered in time."""
+
+    async with DTUSimulator(
+        HOST, config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1)
+    ) as simulator:
+        simulator.latency = 2
+        assert await _dtu().async_get_config() is None
+
+        simulator.latency = 0
+        simulator.drop_rate = 1
+        assert await _dtu().async_get_config() is None
+        assert simulator.dropped_requests == 1
+
+        simulator.drop_rate = 0
+        assert await _dtu().async_get_config() is not None
+
+
+async def test_single_connection() -> None:
+    """Test that a DTU serving one connection refuses a second client."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=1),
+        latency=0.2,
+        single_connection=True,
+    ) as simulator:
+        first, second = await asyncio.gather(
+            _dtu().async_get_config(), _dtu().async_get_config()
+        )
+
+    assert (first is None) != (second is None)
+    assert simulator.refused_connections == 1
+
+
+async def test_coordinators(hass: HomeAssistant) -> None:
+    """Test that the coordinators update from a simulated DTU."""
+
+    real_data = _real_data()
+    async with DTUSimulator(
+        HOST,
+        real_data=real_data,
+        energy_storage_data={1001: build_energy_storage_data()},
+        enc_rand=ENC_RAND,
+    ):
+        dtu = _dtu(is_encrypted=True, enc_rand=ENC_RAND)
+        scheduler = HoymilesRequestScheduler(dtu)
+        config_entry = MockConfigEntry(domain=DOMAIN)
+        real_data_coordinator = HoymilesRealDataUpdateCoordinator(
+            hass,
+            dtu=dtu,
+            scheduler=scheduler,
+            config_entry=config_entry,
+            update_interval=timedelta(seconds=35),
+        )
+        energy_storage_coordinator = HoymilesEnergyStorageUpdateCoordinator(
+            hass,
+            dtu=dtu,
+            scheduler=scheduler,
+            config_entry=config_entry,
+            update_interval=timedelta(seconds=35),
+            dtu_serial_number=real_data.device_serial_number,
+            inverters=[{"inverter_serial_number": 1001, "model_name": "HYT"}],
+        )
+
+        with patch("asyncio.sleep"):
+            await real_data_coordinator.async_refresh()
+            await energy_storage_coordinator.async_refresh()
+
+    assert real_data_coordinator.last_update_success
+    assert len(real_data_coordinator.data.pv_data) == len(real_data.pv_data)
+    assert not energy_storage_coordinator.data[1001].stale
+
+    await real_data_coordinator.async_shutdown()
+    await energy_storage_coordinator.async_shutdown()
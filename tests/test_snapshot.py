@@ -0,0 +1,51 @@
+"""Unit tests for the flattened real data snapshots."""
+
+import math
+
+from hoymiles_wifi.protobuf import RealDataNew_pb2
+
+from custom_components.hoymiles_wifi.snapshot import RealDataIndex, SnapshotLayout
+
+
+def test_flatten_real_data() -> None:
+    """Test that every path gets a stable slot and missing values are NaN."""
+
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 1234
+    real_data.sgs_data.add().active_power = 100
+
+    layout = SnapshotLayout()
+    power_slot = layout.get_slot("dtu_power")
+    inverter_slot = layout.get_slot("sgs_data[0].active_power")
+    missing_slot = layout.get_slot("sgs_data[1].active_power")
+
+    assert layout.get_slot("dtu_power") == power_slot
+    assert len(layout) == 3
+
+    snapshot = layout.flatten(RealDataIndex(real_data))
+
+    assert snapshot[power_slot] == 1234
+    assert snapshot[inverter_slot] == 100
+    assert math.isnan(snapshot[missing_slot])
+
+
+def test_device_paths_are_bound_by_serial_number() -> None:
+    """Test that reordered devices keep their values."""
+
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    for serial_number, power in ((0x116100000002, 200), (0x116100000001, 100)):
+        real_data.sgs_data.add(serial_number=serial_number, active_power=power)
+        real_data.pv_data.add(serial_number=serial_number, port_number=2, power=power)
+
+    layout = SnapshotLayout()
+    inverter_slot = layout.get_slot("sgs_data[0].active_power", "116100000001")
+    port_slot = layout.get_slot("pv_data[0].power", "116100000001", 2)
+    other_port_slot = layout.get_slot("pv_data[0].power", "116100000001", 1)
+
+    assert layout.get_slot("sgs_data[0].active_power") != inverter_slot
+
+    snapshot = layout.flatten(RealDataIndex(real_data))
+
+    assert snapshot[inverter_slot] == 100
+    assert snapshot[port_slot] == 100
+    assert math.isnan(snapshot[other_port_slot])
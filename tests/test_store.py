@@ -0,0 +1,200 @@
+"""Unit tests for the coordinator snapshot store."""
+
+import base64
+from datetime import timedelta
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from hoymiles_wifi.protobuf import ESData_pb2, RealDataNew_pb2
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.hoymiles_wifi.const import DOMAIN, SNAPSHOT_MAX_AGE_SECONDS
+from custom_components.hoymiles_wifi.coordinator import (
+    HoymilesEnergyStorageUpdateCoordinator,
+    HoymilesRealDataUpdateCoordinator,
+)
+from custom_components.hoymiles_wifi.scheduler import HoymilesRequestScheduler
+from custom_components.hoymiles_wifi.store import HoymilesSnapshotStore
+
+ENTRY_ID = "mock_entry_id"
+STORAGE_KEY = f"{DOMAIN}.{ENTRY_ID}.snapshots"
+
+
+def _real_data_coordinator(hass: HomeAssistant, dtu: MagicMock):
+    return HoymilesRealDataUpdateCoordinator(
+        hass,
+        dtu=dtu,
+        scheduler=HoymilesRequestScheduler(dtu),
+        config_entry=MockConfigEntry(domain=DOMAIN, entry_id=ENTRY_ID),
+        update_interval=timedelta(seconds=35),
+    )
+
+
+async def _async_restored_store(hass: HomeAssistant, coordinator: Any):
+    store = HoymilesSnapshotStore(hass, ENTRY_ID)
+    await store.async_load()
+    store.async_restore(coordinator)
+    return store
+
+
+async def test_real_data_is_saved_and_restored(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that the last live data is restored and marked as restored."""
+
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 1234
+
+    dtu = MagicMock()
+    dtu.async_get_real_data_new = AsyncMock(return_value=real_data)
+    coordinator = _real_data_coordinator(hass, dtu)
+    await _async_restored_store(hass, coordinator)
+
+    assert coordinator.data is None
+
+    await coordinator.async_refresh()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+
+    assert "real_data" in hass_storage[STORAGE_KEY]["data"]
+
+    restored = _real_data_coordinator(hass, MagicMock())
+    await _async_restored_store(hass, restored)
+
+    assert restored.data == real_data
+    assert restored.data_restored
+    assert restored.data_updated_at == coordinator.data_updated_at
+    assert restored.get_field_value(restored.get_field("dtu_power"), restored.data)
+
+    await coordinator.async_shutdown()
+
+
+async def test_restored_data_is_kept_until_the_dtu_answers(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that failed polls after a restart keep the restored data."""
+
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 1234
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            "real_data": {
+                "updated_at": dt_util.utcnow().isoformat(),
+                "data": base64.b64encode(real_data.SerializeToString()).decode(),
+            }
+        },
+    }
+
+    dtu = MagicMock()
+    dtu.async_get_real_data_new = AsyncMock(return_value=None)
+    coordinator = _real_data_coordinator(hass, dtu)
+    await _async_restored_store(hass, coordinator)
+
+    await coordinator.async_refresh()
+
+    assert coordinator.data == real_data
+    assert coordinator.data_restored
+
+    live_data = RealDataNew_pb2.RealDataNewReqDTO()
+    live_data.dtu_power = 1000
+    dtu.async_get_real_data_new.return_value = live_data
+    await coordinator.async_refresh()
+
+    assert coordinator.data is live_data
+    assert not coordinator.data_restored
+
+    # Once live data was received, a failed poll is not hidden.
+    dtu.async_get_real_data_new.return_value = None
+    await coordinator.async_refresh()
+
+    assert coordinator.data is None
+    await coordinator.async_shutdown()
+
+
+async def test_expired_restored_data_is_dropped(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that restored data is dropped once it is too old."""
+
+    real_data = RealDataNew_pb2.RealDataNewReqDTO()
+    real_data.dtu_power = 1234
+    dtu = MagicMock()
+    dtu.async_get_real_data_new = AsyncMock(return_value=None)
+    coordinator = _real_data_coordinator(hass, dtu)
+    coordinator.async_set_restored_data(
+        real_data,
+        dt_util.utcnow() - timedelta(seconds=SNAPSHOT_MAX_AGE_SECONDS + 1),
+    )
+
+    await coordinator.async_refresh()
+
+    assert coordinator.data is None
+    assert not coordinator.data_restored
+    await coordinator.async_shutdown()
+
+
+async def test_old_data_is_not_restored(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that data from a previous day is ignored."""
+
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            "real_data": {
+                "updated_at": (dt_util.utcnow() - timedelta(days=1)).isoformat(),
+                "data": "",
+            }
+        },
+    }
+
+    coordinator = _real_data_coordinator(hass, MagicMock())
+    await _async_restored_store(hass, coordinator)
+
+    assert coordinator.data is None
+    assert not coordinator.data_restored
+
+
+async def test_energy_storage_records_are_restored_as_stale(
+    hass: HomeAssistant,
+) -> None:
+    """Test that restored energy storage records are stale."""
+
+    data = ESData_pb2.ESDataReqDTO()
+    data.battery_management.state_of_charge = 42
+
+    dtu = MagicMock()
+    dtu.async_get_energy_storage_data = AsyncMock(return_value=data)
+
+    def _coordinator():
+        return HoymilesEnergyStorageUpdateCoordinator(
+            hass,
+            dtu=dtu,
+            scheduler=HoymilesRequestScheduler(dtu),
+            config_entry=MockConfigEntry(domain=DOMAIN, entry_id=ENTRY_ID),
+            update_interval=timedelta(seconds=35),
+            dtu_serial_number="414312345678",
+            inverters=[{"inverter_serial_number": 1001, "model_name": "HYS"}],
+        )
+
+    coordinator = _coordinator()
+    store = await _async_restored_store(hass, coordinator)
+    await coordinator.async_refresh()
+    await store._store.async_save(store._data_to_save())
+
+    restored = _coordinator()
+    await _async_restored_store(hass, restored)
+
+    record = restored.data[1001]
+    assert record.stale
+    assert record.data.battery_management.state_of_charge == 42
+
+    await coordinator.async_shutdown()
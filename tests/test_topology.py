@@ -0,0 +1,250 @@
+"""Unit tests for the topology cache."""
+
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from hoymiles_wifi.const import IS_ENCRYPTED_BIT_INDEX
+from hoymiles_wifi.protobuf import APPInfomationData_pb2, ESRegPB_pb2, GWInfo_pb2
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_DTU_SERIAL_NUMBER,
+    CONF_INVERTERS,
+    CONF_PORTS,
+    CONF_UPDATE_INTERVAL,
+    DOMAIN,
+)
+from custom_components.hoymiles_wifi.error import CannotConnect
+from custom_components.hoymiles_wifi.scheduler import RequestPriority
+from custom_components.hoymiles_wifi.topology import (
+    DEVICE_KEYS,
+    TOPOLOGY_VERSION,
+    async_get_topology,
+    async_schedule_reprobe,
+    async_topology_needs_reprobe,
+)
+from custom_components.hoymiles_wifi.util import (
+    async_get_config_entry_data_for_host,
+)
+
+from .benchmarks.fleet import build_real_data
+
+DTU_TEST_HOST = "192.0.2.1"
+DTU_TEST_SERIAL_NUMBER = "414312345678"
+INVERTER_SERIAL_NUMBER = "116100000001"
+STORAGE_KEY = f"{DOMAIN}.topology"
+
+PROBE = "custom_components.hoymiles_wifi.topology.async_get_config_entry_data_for_host"
+
+PROBE_RESULT = (
+    DTU_TEST_SERIAL_NUMBER,
+    [INVERTER_SERIAL_NUMBER],
+    [],
+    [{"inverter_serial_number": INVERTER_SERIAL_NUMBER, "port_number": 1}],
+    [],
+    [],
+    False,
+    "",
+)
+
+
+def _add_entry(hass: HomeAssistant, **data: Any) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=1,
+        unique_id=DTU_TEST_SERIAL_NUMBER,
+        data={CONF_HOST: DTU_TEST_HOST, CONF_UPDATE_INTERVAL: 35, **data},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+def _store_topology(hass_storage: dict[str, Any], version: int) -> None:
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            DTU_TEST_HOST: {
+                "dtu_serial_number": DTU_TEST_SERIAL_NUMBER,
+                "single_phase_inverters": [INVERTER_SERIAL_NUMBER],
+                "version": version,
+            }
+        },
+    }
+
+
+async def test_cached_topology_is_used_offline(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that the topology is known while the DTU is unreachable."""
+
+    _store_topology(hass_storage, TOPOLOGY_VERSION)
+    entry = _add_entry(hass)
+
+    with patch(PROBE, side_effect=CannotConnect) as mock_probe:
+        topology = await async_get_topology(hass, entry)
+        await hass.async_block_till_done()
+
+    assert not mock_probe.mock_calls
+    assert topology.dtu_serial_number == DTU_TEST_SERIAL_NUMBER
+    assert topology.as_entry_data()[CONF_INVERTERS] == [INVERTER_SERIAL_NUMBER]
+
+
+async def test_outdated_topology_is_probed(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that records of another version are ignored."""
+
+    _store_topology(hass_storage, TOPOLOGY_VERSION + 1)
+    entry = _add_entry(hass)
+
+    with (
+        patch(PROBE, side_effect=CannotConnect),
+        pytest.raises(CannotConnect),
+    ):
+        await async_get_topology(hass, entry)
+
+    with patch(PROBE, AsyncMock(return_value=PROBE_RESULT)):
+        topology = await async_get_topology(hass, entry)
+
+    assert topology.single_phase_inverters == [INVERTER_SERIAL_NUMBER]
+    assert topology.discovered_at is not None
+
+
+async def test_entry_data_is_preferred_over_cache(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that the cache only fills in keys missing from the entry data."""
+
+    _store_topology(hass_storage, TOPOLOGY_VERSION)
+    entry = _add_entry(
+        hass,
+        **{
+            CONF_DTU_SERIAL_NUMBER: DTU_TEST_SERIAL_NUMBER,
+            CONF_INVERTERS: ["116100000002"],
+        },
+    )
+
+    with patch(PROBE, side_effect=CannotConnect) as mock_probe:
+        topology = await async_get_topology(hass, entry)
+
+    assert not mock_probe.mock_calls
+    assert topology.single_phase_inverters == ["116100000002"]
+    assert await async_topology_needs_reprobe(hass, entry)
+
+
+async def test_inconsistent_topology_is_probed_in_background(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test that a topology without devices is probed again."""
+
+    entry = _add_entry(
+        hass,
+        **{CONF_DTU_SERIAL_NUMBER: DTU_TEST_SERIAL_NUMBER},
+        **{key: [] for key in DEVICE_KEYS},
+    )
+    scheduler = MagicMock()
+
+    assert await async_topology_needs_reprobe(hass, entry)
+    with patch(PROBE, AsyncMock(return_value=PROBE_RESULT)) as mock_probe:
+        async_schedule_reprobe(hass, entry, scheduler)
+        await hass.async_block_till_done()
+
+    mock_probe.assert_called_once_with(DTU_TEST_HOST, scheduler)
+    assert entry.data[CONF_INVERTERS] == [INVERTER_SERIAL_NUMBER]
+    assert not await async_topology_needs_reprobe(hass, entry)
+
+
+async def test_reprobe_keeps_device_positions(hass: HomeAssistant) -> None:
+    """Test that a removed inverter does not move the other inverters."""
+
+    removed_serial_number = "116100000002"
+    entry = _add_entry(
+        hass,
+        **{
+            CONF_DTU_SERIAL_NUMBER: DTU_TEST_SERIAL_NUMBER,
+            CONF_INVERTERS: [removed_serial_number, INVERTER_SERIAL_NUMBER],
+            CONF_PORTS: [
+                {"inverter_serial_number": removed_serial_number, "port_number": 1},
+                {"inverter_serial_number": INVERTER_SERIAL_NUMBER, "port_number": 1},
+            ],
+        },
+    )
+
+    with patch(PROBE, AsyncMock(return_value=PROBE_RESULT)):
+        async_schedule_reprobe(hass, entry, MagicMock())
+        await hass.async_block_till_done()
+
+    assert entry.data[CONF_INVERTERS] == [None, INVERTER_SERIAL_NUMBER]
+    assert entry.data[CONF_PORTS] == [
+        None,
+        {"inverter_serial_number": INVERTER_SERIAL_NUMBER, "port_number": 1},
+    ]
+
+
+async def test_probe_uses_scheduler() -> None:
+    """Test that a probe of a set up DTU is queued by its scheduler."""
+
+    real_data = build_real_data(inverter_count=1)
+    dtu = MagicMock()
+    dtu.async_app_information_data = AsyncMock(
+        return_value=APPInfomationData_pb2.APPInfoDataReqDTO()
+    )
+    dtu.async_get_real_data_new = AsyncMock(return_value=real_data)
+
+    async def async_request(priority, method, *args, **kwargs):
+        return await method(*args, **kwargs)
+
+    scheduler = MagicMock()
+    scheduler.get_dtu.return_value = dtu
+    scheduler.async_request = AsyncMock(side_effect=async_request)
+
+    with patch("custom_components.hoymiles_wifi.util.DTU") as dtu_class:
+        result = await async_get_config_entry_data_for_host(DTU_TEST_HOST, scheduler)
+
+    dtu_class.assert_not_called()
+    assert result[0] == real_data.device_serial_number
+    assert [call.args[:2] for call in scheduler.async_request.mock_calls] == [
+        (RequestPriority.APP_INFO, dtu.async_app_information_data),
+        (RequestPriority.CONFIG, dtu.async_get_real_data_new),
+    ]
+
+
+async def test_probe_with_scheduler_rekeys_dtu() -> None:
+    """Test that a probe of a set up DTU keys it and does not sleep."""
+
+    app_info = APPInfomationData_pb2.APPInfoDataReqDTO()
+    app_info.dtu_info.dfs = 1 << IS_ENCRYPTED_BIT_INDEX
+    app_info.dtu_info.enc_rand = bytes(range(16))
+    gateway_info = GWInfo_pb2.GWInfoReqDTO(serial_number=int(DTU_TEST_SERIAL_NUMBER))
+    registry = ESRegPB_pb2.ESRegReqDTO()
+    registry.inverters.add(serial_number=1001, model_name="HYS-4.6LV-EUG1")
+
+    dtu = MagicMock(is_encrypted=False, enc_rand=b"")
+    dtu.async_app_information_data = AsyncMock(return_value=app_info)
+    dtu.async_get_real_data_new = AsyncMock(return_value=None)
+    dtu.async_get_gateway_info = AsyncMock(return_value=gateway_info)
+    dtu.async_get_energy_storage_registry = AsyncMock(return_value=registry)
+
+    async def async_request(priority, method, *args, **kwargs):
+        return await method(*args, **kwargs)
+
+    scheduler = MagicMock()
+    scheduler.get_dtu.return_value = dtu
+    scheduler.async_request = AsyncMock(side_effect=async_request)
+
+    with (
+        patch("custom_components.hoymiles_wifi.util.DTU") as dtu_class,
+        patch("custom_components.hoymiles_wifi.util.asyncio.sleep") as sleep,
+    ):
+        result = await async_get_config_entry_data_for_host(DTU_TEST_HOST, scheduler)
+
+    dtu_class.assert_not_called()
+    sleep.assert_not_called()
+    assert dtu.is_encrypted
+    assert dtu.enc_rand == bytes(range(16))
+    assert result[0] == DTU_TEST_SERIAL_NUMBER
+    assert result[-2:] == (True, bytes(range(16)).hex())
@@ -0,0 +1,232 @@
+"""Tests of the persistent connection to a simulated DTU."""
+
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from hoymiles_wifi.const import CMD_COMMAND_RES_DTO, CMD_GET_CONFIG
+from hoymiles_wifi.dtu import NetworkState
+from hoymiles_wifi.protobuf import GetConfig_pb2
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hoymiles_wifi.const import (
+    CONF_PERSISTENT_CONNECTION,
+    CONF_UPDATE_INTERVAL,
+    CONFIG_VERSION,
+    DOMAIN,
+    HASS_DTU,
+)
+from custom_components.hoymiles_wifi.transport import PersistentConnectionDTU
+
+from .benchmarks.fleet import build_entry_data, build_real_data
+from .simulator import DTUSimulator
+
+# The simulator listens on a real socket.
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+HOST = "127.0.0.1"
+ENC_RAND = bytes(range(16))
+
+
+async def _request_config(dtu: PersistentConnectionDTU):
+    # Do not wait for the minimum time between two requests of the client.
+    dtu.last_request_time = 0
+    return await dtu.async_get_config()
+
+
+@pytest.mark.parametrize("enc_rand", [None, ENC_RAND])
+async def test_connection_is_reused(enc_rand: bytes | None) -> None:
+    """Test that requests, also of paginated real data, share a connection."""
+
+    real_data = build_real_data(inverter_count=12)
+    async with DTUSimulator(
+        HOST,
+        real_data=real_data,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        enc_rand=enc_rand,
+        keep_alive=True,
+    ) as simulator:
+        dtu = PersistentConnectionDTU(
+            HOST,
+            is_encrypted=enc_rand is not None,
+            enc_rand=enc_rand or b"",
+            timeout=1,
+        )
+        for _ in range(3):
+            config = await _request_config(dtu)
+            assert config.limit_power_mypower == 800
+
+        dtu.last_request_time = 0
+        response = await dtu.async_get_real_data_new()
+        await dtu.async_close()
+
+    assert list(response.pv_data) == list(real_data.pv_data)
+    assert simulator.connections == 1
+    assert dtu.connections_opened == 1
+    assert not dtu.connected
+
+
+async def test_reconnect() -> None:
+    """Test that connections closed by the DTU are opened again."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        keep_alive=True,
+    ) as simulator:
+        dtu = PersistentConnectionDTU(HOST, timeout=1)
+        assert await _request_config(dtu)
+
+        await simulator.async_close_connections()
+        assert await _request_config(dtu)
+
+        # A DTU closing the connection after every response still works.
+        simulator.keep_alive = False
+        await simulator.async_close_connections()
+        for _ in range(3):
+            assert await _request_config(dtu)
+        await dtu.async_close()
+
+    assert dtu.get_state() == NetworkState.Online
+    assert simulator.connections == 5
+    assert dtu.connections_opened == 5
+
+
+async def test_control_command_is_not_sent_again() -> None:
+    """Test that only read-only requests are sent again after a closed connection."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        keep_alive=True,
+    ) as simulator:
+        dtu = PersistentConnectionDTU(HOST, timeout=1)
+        assert await _request_config(dtu)
+
+        # The DTU closes the connection after reading the next request.
+        simulator.keep_alive = False
+        simulator.drop_rate = 1.0
+        assert await _request_config(dtu) is None
+        assert len(simulator.commands(CMD_GET_CONFIG)) == 3
+        assert dtu.reconnects == 1
+
+        simulator.keep_alive = True
+        simulator.drop_rate = 0.0
+        assert await _request_config(dtu)
+
+        simulator.keep_alive = False
+        simulator.drop_rate = 1.0
+        dtu.last_request_time = 0
+        assert await dtu.async_set_power_limit(50) is None
+        assert len(simulator.commands(CMD_COMMAND_RES_DTO)) == 1
+        assert dtu.reconnects == 1
+        await dtu.async_close()
+
+
+async def test_idle_timeout() -> None:
+    """Test that the connection is closed after the idle timeout."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        keep_alive=True,
+    ) as simulator:
+        dtu = PersistentConnectionDTU(HOST, idle_timeout=0.05, timeout=1)
+        assert await _request_config(dtu)
+        assert dtu.connected
+
+        await asyncio.sleep(0.1)
+        assert not dtu.connected
+        assert await _request_config(dtu)
+        await dtu.async_close()
+
+    assert simulator.connections == 2
+
+
+async def test_unanswered_request() -> None:
+    """Test that a connection without response is not used again."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        keep_alive=True,
+        drop_rate=1.0,
+    ) as simulator:
+        dtu = PersistentConnectionDTU(HOST, timeout=0.2)
+        assert await _request_config(dtu) is None
+        assert dtu.get_state() == NetworkState.Offline
+        assert not dtu.connected
+
+        simulator.drop_rate = 0.0
+        assert await _request_config(dtu)
+        await dtu.async_close()
+
+    assert dtu.connections_opened == 2
+
+
+async def test_config_entry(hass: HomeAssistant) -> None:
+    """Test that a config entry uses a single connection and closes it."""
+
+    real_data = build_real_data(inverter_count=2)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=CONFIG_VERSION,
+        data={
+            CONF_HOST: HOST,
+            CONF_UPDATE_INTERVAL: 35,
+            CONF_PERSISTENT_CONNECTION: True,
+            **build_entry_data(real_data),
+        },
+    )
+    entry.add_to_hass(hass)
+
+    async with DTUSimulator(
+        HOST,
+        real_data=real_data,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        keep_alive=True,
+    ) as simulator:
+        with patch(
+            "custom_components.hoymiles_wifi.transport.MIN_REQUEST_INTERVAL_SECONDS",
+            0,
+        ):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+        dtu = hass.data[DOMAIN][entry.entry_id][HASS_DTU]
+        assert isinstance(dtu, PersistentConnectionDTU)
+        assert len(simulator.requests) >= 3
+        assert simulator.connections == 1
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert not dtu.connected
+
+
+async def test_cancelled_request() -> None:
+    """Test that a connection with a cancelled request is not used again."""
+
+    async with DTUSimulator(
+        HOST,
+        config=GetConfig_pb2.GetConfigReqDTO(limit_power_mypower=800),
+        keep_alive=True,
+        latency=0.2,
+    ) as simulator:
+        dtu = PersistentConnectionDTU(HOST, timeout=1)
+        dtu.last_request_time = 0
+        task = asyncio.create_task(dtu.async_app_information_data())
+        while not simulator.requests:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not dtu.connected
+
+        simulator.latency = 0.0
+        config = await _request_config(dtu)
+        await dtu.async_close()
+
+    assert config.limit_power_mypower == 800
+    assert dtu.connections_opened == 2